@@ -0,0 +1,153 @@
+# apercu.py - Aperçu PNG basse résolution de la première page d'un document
+#
+# renderPM ne rasterise que des dessins ReportLab (Drawing), pas des pages platypus : la
+# première page est mise en page seule (DocumentApercu, les pages suivantes ne sont ni
+# dessinées ni écrites) puis convertie en PNG par PyMuPDF (module fitz) s'il est
+# installé, sinon par pdftoppm (poppler-utils). Sans l'un ni l'autre, les aperçus sont
+# indisponibles (ApercuIndisponible).
+#
+# Les aperçus sont conservés sur disque, partagés par les workers, sous
+# <dossier>/<empreinte>-<largeur>.png : l'empreinte est le SHA-256 du contenu (fichier
+# PDF déjà publié, ou données du document pour un aperçu avant génération). Un même
+# contenu n'est rasterisé qu'une fois ; les aperçus non consultés depuis APERCUS_TTL
+# secondes sont supprimés.
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz  # anciennes versions de PyMuPDF
+    except ImportError:  # PyMuPDF est optionnel : repli sur pdftoppm
+        fitz = None
+
+LARGEUR_PAR_DEFAUT = int(os.environ.get('APERCU_LARGEUR', 400))
+LARGEUR_MIN = 100
+LARGEUR_MAX = 1600
+PDFTOPPM_TIMEOUT = 30
+
+EMPREINTE_VALIDE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ApercuIndisponible(Exception):
+    """Aucun outil de rasterisation installé (PyMuPDF ou pdftoppm)"""
+
+    def __init__(self):
+        super().__init__("Aperçu indisponible : installez PyMuPDF (pip install pymupdf) ou poppler-utils (pdftoppm)")
+
+
+def moteur():
+    """Outil de rasterisation utilisé : "pymupdf", "pdftoppm" ou None"""
+    if fitz is not None:
+        return 'pymupdf'
+    if shutil.which('pdftoppm'):
+        return 'pdftoppm'
+    return None
+
+
+def lire_largeur(valeur):
+    """Largeur demandée en pixels, bornée ; lève ValueError si elle n'est pas entière"""
+    if valeur in (None, ''):
+        return LARGEUR_PAR_DEFAUT
+    return max(LARGEUR_MIN, min(int(valeur), LARGEUR_MAX))
+
+
+def empreinte_document(document, type_document, theme, profil=None):
+    """SHA-256 des données du document (champs, articles, thème et profil)"""
+    contenu = {nom: valeur for nom, valeur in vars(document).items() if nom != 'items'}
+    contenu['items'] = [vars(item) for item in document.items]
+    contenu.update(_type=type_document, _theme=theme, _profil=profil)
+    return hashlib.sha256(json.dumps(contenu, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def rasteriser(chemin_pdf, chemin_png, largeur):
+    """Écrire la première page du PDF en PNG de `largeur` pixels"""
+    if fitz is not None:
+        with fitz.open(chemin_pdf) as pdf:
+            page = pdf[0]
+            zoom = largeur / page.rect.width
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).save(chemin_png)
+        return
+
+    if not shutil.which('pdftoppm'):
+        raise ApercuIndisponible()
+    with tempfile.TemporaryDirectory() as dossier:
+        sortie = os.path.join(dossier, 'page')
+        subprocess.run(
+            ['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile', '-scale-to-x', str(largeur),
+             '-scale-to-y', '-1', chemin_pdf, sortie],
+            check=True, capture_output=True, timeout=PDFTOPPM_TIMEOUT
+        )
+        shutil.move(sortie + '.png', chemin_png)
+
+
+class CacheApercus:
+    """Aperçus PNG par empreinte de contenu et largeur, avec éviction TTL"""
+
+    def __init__(self, dossier, ttl=86400, intervalle=300):
+        self.dossier = dossier
+        self.ttl = ttl
+        self.intervalle = intervalle
+        self._dernier_nettoyage = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+
+    def chemin(self, empreinte, largeur):
+        return os.path.join(self.dossier, f'{empreinte}-{largeur}.png')
+
+    def obtenir(self, empreinte, largeur):
+        """Chemin de l'aperçu s'il est déjà en cache, sinon None"""
+        if not EMPREINTE_VALIDE.match(empreinte):
+            return None
+        chemin = self.chemin(empreinte, largeur)
+        try:
+            os.utime(chemin)  # dernier accès, pour l'éviction
+        except OSError:
+            return None
+        return chemin
+
+    def produire(self, empreinte, largeur, chemin_pdf):
+        """Rasteriser la première page du PDF dans le cache, retourne le chemin de l'aperçu"""
+        if moteur() is None:
+            raise ApercuIndisponible()
+        chemin = self.chemin(empreinte, largeur)
+        # Écriture dans un fichier unique puis renommage atomique (workers concurrents)
+        temporaire = os.path.join(self.dossier, f'.{uuid.uuid4().hex}.png')
+        try:
+            rasteriser(chemin_pdf, temporaire, largeur)
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+        self._nettoyer_si_necessaire()
+        return chemin
+
+    def evincer(self):
+        """Supprimer les aperçus non consultés depuis plus de ttl secondes"""
+        maintenant = time.time()
+        supprimes = 0
+        for nom in os.listdir(self.dossier):
+            chemin = os.path.join(self.dossier, nom)
+            try:
+                if maintenant - os.path.getmtime(chemin) > self.ttl:
+                    os.remove(chemin)
+                    supprimes += 1
+            except OSError:
+                continue
+        return supprimes
+
+    def _nettoyer_si_necessaire(self):
+        with self._lock:
+            if time.time() - self._dernier_nettoyage < self.intervalle:
+                return
+            self._dernier_nettoyage = time.time()
+        self.evincer()
@@ -0,0 +1,173 @@
+# api_keys.py - Registre des clés API par client (tenant)
+#
+# Chaque client possède une paire de clés (X-API-Key-1 / X-API-Key-2). Seuls les
+# hachages SHA-256 sont stockés, dans un fichier JSON ou une base SQLite :
+#
+#   API_KEYS_FILE=cles.json  -> {"tenants": [{"id": "acme", "cle1_sha256": "...", "cle2_sha256": "..."}]}
+#   API_KEYS_DB=cles.sqlite3 -> table cles_api (voir SCHEMA_SQL)
+#
+# Sans registre configuré, API_KEY_1 / API_KEY_2 définissent un client unique "defaut".
+#
+# Ajouter un client (les clés ne sont affichées qu'une fois) :
+#   python api_keys.py ajouter acme --db generated/cles.sqlite3
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+import db
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS cles_api (
+    tenant TEXT PRIMARY KEY,
+    nom TEXT NOT NULL DEFAULT '',
+    cle1_sha256 TEXT NOT NULL UNIQUE,
+    cle2_sha256 TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    actif INTEGER NOT NULL DEFAULT 1,
+    cree_le REAL NOT NULL
+)
+"""
+
+
+def hacher(cle):
+    return hashlib.sha256(cle.encode('utf-8')).hexdigest()
+
+
+class Tenant:
+    """Client de l'API résolu à partir de ses clés"""
+
+    def __init__(self, id, nom='', cle1_sha256='', cle2_sha256='', options=None):
+        self.id = id
+        self.nom = nom or id
+        self.cle1_sha256 = cle1_sha256
+        self.cle2_sha256 = cle2_sha256
+        self.options = options or {}
+
+    def __repr__(self):
+        return f"Tenant({self.id!r})"
+
+
+class RegistreCles:
+    """Table des clés en mémoire, rechargée depuis sa source toutes les `ttl` secondes"""
+
+    def __init__(self, charger, ttl=60):
+        self._charger = charger
+        self.ttl = ttl
+        self._index = {}
+        self._charge_le = 0.0
+        self._lock = threading.Lock()
+
+    def _table(self):
+        if time.monotonic() - self._charge_le > self.ttl:
+            with self._lock:
+                if time.monotonic() - self._charge_le > self.ttl:
+                    try:
+                        self._index = {t.cle1_sha256: t for t in self._charger()}
+                    except Exception as e:
+                        # On garde la table précédente si la source est momentanément illisible
+                        print(f"Erreur lors du chargement des clés API: {e}")
+                    self._charge_le = time.monotonic()
+        return self._index
+
+    def verifier(self, key1, key2):
+        """Retourne (tenant, None) si les clés sont valides, sinon (None, message d'erreur)"""
+        if not key1 or not key2:
+            return None, "Clés API manquantes"
+
+        hash1 = hacher(key1)
+        hash2 = hacher(key2)
+        tenant = self._table().get(hash1)
+
+        # Comparaisons en temps constant, effectuées même si la première clé est inconnue
+        attendu1 = tenant.cle1_sha256 if tenant else '0' * 64
+        attendu2 = tenant.cle2_sha256 if tenant else '0' * 64
+        valide = hmac.compare_digest(hash1, attendu1) & hmac.compare_digest(hash2, attendu2)
+        if tenant is None or not valide:
+            return None, "Clés API invalides"
+        return tenant, None
+
+    def invalider(self):
+        """Forcer le rechargement au prochain appel"""
+        self._charge_le = 0.0
+
+
+def charger_fichier(chemin):
+    def charger():
+        with open(chemin, encoding='utf-8') as f:
+            contenu = json.load(f)
+        return [
+            Tenant(t['id'], t.get('nom', ''), t['cle1_sha256'], t['cle2_sha256'], t.get('options'))
+            for t in contenu.get('tenants', []) if t.get('actif', True)
+        ]
+    return charger
+
+
+def charger_sqlite(chemin):
+    def charger():
+        connexion = db.connecter(chemin)
+        connexion.execute(SCHEMA_SQL)
+        lignes = connexion.execute(
+            'SELECT tenant, nom, cle1_sha256, cle2_sha256, options FROM cles_api WHERE actif = 1'
+        ).fetchall()
+        return [
+            Tenant(l['tenant'], l['nom'], l['cle1_sha256'], l['cle2_sha256'], json.loads(l['options']))
+            for l in lignes
+        ]
+    return charger
+
+
+def charger_environnement(key1, key2):
+    tenant = Tenant('defaut', 'Client par défaut', hacher(key1), hacher(key2))
+    return lambda: [tenant]
+
+
+def registre_depuis_environnement(environ=os.environ):
+    """Construire le registre selon API_KEYS_DB, API_KEYS_FILE ou API_KEY_1/API_KEY_2"""
+    ttl = int(environ.get('API_KEYS_TTL', 60))
+    if environ.get('API_KEYS_DB'):
+        return RegistreCles(charger_sqlite(environ['API_KEYS_DB']), ttl)
+    if environ.get('API_KEYS_FILE'):
+        return RegistreCles(charger_fichier(environ['API_KEYS_FILE']), ttl)
+    return RegistreCles(charger_environnement(
+        environ.get('API_KEY_1', 'your-secret-key-1-here'),
+        environ.get('API_KEY_2', 'your-secret-key-2-here')
+    ), ttl)
+
+
+def ajouter_tenant(chemin, tenant_id, nom='', options=None):
+    """Créer un client dans la base SQLite, retourne ses deux clés en clair"""
+    key1 = secrets.token_urlsafe(32)
+    key2 = secrets.token_urlsafe(32)
+    connexion = db.connecter(chemin)
+    connexion.execute(SCHEMA_SQL)
+    connexion.execute(
+        'INSERT INTO cles_api (tenant, nom, cle1_sha256, cle2_sha256, options, cree_le) VALUES (?, ?, ?, ?, ?, ?)',
+        (tenant_id, nom, hacher(key1), hacher(key2), json.dumps(options or {}), time.time())
+    )
+    return key1, key2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gestion des clés API")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    ajouter = sous_commandes.add_parser('ajouter', help="Créer un client et ses clés")
+    ajouter.add_argument('tenant')
+    ajouter.add_argument('--nom', default='')
+    ajouter.add_argument('--db', default=os.environ.get('API_KEYS_DB', 'generated/cles.sqlite3'))
+    args = parser.parse_args(argv)
+
+    key1, key2 = ajouter_tenant(args.db, args.tenant, args.nom)
+    print(f"✅ Client '{args.tenant}' créé dans {args.db}")
+    print(f"X-API-Key-1: {key1}")
+    print(f"X-API-Key-2: {key2}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# app_async.py - Point d'entrée ASGI avec rendu non bloquant des devis et factures
+#
+# Lancement : uvicorn app_async:app --host 0.0.0.0 --port $PORT
+#
+# POST /api/devis et POST /api/facture sont traités nativement en asynchrone : le corps
+# de la requête et le logo sont lus sans bloquer la boucle d'événements, puis le même
+# traitement que les routes Flask (traiter_creation : limites, numérotation, rendu,
+# enregistrement) s'exécute dans un thread, le rendu ReportLab/python-docx étant déporté
+# dans un pool d'exécution. Toutes les autres routes sont servies par l'application Flask
+# via l'adaptateur WSGI d'asgiref.
+#
+# Les processus du pool n'importent que rendu.py (pas app_students et son initialisation)
+# et sont préchauffés à leur démarrage : au lancement, l'application attend qu'ils soient
+# prêts avant d'accepter des requêtes.
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g, request
+from werkzeug.wsgi import FileWrapper
+
+import assets
+import rendu
+import rendu_parallele
+from app_students import app as flask_app
+from app_students import (contenu_erreur, documents_prechauffage, preparer_creation, prechauffage, reponse_creation,
+                          traiter_creation, verifier_cles_api)
+from json_provider import charger_json
+
+# "processus" (rendu en parallèle sur plusieurs cœurs) ou "threads"
+ASYNC_EXECUTEUR = os.environ.get('ASYNC_EXECUTEUR', 'processus')
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', 0)) or os.cpu_count() or 1
+TAILLE_BLOC = 64 * 1024
+
+_wsgi = WsgiToAsgi(flask_app)
+_executeur = None
+
+
+def _obtenir_executeur():
+    global _executeur
+    if _executeur is None:
+        if ASYNC_EXECUTEUR == 'threads':
+            _executeur = ThreadPoolExecutor(max_workers=ASYNC_WORKERS)
+        else:
+            # Pas de fork depuis la boucle et ses threads (voir rendu_parallele.py)
+            _executeur = ProcessPoolExecutor(max_workers=ASYNC_WORKERS, mp_context=rendu_parallele.contexte_processus(),
+                                             initializer=rendu.prechauffer_processus,
+                                             initargs=(documents_prechauffage(),))
+    return _executeur
+
+
+async def _demarrer_executeur():
+    """Créer le pool et attendre que ses processus aient démarré (et fini leur préchauffage)"""
+    executeur = _obtenir_executeur()
+    if isinstance(executeur, ProcessPoolExecutor):
+        await asyncio.gather(*(asyncio.wrap_future(executeur.submit(os.getpid)) for _ in range(ASYNC_WORKERS)))
+
+
+class _CorpsTropVolumineux(Exception):
+    pass
+
+
+async def _lire_corps(receive, taille_max):
+    morceaux = []
+    taille = 0
+    while True:
+        message = await receive()
+        morceau = message.get('body', b'')
+        taille += len(morceau)
+        if taille_max and taille > taille_max:
+            raise _CorpsTropVolumineux()
+        morceaux.append(morceau)
+        if not message.get('more_body'):
+            return b''.join(morceaux)
+
+
+async def _envoyer_json(send, contenu, statut, headers_supplementaires=()):
+    corps = json.dumps(contenu, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': statut,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(corps)).encode()),
+            (b'access-control-allow-origin', b'*'),
+            *headers_supplementaires,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': corps})
+
+
+def _rendre_dans_le_pool(document, type_document, output_format, theme, chemin, profil=None):
+    """Fonction de rendu du flux commun (traiter_creation), exécutée hors de la boucle
+
+    Les très longs PDF sont rendus par plages dans le pool de rendu_parallele ; les autres
+    documents dans le pool de l'application, avec le logo déjà téléchargé par la boucle
+    (en octets : la memoryview du magasin partagé ne passe pas d'un processus à l'autre).
+    """
+    if output_format == 'pdf' and rendu_parallele.eligible(document):
+        return rendu.rendre_document(document, type_document, output_format, theme, chemin, profil)
+    logo = assets.logo_en_cache(document.logo_url)
+    logo = bytes(logo) if logo is not None else None
+    return _obtenir_executeur().submit(
+        rendu.rendre_avec_logo, document, type_document, output_format, theme, logo, chemin, profil
+    ).result()
+
+
+def _reponse(scope, tenant, resultat):
+    """Réponse Flask du Resultat pour la requête ASGI, retourne (corps itérable, statut, en-têtes)
+
+    Même négociation que les routes Flask (ETag et réponse conditionnelle, Range, gzip/deflate) ;
+    les fichiers sont lus par blocs de TAILLE_BLOC.
+    """
+    headers = [(nom.decode('latin-1'), valeur.decode('latin-1')) for nom, valeur in scope['headers']]
+    environ = {'wsgi.file_wrapper': lambda fichier, taille_bloc=TAILLE_BLOC: FileWrapper(fichier, TAILLE_BLOC)}
+    with flask_app.test_request_context(scope['path'], method=scope['method'], headers=headers,
+                                        query_string=scope.get('query_string', b''), environ_base=environ):
+        g.tenant = tenant
+        response = reponse_creation(resultat)
+        response = flask_app.process_response(response)  # after_request : CORS, compression du JSON
+        corps, statut, headers = response.get_wsgi_response(request.environ)
+    return corps, int(statut.split(' ', 1)[0]), headers
+
+
+async def _envoyer_reponse(send, scope, tenant, resultat):
+    corps, statut, headers = await asyncio.to_thread(_reponse, scope, tenant, resultat)
+    await send({
+        'type': 'http.response.start',
+        'status': statut,
+        'headers': [(nom.lower().encode('latin-1'), valeur.encode('latin-1')) for nom, valeur in headers],
+    })
+    blocs = iter(corps)
+    try:
+        while True:
+            bloc = await asyncio.to_thread(next, blocs, None)
+            if bloc is None:
+                break
+            if bloc:
+                await send({'type': 'http.response.body', 'body': bloc, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(corps, 'close'):
+            await asyncio.to_thread(corps.close)
+
+
+async def _creer_document(scope, receive, send, type_document):
+    """POST /api/devis et /api/facture : lecture de la requête et envoi de la réponse
+
+    Le traitement lui-même (traiter_creation, partagé avec les routes Flask) s'exécute
+    dans un thread ; seul le téléchargement du logo se fait sur la boucle.
+    """
+    headers = {nom.decode('latin-1').lower(): valeur.decode('latin-1') for nom, valeur in scope['headers']}
+    tenant, erreur = await asyncio.to_thread(verifier_cles_api, headers.get('x-api-key-1'), headers.get('x-api-key-2'))
+    if erreur:
+        return await _envoyer_json(send, {"error": erreur}, 401)
+
+    taille_max = flask_app.config['MAX_CONTENT_LENGTH']
+    try:
+        corps = await _lire_corps(receive, taille_max)
+    except _CorpsTropVolumineux:
+        return await _envoyer_json(send, {
+            "error": "❌ Requête trop volumineuse",
+            "message": f"La taille maximale acceptée est de {taille_max // (1024 * 1024)} Mo"
+        }, 413)
+    try:
+        data = charger_json(corps) if corps else None
+    except ValueError:
+        data = None
+
+    try:
+        document, theme, profil = preparer_creation(data, type_document)
+        # Le logo est téléchargé sans bloquer la boucle ; le rendu le reprend du cache
+        await assets.telecharger_logo_async(document.logo_url)
+        resultat = await asyncio.to_thread(traiter_creation, data, document, type_document, theme, profil, tenant,
+                                           _rendre_dans_le_pool)
+    except Exception as e:
+        contenu, statut, entetes = contenu_erreur(e)
+        return await _envoyer_json(send, contenu, statut, [
+            (nom.lower().encode('latin-1'), valeur.encode('latin-1')) for nom, valeur in entetes.items()
+        ])
+
+    await _envoyer_reponse(send, scope, tenant, resultat)
+
+
+ROUTES_ASYNC = {
+    ('POST', '/api/devis'): 'devis',
+    ('POST', '/api/facture'): 'facture',
+}
+
+
+async def _lifespan(receive, send):
+    global _executeur
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            prechauffage.demarrer()
+            await _demarrer_executeur()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executeur is not None:
+                _executeur.shutdown(wait=True)
+                _executeur = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Application ASGI"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    type_document = ROUTES_ASYNC.get((scope.get('method'), scope.get('path')))
+    if scope['type'] == 'http' and type_document:
+        return await _creer_document(scope, receive, send, type_document)
+
+    return await _wsgi(scope, receive, send)
@@ -1,13 +1,44 @@
 # app_students.py - Application Flask pour les élèves
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, g, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
-import uuid
 import os
+import copy
+import hashlib
+from urllib.parse import quote
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from models import Devis, DevisItem, Facture
-from pdf_generator_students import generate_student_style_devis, generate_pdf_facture
-from pdf_generator_students import generate_student_style_devis, generate_pdf_facture, generate_pdf_devis
+from pdf_generator_students import (generate_student_style_devis, generate_pdf_facture, generate_pdf_devis,
+                                    generate_pdf_factures)
+from document_store import DocumentStore
+from devis_store import CHAMPS_ARTICLE, DevisStore
+from archive import CRITERES, LIMITE_PAR_DEFAUT, Archive, date_iso
+from numerotation import numerotation_depuis_environnement
+from apercu import ApercuIndisponible, CacheApercus, empreinte_document, lire_largeur, moteur as moteur_apercu
+from importation import MIMETYPE_XLSX, ImportInvalide, ZipEnFlux, csv_resultats, lire_lignes, regrouper_devis
+from assets import telecharger_logo
+import rendu_parallele
+from rendu import MIMETYPES, rendre_document
+from themes import THEMES_DISPONIBLES, THEME_PAR_DEFAUT
+from validation import (CONVERSION_SCHEMA, DEVIS_SCHEMA, FACTURE_SCHEMA, ITEM_SCHEMA, MAX_ARTICLES,
+                        MODIFICATION_SCHEMA, ErreurValidation)
+from json_provider import FastJSONProvider
+from compression import TYPES_COMPRESSIBLES, choisir_encodage, compresser, compresser_fichier
+from paragraph_cache import CACHE as cache_paragraphes
+from row_cache import CACHE as cache_lignes
+from shared_assets import MAGASIN as ressources_partagees
+from warmup import ERREUR as PRECHAUFFAGE_ERREUR, Prechauffage
+from pdf_profiles import PROFILS_PDF_DISPONIBLES, PROFIL_PDF_PAR_DEFAUT
+from api_keys import registre_depuis_environnement
+from cost import CoutExcessif, admettre, estimer_cout, estimer_cout_lot
+from jobs import FileRendus
+from rate_limit import QuotaDepasse, limiteur_depuis_environnement
+from werkzeug.exceptions import HTTPException
+
 # Créer l'application Flask
 app = Flask(__name__)
 CORS(app)  # Permet les requêtes depuis d'autres domaines
@@ -16,34 +47,744 @@ CORS(app)  # Permet les requêtes depuis d'autres domaines
 app.config['UPLOAD_FOLDER'] = 'generated'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Clés API (à stocker dans des variables d'environnement en production)
-API_KEY_1 = os.environ.get('API_KEY_1', 'your-secret-key-1-here')
-API_KEY_2 = os.environ.get('API_KEY_2', 'your-secret-key-2-here')
+# JSON : décodeur rapide si disponible, et taille maximale des requêtes
+app.json = FastJSONProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_MO', 16)) * 1024 * 1024
+
+# Réponses JSON constantes déjà sérialisées (corps, ETag, variantes compressées)
+_reponses_json = {}
+
+# Derrière nginx / Apache : déléguer l'envoi des fichiers au serveur (X-Sendfile)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
+# Stockage des documents générés (TTL et quota disque configurables)
+documents = DocumentStore(
+    app.config['UPLOAD_FOLDER'],
+    ttl=int(os.environ.get('DOCUMENTS_TTL', 3600)),
+    quota_octets=int(os.environ.get('DOCUMENTS_QUOTA_MO', 500)) * 1024 * 1024,
+    conserver_factures=os.environ.get('DOCUMENTS_CONSERVER_FACTURES', '0') == '1'
+)
+documents.demarrer_nettoyage()
+
+# Devis générés, convertibles en facture sans renvoyer leur contenu
+devis_enregistres = DevisStore(
+    os.environ.get('DEVIS_DB', os.path.join(app.config['UPLOAD_FOLDER'], 'devis.sqlite3')),
+    conservation_jours=int(os.environ.get('DEVIS_CONSERVATION_JOURS', 365))
+)
+
+# Archive consultable des documents générés (GET /api/documents)
+archive = Archive(os.environ.get('ARCHIVE_DB', os.path.join(app.config['UPLOAD_FOLDER'], 'archive.sqlite3')))
+
+# Aperçus PNG de la première page, par empreinte du contenu (partagés entre workers)
+apercus = CacheApercus(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'apercus'),
+    ttl=int(os.environ.get('APERCUS_TTL', 86400))
+)
+
+# Numéros de devis et de factures par client et par année (factures sans trou)
+numerotation = numerotation_depuis_environnement(app.config['UPLOAD_FOLDER'])
 
-# Thèmes disponibles
-THEMES_DISPONIBLES = ['bleu', 'vert', 'rouge', 'violet', 'orange', 'noir']
+# Clés API par client : API_KEYS_DB (SQLite), API_KEYS_FILE (JSON) ou API_KEY_1 / API_KEY_2
+registre_cles = registre_depuis_environnement()
+
+# Limites de débit et de rendus simultanés par client (RATE_LIMIT_DB pour partager entre workers)
+limiteur = limiteur_depuis_environnement()
+
+# Rendus coûteux exécutés en tâche de fond (seuil et budget : voir cost.py)
+file_rendus = FileRendus(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'),
+    workers=int(os.environ.get('JOBS_WORKERS', 1)),
+    max_en_attente=int(os.environ.get('JOBS_MAX_EN_ATTENTE', 100)),
+    ttl=int(os.environ.get('DOCUMENTS_TTL', 3600))
+)
+
+# Nombre maximal de factures regroupées dans un même PDF
+LOT_FACTURES_MAX = int(os.environ.get('LOT_FACTURES_MAX', 100))
+
+# Numéro affiché sur l'aperçu d'un document qui n'a pas encore de numéro
+NUMERO_APERCU = 'APERÇU'
+# Articles mis en page pour un aperçu : la première page en contient au plus une quinzaine
+# (une ligne chacun), les suivants ne changent pas son contenu (totaux déjà calculés)
+APERCU_ARTICLES_MAX = 50
+
+# Pool utilisé quand plusieurs formats sont demandés pour le même document
+_rendus_paralleles = ThreadPoolExecutor(max_workers=len(MIMETYPES))
+
+# Import en masse (POST /api/import) : devis rendus en parallèle, nombre maximal par fichier
+IMPORT_PARALLELISME = int(os.environ.get('IMPORT_PARALLELISME', 2))
+IMPORT_MAX_DEVIS = int(os.environ.get('IMPORT_MAX_DEVIS', 1000))
+IMPORT_TENTATIVES = 5
+_rendus_import = ThreadPoolExecutor(max_workers=IMPORT_PARALLELISME)
+
+def verifier_cles_api(key1, key2):
+    """Vérifier les 2 clés API, retourne (tenant, None) si elles sont valides, sinon (None, message d'erreur)"""
+    return registre_cles.verifier(key1, key2)
 
 def require_api_keys(f):
-    """Décorateur pour vérifier les 2 clés API"""
+    """Décorateur pour vérifier les 2 clés API et rattacher le client (g.tenant) à la requête"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         # Vérifier les headers
-        key1 = request.headers.get('X-API-Key-1')
-        key2 = request.headers.get('X-API-Key-2')
-        
-        if not key1 or not key2:
-            return jsonify({"error": "Clés API manquantes"}), 401
-        
-        if key1 != API_KEY_1 or key2 != API_KEY_2:
-            return jsonify({"error": "Clés API invalides"}), 401
+        tenant, erreur = verifier_cles_api(request.headers.get('X-API-Key-1'), request.headers.get('X-API-Key-2'))
+        if erreur:
+            return jsonify({"error": erreur}), 401
         
+        g.tenant = tenant
         return f(*args, **kwargs)
     return decorated_function
 
-@app.route('/', methods=['GET'])
-def documentation():
+def choisir_theme(data):
+    """Récupérer et valider le thème"""
+    theme = data.get('theme', THEME_PAR_DEFAUT)
+    if theme not in THEMES_DISPONIBLES:
+        theme = THEME_PAR_DEFAUT  # fallback vers le thème par défaut
+    return theme
+
+def choisir_profil(data):
+    """Profil de sortie PDF : "fast", "compact" ou "archive" (profil par défaut sinon)"""
+    profil = data.get('profil', PROFIL_PDF_PAR_DEFAUT)
+    if profil not in PROFILS_PDF_DISPONIBLES:
+        profil = PROFIL_PDF_PAR_DEFAUT
+    return profil
+
+def lire_formats(data):
+    """Formats demandés : "pdf" ou une liste comme ["pdf", "docx"], retourne None si l'un n'est pas supporté"""
+    formats = data.get('format', 'pdf')
+    if isinstance(formats, str):
+        formats = [formats]
+    if not isinstance(formats, list) or not formats:
+        return None
+    
+    formats = list(dict.fromkeys(str(f).lower() for f in formats))
+    if any(f not in MIMETYPES for f in formats):
+        return None
+    return formats
+
+def construire_items(items):
+    """Créer les objets DevisItem à partir des articles validés"""
+    return [DevisItem(**item) for item in items]
+
+def construire_devis(data):
+    """Valider les données JSON et créer l'objet Devis (lève ErreurValidation)"""
+    valeurs = DEVIS_SCHEMA.valider(data)
+    items = valeurs.pop('items')
+    
+    devis = Devis(**valeurs)
+    devis.items = construire_items(items)
+    devis.calculate_totals()
+    return devis
+
+def construire_facture(data):
+    """Valider les données JSON et créer l'objet Facture (lève ErreurValidation)"""
+    valeurs = FACTURE_SCHEMA.valider(data)
+    items = valeurs.pop('items')
+    
+    facture = Facture(**valeurs)
+    facture.items = construire_items(items)
+    facture.calculate_totals()
+    return facture
+
+# Champs propres au devis, absents de la facture qui en est issue
+CHAMPS_DEVIS_SEULEMENT = ('date_expiration', 'texte_intro', 'texte_conclusion', 'items',
+                          'total_ht', 'total_tva', 'total_ttc')
+
+def construire_facture_depuis_devis(devis, data):
+    """Créer la Facture d'un devis enregistré : articles et totaux repris sans recalcul"""
+    valeurs = CONVERSION_SCHEMA.valider(data)
+    champs = {nom: valeur for nom, valeur in vars(devis).items() if nom not in CHAMPS_DEVIS_SEULEMENT}
+    champs.update(valeurs, reference_devis=devis.numero)
+    
+    facture = Facture(**champs)
+    facture.items = devis.items
+    facture.total_ht, facture.total_tva, facture.total_ttc = devis.total_ht, devis.total_tva, devis.total_ttc
+    return facture
+
+def _erreur(champ, message):
+    return ErreurValidation([{"champ": champ, "message": message}])
+
+def _prefixer(erreur, prefixe):
+    """ErreurValidation d'un article, champs préfixés par sa position dans la requête"""
+    return ErreurValidation([
+        {"champ": prefixe + (f".{e['champ']}" if e['champ'] else ''), "message": f"{prefixe} : {e['message']}"}
+        for e in erreur.erreurs
+    ])
+
+def modifier_articles(devis, data):
+    """Appliquer au devis les modifications d'articles de PATCH /api/devis/<numero>
+
+    "modifier" : [{"index": i, champs modifiés...}], "supprimer" : [i, ...] et "ajouter" :
+    [articles] ; les index désignent les articles avant modification. Les articles
+    modifiés sont revalidés, les totaux recalculés.
     """
-    Page d'accueil avec la documentation de l'API
+    if not isinstance(data, dict):
+        raise _erreur(None, "Aucune donnée reçue")
+    anciens = devis.items
+    ajouts = construire_items(MODIFICATION_SCHEMA.valider(data)['ajouter'])
+
+    supprimer = data.get('supprimer') or []
+    if not isinstance(supprimer, list):
+        raise _erreur('supprimer', "'supprimer' doit être une liste d'index")
+    for position, index in enumerate(supprimer):
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(anciens):
+            raise _erreur(f'supprimer[{position}]', f"'supprimer[{position}]' doit être l'index d'un article (0 à {len(anciens) - 1})")
+    supprimes = set(supprimer)
+
+    modifier = data.get('modifier') or []
+    if not isinstance(modifier, list):
+        raise _erreur('modifier', "'modifier' doit être une liste")
+    modifies = {}
+    for position, modification in enumerate(modifier):
+        prefixe = f'modifier[{position}]'
+        index = modification.get('index') if isinstance(modification, dict) else None
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(anciens):
+            raise _erreur(f'{prefixe}.index', f"'{prefixe}.index' doit être l'index d'un article (0 à {len(anciens) - 1})")
+        if index in supprimes or index in modifies:
+            raise _erreur(f'{prefixe}.index', f"'{prefixe}.index' : l'article {index} est déjà modifié ou supprimé")
+        champs = {nom: getattr(anciens[index], nom) for nom in CHAMPS_ARTICLE}
+        champs.update((nom, valeur) for nom, valeur in modification.items() if nom != 'index')
+        try:
+            modifies[index] = DevisItem(**ITEM_SCHEMA.valider(champs))
+        except ErreurValidation as e:
+            raise _prefixer(e, prefixe)
+
+    touches = supprimes | set(modifies)
+    if ajouts:
+        touches.add(len(anciens))
+    if not touches:
+        raise _erreur(None, "Aucune modification : renseignez 'modifier', 'supprimer' ou 'ajouter'")
+
+    items = [modifies.get(index, item) for index, item in enumerate(anciens) if index not in supprimes] + ajouts
+    if not items:
+        raise _erreur('items', "Au moins un article est requis")
+    if len(items) > MAX_ARTICLES:
+        raise _erreur('items', f"'items' ne doit pas contenir plus de {MAX_ARTICLES} éléments")
+    devis.items = items
+    devis.calculate_totals()
+
+def construire_lot_factures(data):
+    """Valider la liste "factures" et créer les objets Facture (erreurs préfixées par factures[i])"""
+    factures = data.get('factures') if isinstance(data, dict) else None
+    if not isinstance(factures, list) or not factures:
+        raise ErreurValidation([{"champ": "factures", "message": "'factures' doit être une liste non vide"}])
+    if len(factures) > LOT_FACTURES_MAX:
+        raise ErreurValidation([{"champ": "factures",
+                                 "message": f"'factures' ne doit pas dépasser {LOT_FACTURES_MAX} éléments"}])
+    
+    resultat = []
+    for index, facture in enumerate(factures):
+        try:
+            resultat.append(construire_facture(facture))
+        except ErreurValidation as e:
+            raise ErreurValidation([
+                {"champ": f"factures[{index}]" + (f".{erreur['champ']}" if erreur['champ'] else ''),
+                 "message": f"factures[{index}] : {erreur['message']}"}
+                for erreur in e.erreurs
+            ])
+    return resultat
+
+def numeroter(document, type_document, tenant_id):
+    """Attribuer le prochain numéro si la requête n'en fournit pas (une fois la requête admise)
+
+    Retourne True si le numéro vient d'être attribué par le service.
+    """
+    if document.numero:
+        return False
+    document.numero = numerotation.allouer(type_document, tenant_id)
+    return True
+
+def conclure_numeros(numerotes, type_document, tenant_id, doc_id=None, erreur=None):
+    """Consigner l'issue des numéros de facture attribués : émis sous doc_id, ou annulés par l'erreur
+
+    Un échec du journal n'empêche pas de servir le document ni de remonter l'erreur du rendu.
+    """
+    if type_document != 'facture':
+        return
+    for document in numerotes:
+        try:
+            if erreur is None:
+                numerotation.confirmer(document.numero, tenant_id, doc_id)
+            else:
+                numerotation.annuler(document.numero, tenant_id, f"{type(erreur).__name__}: {erreur}")
+        except Exception:
+            app.logger.exception("Erreur du journal de numérotation pour %s", document.numero)
+
+def enregistrer_document(document, type_document, output_format, theme, chemin_temporaire, tenant_id=None):
+    """Publier un document rendu dans le stockage, retourne son identifiant"""
+    return documents.enregistrer(
+        chemin_temporaire,
+        f"{type_document}_{document.numero}_{theme}.{output_format}",
+        MIMETYPES[output_format],
+        type_document=type_document,
+        numero=document.numero,
+        theme=theme,
+        format=output_format,
+        tenant=tenant_id
+    )
+
+def generer_et_enregistrer(document, type_document, output_format, theme, tenant_id=None, profil=None,
+                           rendre=rendre_document):
+    """Rendre le document dans un fichier temporaire unique puis le publier
+
+    rendre : fonction de rendu, de même signature que rendre_document (pool de processus
+    de app_async.py).
+    """
+    chemin = documents.chemin_temporaire(output_format)
+    rendre(document, type_document, output_format, theme, chemin, profil)
+    return enregistrer_document(document, type_document, output_format, theme, chemin, tenant_id)
+
+def archiver(document, type_document, doc_id, tenant_id=None):
+    """Ajouter le document à l'archive (un échec n'empêche pas de le servir)"""
+    try:
+        archive.enregistrer(document, type_document, tenant_id, doc_id)
+    except Exception:
+        app.logger.exception("Erreur d'archivage du document %s", document.numero)
+
+def generer_apercu(document, type_document, theme, largeur, tenant, profil=None):
+    """Aperçu PNG de la première page d'un document pas encore généré, retourne (chemin, empreinte)
+
+    Seule la première page est mise en page et dessinée. Aucun numéro n'est attribué
+    (un numéro de facture ne doit pas être consommé par un aperçu) et rien n'est
+    enregistré ni archivé.
+    """
+    empreinte = empreinte_document(document, type_document, theme, profil)
+    chemin = apercus.obtenir(empreinte, largeur)
+    if chemin:
+        return chemin, empreinte
+    if moteur_apercu() is None:
+        raise ApercuIndisponible()
+    
+    cout = estimer_cout(document)
+    admettre(cout)  # budget maximal seulement : un aperçu est toujours rendu dans la requête
+    if len(document.items) > APERCU_ARTICLES_MAX:
+        document = copy.copy(document)
+        document.items = document.items[:APERCU_ARTICLES_MAX]
+    numero = document.numero
+    chemin_pdf = documents.chemin_temporaire('pdf')
+    with limiteur.reserver(tenant, cout):
+        try:
+            document.numero = numero or NUMERO_APERCU
+            rendre_document(document, type_document, 'pdf', theme, chemin_pdf, profil, mode='apercu')
+            chemin = apercus.produire(empreinte, largeur, chemin_pdf)
+        finally:
+            document.numero = numero
+            if os.path.exists(chemin_pdf):
+                os.remove(chemin_pdf)
+    return chemin, empreinte
+
+def mettre_en_page(document, type_document, theme, tenant, profil=None):
+    """Dry run : totaux, nombre de pages et page de chaque article, sans dessin ni fichier
+
+    Passe de mise en page ReportLab seule (wrap/split des flowables) : ni numéro attribué,
+    ni document enregistré.
+    """
+    cout = estimer_cout(document)
+    admettre(cout)  # budget maximal seulement : la mise en page est toujours faite dans la requête
+    generateur = generate_pdf_devis if type_document == 'devis' else generate_pdf_facture
+    with limiteur.reserver(tenant, cout):
+        debut = time.perf_counter()
+        mise_en_page = generateur(document, theme=theme, profil=profil, mode='mise_en_page')
+        duree = time.perf_counter() - debut
+    
+    return {
+        "dry_run": True,
+        "type": type_document,
+        "numero": document.numero or None,
+        "pages": mise_en_page['pages'],
+        "articles": [
+            {"description": item.description, "total_ht": round(item.total_ht, 2), "page": page}
+            for item, page in zip(document.items, mise_en_page['pages_articles'])
+        ],
+        "total_ht": round(document.total_ht, 2),
+        "total_tva": round(document.total_tva, 2),
+        "total_ttc": round(document.total_ttc, 2),
+        "cout_estime": cout,
+        "duree_ms": round(duree * 1000, 1)
+    }
+
+def regrouper_en_zip(document, type_document, theme, ids, tenant_id=None):
+    """Publier une archive ZIP contenant les documents déjà enregistrés (un par format)"""
+    chemin = documents.chemin_temporaire('zip')
+    with zipfile.ZipFile(chemin, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for doc_id in ids.values():
+            meta = documents.obtenir(doc_id)
+            archive.write(meta['chemin'], arcname=meta['nom'])
+    
+    return documents.enregistrer(
+        chemin,
+        f"{type_document}_{document.numero}_{theme}.zip",
+        'application/zip',
+        type_document=type_document,
+        numero=document.numero,
+        theme=theme,
+        format='zip',
+        documents=ids,
+        tenant=tenant_id
+    )
+
+def generer_formats(document, type_document, formats, theme, tenant_id=None, profil=None,
+                    rendre=rendre_document):
+    """Rendre le document dans tous les formats demandés, retourne (id à envoyer, ids par format)
+
+    Le modèle et ses totaux sont construits une seule fois ; le logo est téléchargé
+    avant de lancer les rendus en parallèle, qui le reprennent tous du cache.
+    """
+    if len(formats) == 1:
+        doc_id = generer_et_enregistrer(document, type_document, formats[0], theme, tenant_id, profil, rendre)
+        archiver(document, type_document, doc_id, tenant_id)
+        return doc_id, {formats[0]: doc_id}
+    
+    telecharger_logo(document.logo_url)
+    futures = {
+        output_format: _rendus_paralleles.submit(
+            generer_et_enregistrer, document, type_document, output_format, theme, tenant_id, profil, rendre
+        )
+        for output_format in formats
+    }
+    ids = {output_format: future.result() for output_format, future in futures.items()}
+    doc_id = regrouper_en_zip(document, type_document, theme, ids, tenant_id)
+    archiver(document, type_document, doc_id, tenant_id)
+    return doc_id, ids
+
+def generer_en_arriere_plan(document, type_document, formats, theme, tenant_id=None, profil=None,
+                            numero_attribue=False):
+    """Rendu exécuté par la file de tâches, retourne le résultat enregistré dans la tâche"""
+    numerotes = [document] if numero_attribue else []
+    try:
+        doc_id, ids = generer_formats(document, type_document, formats, theme, tenant_id, profil)
+    except Exception as e:
+        conclure_numeros(numerotes, type_document, tenant_id, erreur=e)
+        raise
+    conclure_numeros(numerotes, type_document, tenant_id, doc_id)
+    return {"document_id": doc_id, "documents": ids}
+
+def soumettre_rendu(document, type_document, formats, theme, cout, tenant_id=None, profil=None,
+                    numero_attribue=False):
+    """Mettre le rendu en file, retourne le corps de la réponse 202"""
+    job_id = file_rendus.soumettre(
+        generer_en_arriere_plan, document, type_document, formats, theme, tenant_id, profil, numero_attribue,
+        tenant=tenant_id, type_document=type_document, numero=document.numero, cout_estime=cout
+    )
+    return contenu_tache(job_id, cout)
+
+def contenu_tache(job_id, cout):
+    """Corps de la réponse 202 d'un rendu mis en file"""
+    return {
+        "message": "⏳ Document en cours de génération",
+        "job_id": job_id,
+        "statut": "en_attente",
+        "cout_estime": cout,
+        "url": f"/api/jobs/{job_id}"
+    }
+
+def generer_lot_factures(factures, theme, tenant_id=None, profil=None):
+    """Rendre un lot de factures dans un seul PDF et le publier, retourne son identifiant"""
+    chemin = documents.chemin_temporaire('pdf')
+    generate_pdf_factures(factures, theme=theme, filename=chemin, profil=profil)
+    numeros = [facture.numero for facture in factures]
+    doc_id = documents.enregistrer(
+        chemin,
+        f"factures_{numeros[0]}_{numeros[-1]}_{theme}.pdf",
+        MIMETYPES['pdf'],
+        type_document='facture',
+        numero=numeros[0],
+        numeros=numeros,
+        theme=theme,
+        format='pdf',
+        tenant=tenant_id
+    )
+    for facture in factures:
+        archiver(facture, 'facture', doc_id, tenant_id)
+    return doc_id
+
+def generer_lot_en_arriere_plan(factures, theme, tenant_id=None, profil=None, numerotees=()):
+    """Rendu d'un lot exécuté par la file de tâches (numerotees : factures numérotées par le service)"""
+    try:
+        doc_id = generer_lot_factures(factures, theme, tenant_id, profil)
+    except Exception as e:
+        conclure_numeros(numerotees, 'facture', tenant_id, erreur=e)
+        raise
+    conclure_numeros(numerotees, 'facture', tenant_id, doc_id)
+    return {"document_id": doc_id, "documents": {"pdf": doc_id}}
+
+def importer_devis(premiere_ligne, numero, data, theme, output_format, tenant, profil=None):
+    """Valider, rendre et publier un devis importé (exécuté dans le pool), retourne sa ligne de résultat"""
+    resultat = {'ligne': premiere_ligne, 'numero': numero, 'statut': 'erreur'}
+    if data is None:
+        resultat['erreur'] = "Numéro absent ou lignes du devis non consécutives"
+        return resultat
+    
+    try:
+        devis = construire_devis(data)
+        cout = estimer_cout(devis)
+        admettre(cout)  # seul le budget maximal s'applique : l'import entier est déjà en flux
+        for tentative in range(IMPORT_TENTATIVES):
+            try:
+                with limiteur.reserver(tenant, cout):
+                    doc_id = generer_et_enregistrer(devis, 'devis', output_format, theme, tenant.id, profil)
+                break
+            except QuotaDepasse as e:
+                # Un import avance au rythme des limites du client au lieu d'échouer
+                if tentative == IMPORT_TENTATIVES - 1:
+                    raise
+                time.sleep(e.retry_after)
+    except (ErreurValidation, CoutExcessif, QuotaDepasse) as e:
+        resultat['erreur'] = e.to_dict()['error']
+        return resultat
+    except Exception as e:
+        resultat['erreur'] = str(e)
+        return resultat
+    
+    archiver(devis, 'devis', doc_id, tenant.id)
+    devis_enregistres.enregistrer(devis, tenant.id)
+    resultat.update(statut='ok', document_id=doc_id, fichier=documents.obtenir(doc_id)['nom'],
+                    total_ht=f"{devis.total_ht:.2f}", total_ttc=f"{devis.total_ttc:.2f}")
+    return resultat
+
+def flux_import(lignes, theme, output_format, tenant, profil=None):
+    """Corps de la réponse de POST /api/import : ZIP des documents puis resultats.csv
+
+    Les devis sont rendus au plus IMPORT_PARALLELISME à la fois et ajoutés à l'archive
+    dans l'ordre du fichier, au fur et à mesure de la lecture de la requête.
+    """
+    archive_zip = ZipEnFlux()
+    resultats = []
+    en_cours = deque()
+    
+    def terminer(restants):
+        while len(en_cours) > restants:
+            resultat = en_cours.popleft().result()
+            resultats.append(resultat)
+            if resultat['statut'] == 'ok':
+                meta = documents.obtenir(resultat['document_id'])
+                yield archive_zip.ajouter_fichier(meta['chemin'], meta['nom'])
+    
+    try:
+        for index, (premiere_ligne, numero, data) in enumerate(regrouper_devis(lignes)):
+            if index >= IMPORT_MAX_DEVIS:
+                resultats.append({'ligne': premiere_ligne, 'numero': numero, 'statut': 'erreur',
+                                  'erreur': f"Import limité à {IMPORT_MAX_DEVIS} devis"})
+                break
+            en_cours.append(_rendus_import.submit(
+                importer_devis, premiere_ligne, numero, data, theme, output_format, tenant, profil
+            ))
+            yield from terminer(IMPORT_PARALLELISME)
+    except Exception as e:
+        # Fichier illisible en cours de route : l'archive reste valide avec les devis déjà rendus
+        resultats.append({'statut': 'erreur', 'erreur': str(e)})
+    
+    yield from terminer(0)
+    yield archive_zip.ajouter('resultats.csv', csv_resultats(resultats))
+    yield archive_zip.fermer()
+
+class Resultat:
+    """Issue d'une création de document, indépendante du transport (route Flask ou app_async.py)
+
+    Un document enregistré (doc_id), un aperçu PNG (apercu = (chemin, empreinte, largeur))
+    ou un corps JSON (contenu, statut) ; headers : en-têtes à ajouter à la réponse.
+    """
+    def __init__(self, doc_id=None, apercu=None, contenu=None, statut=200, headers=None):
+        self.doc_id = doc_id
+        self.apercu = apercu
+        self.contenu = contenu
+        self.statut = statut
+        self.headers = headers or {}
+
+def produire_document(document, type_document, formats, theme, tenant, profil=None, rendre=rendre_document):
+    """Rendu dans la requête pour les petits documents, en tâche de fond (202) pour les gros"""
+    cout = estimer_cout(document, len(formats))
+    arriere_plan = admettre(cout)
+    
+    with limiteur.reserver(tenant, cout):
+        numerotes = [document] if numeroter(document, type_document, tenant.id) else []
+        try:
+            if arriere_plan:
+                # La file borne elle-même le nombre de rendus simultanés : la réservation
+                # ne couvre que la soumission, le débit du client est débité du coût complet
+                contenu = soumettre_rendu(document, type_document, formats, theme, cout, tenant.id, profil,
+                                          bool(numerotes))
+            else:
+                doc_id, ids = generer_formats(document, type_document, formats, theme, tenant.id, profil, rendre)
+        except Exception as e:
+            # Numéro de facture sans document : annulé, avec sa cause, dans le journal
+            conclure_numeros(numerotes, type_document, tenant.id, erreur=e)
+            raise
+    
+    if arriere_plan:
+        return Resultat(contenu=contenu, statut=202, headers={'Location': contenu['url'], 'X-Render-Cost': str(cout)})
+    conclure_numeros(numerotes, type_document, tenant.id, doc_id)
+    # Le fichier (ZIP si plusieurs formats) et l'identifiant de chaque format
+    return Resultat(doc_id=doc_id, headers={
+        'X-Document-Ids': ', '.join(f"{f}={i}" for f, i in ids.items()),
+        'X-Render-Cost': str(cout)
+    })
+
+def preparer_creation(data, type_document):
+    """Valider le corps de POST /api/devis ou /api/facture, retourne (document, thème, profil)"""
+    document = construire_devis(data) if type_document == 'devis' else construire_facture(data)
+    return document, choisir_theme(data), choisir_profil(data)
+
+def traiter_creation(data, document, type_document, theme, profil, tenant, rendre=rendre_document):
+    """Suite de POST /api/devis et /api/facture, commune aux routes Flask et à app_async.py
+
+    Aperçu PNG, dry run ou rendu dans les formats demandés ; un devis est enregistré pour
+    être facturé ou modifié ensuite. Retourne un Resultat, lève les erreurs de contenu_erreur.
+    """
+    # Aperçu PNG de la première page au lieu du document
+    if data.get('preview') is True:
+        largeur = lire_largeur_apercu(data.get('largeur_apercu'), 'largeur_apercu')
+        chemin, empreinte = generer_apercu(document, type_document, theme, largeur, tenant, profil)
+        return Resultat(apercu=(chemin, empreinte, largeur))
+    
+    # Pagination et totaux seulement, sans produire de document
+    if data.get('dry_run') is True:
+        return Resultat(contenu=mettre_en_page(document, type_document, theme, tenant, profil))
+    
+    # Format(s) de sortie demandé(s)
+    formats = lire_formats(data)
+    if formats is None:
+        message = "Format non supporté. Utilisez 'pdf' ou 'docx'" if type_document == 'devis' else "Format non supporté"
+        return Resultat(contenu={"error": message}, statut=400)
+    
+    resultat = produire_document(document, type_document, formats, theme, tenant, profil, rendre)
+    if type_document == 'devis':
+        devis_enregistres.enregistrer(document, tenant.id)
+    return resultat
+
+def reponse_creation(resultat):
+    """Réponse Flask d'un Resultat (dans le contexte de la requête : g.tenant)"""
+    if resultat.apercu is not None:
+        response = envoyer_apercu(*resultat.apercu)
+    elif resultat.doc_id is not None:
+        response = envoyer_document(resultat.doc_id)
+    else:
+        response = jsonify(resultat.contenu)
+        response.status_code = resultat.statut
+    response.headers.update(resultat.headers)
+    return response
+
+def contenu_erreur(erreur):
+    """Corps JSON, statut et en-têtes de la réponse à une erreur de création de document"""
+    if isinstance(erreur, ErreurValidation):
+        return erreur.to_dict(), 400, {}
+    if isinstance(erreur, CoutExcessif):
+        return erreur.to_dict(), 413, {}
+    if isinstance(erreur, ApercuIndisponible):
+        return {"error": f"❌ {erreur}"}, 501, {}
+    if isinstance(erreur, QuotaDepasse):
+        return erreur.to_dict(), 429, {'Retry-After': str(erreur.retry_after)}
+    return {"error": str(erreur)}, 500, {}
+
+def reponse_erreur(erreur):
+    """Réponse Flask de contenu_erreur"""
+    contenu, statut, headers = contenu_erreur(erreur)
+    return jsonify(contenu), statut, headers
+
+def creer_document(document, type_document, formats, theme, profil=None):
+    """Réponse Flask de produire_document pour le client de la requête"""
+    return reponse_creation(produire_document(document, type_document, formats, theme, g.tenant, profil))
+
+def content_disposition(nom_fichier):
+    """En-tête Content-Disposition d'un téléchargement (nom non ASCII encodé selon la RFC 6266)"""
+    try:
+        nom_fichier.encode('ascii')
+        return f'attachment; filename={nom_fichier}'
+    except UnicodeEncodeError:
+        simple = nom_fichier.encode('ascii', 'ignore').decode('ascii')
+        return f"attachment; filename={simple}; filename*=UTF-8''{quote(nom_fichier)}"
+
+def envoyer_document(doc_id, download_name=None):
+    """Réponse de téléchargement d'un document du stockage (uniquement pour le client qui l'a créé)
+
+    Le contenu d'un identifiant ne change jamais : ETag fort (SHA-256 du fichier) et
+    cache privé immuable. Sans compression, le fichier est envoyé par sendfile (via
+    wsgi.file_wrapper) et les requêtes Range reçoivent une réponse 206 ; si le client
+    accepte gzip/deflate pour un type compressible, la réponse est compressée à la volée
+    et envoyée en chunked.
+    """
+    meta = documents.obtenir(doc_id)
+    if meta is None or meta.get('tenant') not in (None, g.tenant.id):
+        return jsonify({"error": "❌ Document introuvable ou expiré"}), 404
+    
+    etag = meta.get('sha256') or doc_id
+    nom = download_name or meta['nom']
+    encodage = None
+    if request.range is None:
+        encodage = choisir_encodage(request.accept_encodings, meta['mimetype'], meta['taille'])
+    
+    if encodage:
+        response = app.response_class(compresser_fichier(meta['chemin'], encodage), mimetype=meta['mimetype'],
+                                      direct_passthrough=True)
+        response.headers['Content-Encoding'] = encodage
+        response.headers['Content-Disposition'] = content_disposition(nom)
+        response.set_etag(f"{etag}-{encodage}")
+        response.make_conditional(request)
+    else:
+        response = send_file(
+            meta['chemin'],
+            mimetype=meta['mimetype'],
+            as_attachment=True,
+            download_name=nom,
+            etag=etag,
+            conditional=True
+        )
+    
+    if meta['mimetype'] in TYPES_COMPRESSIBLES:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None  # posé par send_file sans max_age
+    response.cache_control.private = True
+    response.cache_control.max_age = documents.ttl
+    response.cache_control.immutable = True
+    response.headers['X-Document-Id'] = doc_id
+    return response
+
+def envoyer_apercu(chemin, empreinte, largeur):
+    """Réponse PNG d'un aperçu (ETag : empreinte du contenu et largeur, cache privé immuable)"""
+    response = send_file(chemin, mimetype='image/png', etag=f"{empreinte}-{largeur}", conditional=True)
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = apercus.ttl
+    response.cache_control.immutable = True
+    return response
+
+def lire_largeur_apercu(valeur, champ):
+    """Largeur de l'aperçu en pixels, lève ErreurValidation si elle n'est pas entière"""
+    try:
+        return lire_largeur(valeur)
+    except (TypeError, ValueError):
+        raise ErreurValidation([{"champ": champ, "message": f"'{champ}' doit être un nombre entier de pixels"}])
+
+def reponse_json_cachee(cle, construire):
+    """Réponse JSON sérialisée une seule fois, avec ETag et réponse 304 si inchangée"""
+    entree = _reponses_json.get(cle)
+    if entree is None:
+        corps = app.json.dumps(construire()).encode('utf-8')
+        entree = (corps, hashlib.sha256(corps).hexdigest()[:32], {})
+        # Les clés datées (exemple du jour) remplacent les entrées des jours précédents
+        if isinstance(cle, tuple):
+            for ancienne in [k for k in list(_reponses_json) if isinstance(k, tuple) and k[0] == cle[0]]:
+                _reponses_json.pop(ancienne, None)
+        _reponses_json[cle] = entree
+    
+    corps, etag, variantes = entree
+    encodage = choisir_encodage(request.accept_encodings, 'application/json', len(corps))
+    if encodage:
+        # Variante compressée calculée une seule fois, avec son propre ETag
+        if encodage not in variantes:
+            variantes[encodage] = compresser(corps, encodage)
+        corps, etag = variantes[encodage], f"{etag}-{encodage}"
+    
+    response = app.response_class(corps, mimetype='application/json')
+    if encodage:
+        response.headers['Content-Encoding'] = encodage
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
+
+def construire_documentation():
+    """
+    Contenu de la documentation de l'API
     """
     doc = {
         "titre": "🧾 API Générateur de Devis - Version Formation",
@@ -53,12 +794,20 @@ def documentation():
         
         "endpoints": {
             "GET /": "Cette documentation",
-            "GET /health": "Vérifier l'état de l'API",
+            "GET /health": "Vérifier l'état de l'API (503 pendant le préchauffage, ?deep=1 pour le détail)",
             "GET /api/themes": "Obtenir la liste des thèmes disponibles",
             "GET /api/exemple": "Obtenir un exemple de données JSON",
             "POST /api/devis": "Créer un devis personnalisé",
             "POST /api/facture": "Créer une facture personnalisée",
+            "POST /api/devis/<numero>/facture": "Facturer un devis déjà généré sans renvoyer son contenu",
+            "PATCH /api/devis/<numero>": "Modifier les articles d'un devis enregistré (modifier, supprimer, ajouter) et le régénérer",
+            "POST /api/import": "Importer des devis depuis un CSV/XLSX (une ligne par article), réponse ZIP",
+            "POST /api/factures/lot": "Regrouper plusieurs factures ({\"factures\": [...]}) dans un seul PDF",
             "POST /api/test": "Générer un devis de test rapide",
+            "GET /api/documents": "Rechercher dans les documents générés (client, numéro, statut, dates, texte libre)",
+            "GET /api/documents/<id>": "Télécharger à nouveau un document généré (en-tête X-Document-Id)",
+            "GET /api/documents/<id>/preview": "Aperçu PNG de la première page d'un document PDF (?largeur=400)",
+            "GET /api/jobs/<id>": "Suivre un document volumineux généré en tâche de fond (réponse 202)",
             "GET /api/test-auth": "Tester l'authentification avec les clés API"
         },
         
@@ -129,37 +878,83 @@ fetch('/api/devis', {
         },
         
         "champs_obligatoires": ["client_nom", "items"],
-        "formats_supportes": ["pdf", "docx"],
+        "formats_supportes": ["pdf", "docx", ["pdf", "docx"]],
         "themes_disponibles": THEMES_DISPONIBLES,
+        "profils_pdf": PROFILS_PDF_DISPONIBLES,
+        "dry_run": "\"dry_run\": true renvoie les totaux, le nombre de pages et la page de chaque article, sans générer le document",
+        "apercu": "\"preview\": true (largeur optionnelle : \"largeur_apercu\") renvoie un PNG de la première page au lieu du document",
         "note": "📚 Parfait pour apprendre le développement d'API avec Flask !"
     }
     
-    return jsonify(doc), 200
+    return doc
+
+@app.route('/', methods=['GET'])
+def documentation():
+    """
+    Page d'accueil avec la documentation de l'API
+    """
+    return reponse_json_cachee('documentation', construire_documentation)
+
+def documents_prechauffage():
+    """Devis et facture du préchauffage : l'exemple de l'API, sans logo (ni réseau ni numéro)"""
+    donnees = dict(construire_exemple()['exemple_donnees'], logo_url='')
+    return {'devis': construire_devis(donnees), 'facture': construire_facture(donnees)}
+
+# Préchauffage des caches de rendu du worker (lancé par gunicorn.conf.py, sinon à la première requête)
+prechauffage = Prechauffage(rendre_document, documents_prechauffage, THEMES_DISPONIBLES, MIMETYPES)
+
+@app.before_request
+def demarrer_prechauffage():
+    prechauffage.demarrer()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """
-    Vérifier que l'API fonctionne correctement
+    Vérifier que l'API fonctionne correctement (503 tant que le préchauffage n'est pas terminé)
+
+    ?deep=1 : durées de référence du préchauffage, ressources partagées et rendu parallèle.
     """
-    return jsonify({
-        "status": "healthy",
-        "message": "✅ API Devis Formation - Tout fonctionne !",
+    profond = request.args.get('deep') in ('1', 'true')
+    etat = prechauffage.etat(detail=profond)
+    if prechauffage.pret:
+        status, message = "healthy", "✅ API Devis Formation - Tout fonctionne !"
+    elif etat['statut'] == PRECHAUFFAGE_ERREUR:
+        status, message = "unhealthy", "❌ Le rendu des documents échoue (voir prechauffage)"
+    else:
+        status, message = "starting", "⏳ Préchauffage du rendu en cours"
+    
+    corps = {
+        "status": status,
+        "message": message,
         "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        "version": "1.0.0"
-    }), 200
+        "version": "1.0.0",
+        "prechauffage": etat,
+        "cache_paragraphes": cache_paragraphes.statistiques(),
+        "cache_lignes": cache_lignes.statistiques()
+    }
+    if profond:
+        corps.update({
+            "ressources_partagees": ressources_partagees.statistiques(),
+            "rendu_parallele": {
+                "assemblage": rendu_parallele.moteur_assemblage(),
+                "processus": rendu_parallele.RENDU_PARALLELE_PROCESSUS,
+                "pages_min": rendu_parallele.RENDU_PARALLELE_PAGES
+            },
+            "apercu": moteur_apercu()
+        })
+    return jsonify(corps), 200 if prechauffage.pret else 503
 
 @app.route('/api/themes', methods=['GET'])
 def get_themes():
     """Retourner la liste des thèmes disponibles"""
-    return jsonify({
+    return reponse_json_cachee('themes', lambda: {
         "themes_disponibles": THEMES_DISPONIBLES,
-        "theme_par_defaut": "bleu"
-    }), 200
+        "theme_par_defaut": THEME_PAR_DEFAUT
+    })
 
-@app.route('/api/exemple', methods=['GET'])
-def get_exemple():
+def construire_exemple():
     """
-    Retourner un exemple complet de données JSON pour créer un devis
+    Exemple complet de données JSON pour créer un devis (dates du jour)
     """
     exemple = {
         "numero": f"FORM-{datetime.now().strftime('%Y%m%d')}-001",
@@ -230,7 +1025,7 @@ def get_exemple():
         ]
     }
     
-    return jsonify({
+    return {
         "message": "📝 Exemple de données pour créer un devis",
         "exemple_donnees": exemple,
         "total_exemple": sum((item['prix_unitaire'] * item['quantite']) - item.get('remise', 0) for item in exemple['items']),
@@ -242,7 +1037,15 @@ def get_exemple():
             "formats_disponibles": ["pdf", "docx"],
             "note": "💡 Les autres champs ont des valeurs par défaut si non spécifiés"
         }
-    }), 200
+    }
+
+@app.route('/api/exemple', methods=['GET'])
+def get_exemple():
+    """
+    Retourner un exemple complet de données JSON pour créer un devis
+    """
+    # L'exemple contient les dates du jour : une entrée de cache par jour
+    return reponse_json_cachee(('exemple', datetime.now().strftime('%Y%m%d')), construire_exemple)
 
 @app.route('/api/devis', methods=['POST'])
 @require_api_keys
@@ -251,197 +1054,151 @@ def create_devis():
     Créer un devis personnalisé avec les données fournies
     """
     try:
-        # Récupérer les données JSON
-        data = request.json
-        
-        if not data:
-            return jsonify({"error": "❌ Aucune donnée reçue"}), 400
-        
-        # Récupérer et valider le thème
-        theme = data.get('theme', 'bleu')
-        if theme not in THEMES_DISPONIBLES:
-            theme = 'bleu'  # fallback vers le thème par défaut
-        
-        # Valider les champs obligatoires
-        if not data.get('client_nom'):
-            return jsonify({"error": "❌ Le champ 'client_nom' est obligatoire"}), 400
+        # Récupérer et valider les données JSON
+        data = request.get_json(silent=True)
+        devis, theme, profil = preparer_creation(data, 'devis')
+        return reponse_creation(traiter_creation(data, devis, 'devis', theme, profil, g.tenant))
+    except HTTPException:
+        raise
+    except Exception as e:
+        return reponse_erreur(e)
+
+@app.route('/api/facture', methods=['POST'])
+@require_api_keys
+def create_facture():
+    """Créer une nouvelle facture avec les données reçues"""
+    try:
+        data = request.get_json(silent=True)
+        facture, theme, profil = preparer_creation(data, 'facture')
+        return reponse_creation(traiter_creation(data, facture, 'facture', theme, profil, g.tenant))
+    except HTTPException:
+        raise
+    except Exception as e:
+        return reponse_erreur(e)
+
+@app.route('/api/devis/<numero>/facture', methods=['POST'])
+@require_api_keys
+def create_facture_depuis_devis(numero):
+    """Facturer un devis déjà généré par ce client (corps optionnel : numéro, échéance, statut...)"""
+    try:
+        devis = devis_enregistres.obtenir(numero, g.tenant.id)
+        if devis is None:
+            return jsonify({"error": "❌ Devis introuvable", "numero": numero}), 404
         
-        if not data.get('items') or len(data.get('items', [])) == 0:
-            return jsonify({"error": "❌ Au moins un article est requis"}), 400
+        data = request.get_json(silent=True) or {}
+        facture = construire_facture_depuis_devis(devis, data)
+        theme = choisir_theme(data)
         
-        # Créer l'objet devis avec toutes les options modifiables
-        devis = Devis(
-            numero=data.get('numero', f"D-{datetime.now().year}-{str(uuid.uuid4())[:3]}"),
-            date_emission=data.get('date_emission', datetime.now().strftime('%d/%m/%Y')),
-            date_expiration=data.get('date_expiration', (datetime.now() + timedelta(days=30)).strftime('%d/%m/%Y')),
-            
-            # Informations fournisseur (tout modifiable)
-            fournisseur_nom=data.get('fournisseur_nom', 'Infinytia'),
-            fournisseur_adresse=data.get('fournisseur_adresse', '61 Rue De Lyon'),
-            fournisseur_ville=data.get('fournisseur_ville', '75012 Paris, FR'),
-            fournisseur_email=data.get('fournisseur_email', 'contact@infinytia.com'),
-            fournisseur_siret=data.get('fournisseur_siret', '93968736400017'),
-            fournisseur_telephone=data.get('fournisseur_telephone', '+33 1 23 45 67 89'),
-            
-            # Informations client
-            client_nom=data.get('client_nom'),
-            client_adresse=data.get('client_adresse', ''),
-            client_ville=data.get('client_ville', ''),
-            client_siret=data.get('client_siret', ''),
-            client_tva=data.get('client_tva', ''),
-            client_telephone=data.get('client_telephone', ''),
-            client_email=data.get('client_email', ''),
-            
-            # Logo de l'entreprise
-            logo_url=data.get('logo_url', ''),
-            
-            # Informations bancaires (modifiables)
-            banque_nom=data.get('banque_nom', 'BNP Paribas'),
-            banque_iban=data.get('banque_iban', 'FR76 3000 4008 2800 0123 4567 890'),
-            banque_bic=data.get('banque_bic', 'BNPAFRPPXXX'),
-            
-            # Conditions de paiement
-            conditions_paiement=data.get('conditions_paiement', 'Paiement à 30 jours'),
-            penalites_retard=data.get('penalites_retard', 'En cas de retard de paiement, une pénalité de 3 fois le taux d\'intérêt légal sera appliquée'),
-            
-            # Texte personnalisé
-            texte_intro=data.get('texte_intro', ''),
-            texte_conclusion=data.get('texte_conclusion', 'Nous restons à votre disposition pour toute information complémentaire.'),
-            
-            # Articles
-            items=[]
-        )
+        formats = lire_formats(data)
+        if formats is None:
+            return jsonify({"error": "Format non supporté"}), 400
         
-        # Ajouter les articles
-        for item_data in data.get('items', []):
-            item = DevisItem(
-                description=item_data.get('description'),
-                details=item_data.get('details', []),
-                quantite=item_data.get('quantite', 1),
-                prix_unitaire=item_data.get('prix_unitaire', 0),
-                tva_taux=item_data.get('tva_taux', 20),
-                remise=item_data.get('remise', 0)
-            )
-            devis.items.append(item)
+        return creer_document(facture, 'facture', formats, theme, choisir_profil(data))
         
-        # Calculer les totaux
-        devis.calculate_totals()
+    except HTTPException:
+        raise
+    except Exception as e:
+        return reponse_erreur(e)
+
+@app.route('/api/devis/<numero>', methods=['PATCH'])
+@require_api_keys
+def modifier_devis(numero):
+    """Modifier les articles d'un devis enregistré et le régénérer en entier"""
+    try:
+        devis = devis_enregistres.obtenir(numero, g.tenant.id)
+        if devis is None:
+            return jsonify({"error": "❌ Devis introuvable", "numero": numero}), 404
         
-        # Format de sortie demandé
-        output_format = data.get('format', 'pdf').lower()
+        data = request.get_json(silent=True)
+        modifier_articles(devis, data)
+        theme = choisir_theme(data)
         
-        if output_format == 'pdf':
-            filename = generate_pdf_devis(devis, theme=theme)
-            mimetype = 'application/pdf'
-        elif output_format == 'docx':
-            filename = generate_docx_devis(devis, theme=theme)
-            mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        else:
+        formats = lire_formats(data)
+        if formats is None:
             return jsonify({"error": "Format non supporté. Utilisez 'pdf' ou 'docx'"}), 400
         
-        # Retourner le fichier
-        return send_file(
-            filename,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=f"devis_{devis.numero}_{theme}.{output_format}"
-        )
+        response = creer_document(devis, 'devis', formats, theme, choisir_profil(data))
+        devis_enregistres.enregistrer(devis, g.tenant.id)
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return reponse_erreur(e)
 
-@app.route('/api/facture', methods=['POST'])
+@app.route('/api/import', methods=['POST'])
 @require_api_keys
-def create_facture():
-    """Créer une nouvelle facture avec les données reçues"""
+def import_devis():
+    """Importer des devis depuis un CSV (ou XLSX) à une ligne par article, réponse ZIP en flux
+
+    Le fichier est le corps de la requête (text/csv, ou le type XLSX) ou le champ "fichier"
+    d'un formulaire multipart ; theme, profil et format sont passés en paramètres d'URL.
+    """
+    fichier = request.files.get('fichier')
+    if fichier is not None:
+        flux = fichier.stream
+        mimetype = MIMETYPE_XLSX if (fichier.filename or '').lower().endswith('.xlsx') else fichier.mimetype
+    else:
+        flux, mimetype = request.stream, request.mimetype
+    
+    formats = lire_formats(request.args)
+    if formats is None or len(formats) != 1:
+        return jsonify({"error": "Format non supporté. Utilisez 'pdf' ou 'docx'"}), 400
+    
     try:
-        data = request.json
-        
-        # Récupérer et valider le thème
-        theme = data.get('theme', 'bleu')
-        if theme not in THEMES_DISPONIBLES:
-            theme = 'bleu'  # fallback vers le thème par défaut
-        
-        # Créer l'objet facture
-        facture = Facture(
-            numero=data.get('numero', f"F-{datetime.now().year}-{str(uuid.uuid4())[:3]}"),
-            date_emission=data.get('date_emission', datetime.now().strftime('%d/%m/%Y')),
-            date_echeance=data.get('date_echeance', (datetime.now() + timedelta(days=30)).strftime('%d/%m/%Y')),
-            
-            # Informations fournisseur
-            fournisseur_nom=data.get('fournisseur_nom', 'Infinytia'),
-            fournisseur_adresse=data.get('fournisseur_adresse', '61 Rue De Lyon'),
-            fournisseur_ville=data.get('fournisseur_ville', '75012 Paris, FR'),
-            fournisseur_email=data.get('fournisseur_email', 'contact@infinytia.com'),
-            fournisseur_siret=data.get('fournisseur_siret', '93968736400017'),
-            fournisseur_telephone=data.get('fournisseur_telephone', '+33 1 23 45 67 89'),
-            
-            # Informations client
-            client_nom=data.get('client_nom'),
-            client_adresse=data.get('client_adresse'),
-            client_ville=data.get('client_ville'),
-            client_siret=data.get('client_siret'),
-            client_tva=data.get('client_tva'),
-            client_telephone=data.get('client_telephone', ''),
-            client_email=data.get('client_email', ''),
-            
-            # Logo de l'entreprise
-            logo_url=data.get('logo_url', ''),
-            
-            # Informations bancaires
-            banque_nom=data.get('banque_nom', 'BNP Paribas'),
-            banque_iban=data.get('banque_iban', 'FR76 3000 4008 2800 0123 4567 890'),
-            banque_bic=data.get('banque_bic', 'BNPAFRPPXXX'),
-            
-            # Conditions et statut
-            conditions_paiement=data.get('conditions_paiement', 'Paiement à réception'),
-            penalites_retard=data.get('penalites_retard', 'En cas de retard de paiement, une pénalité de 3 fois le taux d\'intérêt légal sera appliquée'),
-            statut_paiement=data.get('statut_paiement', 'En attente'),
-            
-            # Références
-            numero_commande=data.get('numero_commande', ''),
-            reference_devis=data.get('reference_devis', ''),
-            
-            # Articles
-            items=[]
-        )
-        
-        # Ajouter les articles
-        for item_data in data.get('items', []):
-            item = DevisItem(
-                description=item_data.get('description'),
-                details=item_data.get('details', []),
-                quantite=item_data.get('quantite', 1),
-                prix_unitaire=item_data.get('prix_unitaire', 0),
-                tva_taux=item_data.get('tva_taux', 20),
-                remise=item_data.get('remise', 0)
-            )
-            facture.items.append(item)
+        lignes = lire_lignes(flux, mimetype)
+    except ImportInvalide as e:
+        return jsonify({"error": f"❌ {e}"}), 400
+    
+    flux_zip = flux_import(lignes, choisir_theme(request.args), formats[0], g.tenant, choisir_profil(request.args))
+    response = app.response_class(stream_with_context(flux_zip), mimetype='application/zip', direct_passthrough=True)
+    response.headers['Content-Disposition'] = content_disposition(f"import_devis_{datetime.now():%Y%m%d_%H%M%S}.zip")
+    return response
+
+@app.route('/api/factures/lot', methods=['POST'])
+@require_api_keys
+def create_lot_factures():
+    """Regrouper plusieurs factures dans un seul PDF (un signet et une numérotation par facture)"""
+    try:
+        data = request.get_json(silent=True)
+        factures = construire_lot_factures(data)
+        theme = choisir_theme(data)
+        profil = choisir_profil(data)
         
-        # Calculer les totaux
-        facture.calculate_totals()
+        cout = estimer_cout_lot(factures)
+        arriere_plan = admettre(cout)
         
-        # Format de sortie
-        output_format = data.get('format', 'pdf').lower()
+        with limiteur.reserver(g.tenant, cout):
+            numerotees = [facture for facture in factures if numeroter(facture, 'facture', g.tenant.id)]
+            try:
+                if arriere_plan:
+                    job_id = file_rendus.soumettre(
+                        generer_lot_en_arriere_plan, factures, theme, g.tenant.id, profil, numerotees,
+                        tenant=g.tenant.id, type_document='facture', numero=factures[0].numero,
+                        nb_factures=len(factures), cout_estime=cout
+                    )
+                else:
+                    doc_id = generer_lot_factures(factures, theme, g.tenant.id, profil)
+            except Exception as e:
+                conclure_numeros(numerotees, 'facture', g.tenant.id, erreur=e)
+                raise
+            if not arriere_plan:
+                conclure_numeros(numerotees, 'facture', g.tenant.id, doc_id)
         
-        if output_format == 'pdf':
-            filename = generate_pdf_facture(facture, theme=theme)
-            mimetype = 'application/pdf'
-        elif output_format == 'docx':
-            filename = generate_docx_facture(facture, theme=theme)
-            mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        if arriere_plan:
+            contenu = contenu_tache(job_id, cout)
+            response = jsonify(contenu)
+            response.status_code = 202
+            response.headers['Location'] = contenu['url']
         else:
-            return jsonify({"error": "Format non supporté"}), 400
-        
-        return send_file(
-            filename,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=f"facture_{facture.numero}_{theme}.{output_format}"
-        )
+            response = envoyer_document(doc_id)
+        response.headers['X-Render-Cost'] = str(cout)
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return reponse_erreur(e)
 
 @app.route('/api/test', methods=['POST'])
 @require_api_keys
@@ -526,26 +1283,112 @@ def test_devis():
         devis.calculate_totals()
         
         # Générer le PDF
-        filename = generate_pdf_devis(devis)
+        doc_id = generer_et_enregistrer(devis, 'devis', 'pdf', 'bleu', g.tenant.id)
         
         print(f"🧪 Devis de test généré : {test_data['numero']}")
         
-        return send_file(
-            filename,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"devis_test_{test_data['numero']}.pdf"
-        )
+        return envoyer_document(doc_id, download_name=f"devis_test_{test_data['numero']}.pdf")
         
     except Exception as e:
         print(f"❌ Erreur test: {str(e)}")
         return jsonify({"error": f"Erreur lors du test: {str(e)}"}), 500
 
+@app.route('/api/documents', methods=['GET'])
+@require_api_keys
+def list_documents():
+    """Rechercher dans les documents générés par ce client (pagination par curseur)
+
+    Paramètres : type, numero, client_nom, client_siret, statut_paiement, reference_devis
+    (égalité), date_min / date_max (date d'émission), q (texte libre sur le client et les
+    articles), limite, curseur (valeur "suivant" de la page précédente).
+    """
+    criteres = {nom: request.args[nom] for nom in CRITERES if request.args.get(nom)}
+    
+    bornes = {}
+    for nom in ('date_min', 'date_max'):
+        if request.args.get(nom):
+            bornes[nom] = date_iso(request.args[nom])
+            if bornes[nom] is None:
+                return jsonify({"error": f"❌ '{nom}' doit être une date JJ/MM/AAAA ou AAAA-MM-JJ"}), 400
+    
+    try:
+        limite = int(request.args.get('limite', LIMITE_PAR_DEFAUT))
+        curseur = request.args.get('curseur')
+        curseur = int(curseur) if curseur else None
+    except ValueError:
+        return jsonify({"error": "❌ 'limite' et 'curseur' doivent être des entiers"}), 400
+    
+    resultats, suivant = archive.rechercher(g.tenant.id, criteres, texte=request.args.get('q'),
+                                            apres=curseur, limite=limite, **bornes)
+    for resultat in resultats:
+        if resultat['document_id']:
+            resultat['url'] = f"/api/documents/{resultat['document_id']}"
+    return jsonify({"documents": resultats, "suivant": suivant}), 200
+
+@app.route('/api/documents/<doc_id>', methods=['GET'])
+@require_api_keys
+def get_document(doc_id):
+    """Télécharger à nouveau un document déjà généré, sans nouveau rendu"""
+    return envoyer_document(doc_id)
+
+@app.route('/api/documents/<doc_id>/preview', methods=['GET'])
+@require_api_keys
+def get_document_preview(doc_id):
+    """Aperçu PNG basse résolution de la première page d'un document PDF (paramètre : largeur)"""
+    meta = documents.obtenir(doc_id)
+    if meta is None or meta.get('tenant') not in (None, g.tenant.id):
+        return jsonify({"error": "❌ Document introuvable ou expiré"}), 404
+    if meta.get('format') == 'zip':
+        # Plusieurs formats : aperçu du PDF contenu dans l'archive
+        pdf_id = (meta.get('documents') or {}).get('pdf')
+        meta = documents.obtenir(pdf_id) if pdf_id else None
+    if meta is None or meta['mimetype'] != MIMETYPES['pdf']:
+        return jsonify({"error": "❌ Aperçu disponible pour les documents PDF seulement"}), 415
+    
+    try:
+        largeur = lire_largeur_apercu(request.args.get('largeur'), 'largeur')
+        chemin = apercus.obtenir(meta['sha256'], largeur) or apercus.produire(meta['sha256'], largeur, meta['chemin'])
+    except ErreurValidation as e:
+        return jsonify(e.to_dict()), 400
+    except ApercuIndisponible as e:
+        return jsonify({"error": f"❌ {e}"}), 501
+    
+    response = envoyer_apercu(chemin, meta['sha256'], largeur)
+    response.headers['X-Document-Id'] = doc_id
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_api_keys
+def get_job(job_id):
+    """État d'un rendu en tâche de fond, avec l'URL du document une fois terminé"""
+    etat = file_rendus.obtenir(job_id)
+    if etat is None or etat.get('tenant') not in (None, g.tenant.id):
+        return jsonify({"error": "❌ Tâche introuvable ou expirée"}), 404
+    
+    if etat.get('document_id'):
+        etat['url'] = f"/api/documents/{etat['document_id']}"
+    return jsonify(etat), 200
+
 @app.route('/api/test-auth', methods=['GET'])
 @require_api_keys
 def test_auth():
     """Endpoint pour tester l'authentification"""
-    return jsonify({"message": "Authentification réussie!"}), 200
+    return jsonify({"message": "Authentification réussie!", "tenant": g.tenant.id}), 200
+
+@app.after_request
+def compresser_json(response):
+    """Compresser les réponses JSON dynamiques si le client l'accepte"""
+    if (response.direct_passthrough or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype != 'application/json'):
+        return response
+    
+    corps = response.get_data()
+    encodage = choisir_encodage(request.accept_encodings, response.mimetype, len(corps))
+    response.vary.add('Accept-Encoding')
+    if encodage:
+        response.set_data(compresser(corps, encodage))
+        response.headers['Content-Encoding'] = encodage
+    return response
 
 # Gestionnaire d'erreur 404
 @app.errorhandler(404)
@@ -553,9 +1396,17 @@ def not_found(error):
     return jsonify({
         "error": "❌ Endpoint non trouvé",
         "message": "Consultez la documentation sur '/' pour voir les endpoints disponibles",
-        "endpoints_disponibles": ["/", "/health", "/api/exemple", "/api/devis", "/api/test", "/api/test-auth", "/api/themes", "/api/facture"]
+        "endpoints_disponibles": ["/", "/health", "/api/exemple", "/api/devis", "/api/test", "/api/test-auth", "/api/themes", "/api/facture", "/api/devis/<numero>", "/api/devis/<numero>/facture", "/api/factures/lot", "/api/import", "/api/documents", "/api/documents/<id>", "/api/documents/<id>/preview", "/api/jobs/<id>"]
     }), 404
 
+# Gestionnaire d'erreur 413 (requête trop volumineuse)
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        "error": "❌ Requête trop volumineuse",
+        "message": f"La taille maximale acceptée est de {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} Mo"
+    }), 413
+
 # Gestionnaire d'erreur 500
 @app.errorhandler(500)
 def internal_error(error):
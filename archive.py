@@ -0,0 +1,190 @@
+# archive.py - Archive consultable des devis et factures générés
+#
+# Chaque document généré est décrit par une ligne SQLite : tous les champs du devis ou
+# de la facture (colonne JSON `donnees`), les champs de recherche en colonnes indexées
+# et les totaux. Une table FTS5 indexe les noms de clients et les descriptions des
+# articles pour la recherche plein texte (repli sur LIKE sur le nom du client si SQLite
+# est compilé sans FTS5).
+#
+# La pagination se fait par curseur (keyset) : chaque page reprend après le dernier `id`
+# renvoyé, via les index (tenant, <critère>, id). Une page coûte le même temps quelle que
+# soit sa position, là où OFFSET relirait toutes les lignes précédentes.
+#
+# ARCHIVE_DB fixe le fichier (generated/archive.sqlite3 par défaut).
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+import db
+
+LIMITE_PAR_DEFAUT = 50
+LIMITE_MAX = 200
+
+# Critères de recherche exacts : paramètre de la requête -> colonne
+CRITERES = {
+    'type': 'type',
+    'numero': 'numero',
+    'client_nom': 'client_nom',
+    'client_siret': 'client_siret',
+    'statut_paiement': 'statut_paiement',
+    'reference_devis': 'reference_devis',
+}
+
+# Colonnes renvoyées par rechercher()
+COLONNES_RESULTAT = ('id', 'type', 'numero', 'document_id', 'date_emission', 'date_echeance', 'client_nom',
+                     'client_siret', 'statut_paiement', 'reference_devis', 'total_ht', 'total_tva', 'total_ttc',
+                     'nb_articles', 'cree_le')
+
+SCHEMA_SQL = (
+    """CREATE TABLE IF NOT EXISTS archives (
+        id INTEGER PRIMARY KEY,
+        tenant TEXT NOT NULL,
+        type TEXT NOT NULL,
+        numero TEXT NOT NULL,
+        document_id TEXT,
+        date_emission TEXT,
+        date_echeance TEXT,
+        client_nom TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+        client_siret TEXT NOT NULL DEFAULT '',
+        statut_paiement TEXT,
+        reference_devis TEXT,
+        total_ht REAL NOT NULL,
+        total_tva REAL NOT NULL,
+        total_ttc REAL NOT NULL,
+        nb_articles INTEGER NOT NULL,
+        donnees TEXT NOT NULL,
+        cree_le REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS archives_tenant ON archives (tenant, id)",
+    "CREATE INDEX IF NOT EXISTS archives_type ON archives (tenant, type, id)",
+    "CREATE INDEX IF NOT EXISTS archives_numero ON archives (tenant, numero, id)",
+    "CREATE INDEX IF NOT EXISTS archives_client_nom ON archives (tenant, client_nom, id)",
+    "CREATE INDEX IF NOT EXISTS archives_client_siret ON archives (tenant, client_siret, id)",
+    "CREATE INDEX IF NOT EXISTS archives_statut ON archives (tenant, statut_paiement, id)",
+    "CREATE INDEX IF NOT EXISTS archives_reference_devis ON archives (tenant, reference_devis, id)",
+    "CREATE INDEX IF NOT EXISTS archives_date ON archives (tenant, date_emission, id)",
+)
+
+SCHEMA_FTS = ("CREATE VIRTUAL TABLE IF NOT EXISTS archives_fts USING fts5("
+              "tenant, client_nom, descriptions, tokenize='unicode61 remove_diacritics 2')")
+
+
+def date_iso(texte):
+    """Date "27/09/2025" ou "2025-09-27" au format ISO (triable), None si illisible"""
+    for format_date in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(texte).strip(), format_date).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _phrase(texte):
+    return '"' + texte.replace('"', '""') + '"'
+
+
+def requete_fts(texte, tenant_id):
+    """Requête FTS5 : mots de l'utilisateur (le dernier en préfixe), dans les documents du client
+
+    Seul le dernier mot est cherché en préfixe (saisie en cours) : un préfixe oblige
+    FTS5 à fusionner les listes de tous les termes correspondants, là où un mot entier
+    est lu directement dans l'index. Le client fait partie de la requête pour que FTS5
+    croise lui-même les listes d'occurrences ; la jointure revérifie le client exact.
+    """
+    mots = [_phrase(mot) for mot in texte.split()]
+    requete = f'tenant : {_phrase(str(tenant_id))}'
+    if not mots:
+        return requete
+    mots[-1] += '*'
+    return f"{requete} AND {{client_nom descriptions}} : ({' '.join(mots)})"
+
+
+class Archive:
+    """Métadonnées des documents générés, par client, dans une base SQLite partagée par les workers"""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        connexion = db.connecter(chemin)
+        for instruction in SCHEMA_SQL:
+            connexion.execute(instruction)
+        try:
+            connexion.execute(SCHEMA_FTS)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite compilé sans FTS5
+            self.fts = False
+
+    def enregistrer(self, document, type_document, tenant_id, document_id=None):
+        """Archiver un devis ou une facture, retourne l'identifiant de la ligne"""
+        donnees = {nom: valeur for nom, valeur in vars(document).items() if nom != 'items'}
+        echeance = getattr(document, 'date_echeance', None) or getattr(document, 'date_expiration', None)
+        descriptions = ' '.join(item.description for item in document.items)
+
+        connexion = db.connecter(self.chemin)
+        connexion.execute('BEGIN IMMEDIATE')
+        try:
+            curseur = connexion.execute(
+                'INSERT INTO archives (tenant, type, numero, document_id, date_emission, date_echeance, client_nom, '
+                'client_siret, statut_paiement, reference_devis, total_ht, total_tva, total_ttc, nb_articles, '
+                'donnees, cree_le) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (tenant_id, type_document, document.numero, document_id, date_iso(document.date_emission),
+                 date_iso(echeance), document.client_nom or '', document.client_siret or '',
+                 getattr(document, 'statut_paiement', None), getattr(document, 'reference_devis', None) or None,
+                 document.total_ht, document.total_tva, document.total_ttc, len(document.items),
+                 json.dumps(donnees, ensure_ascii=False), time.time())
+            )
+            archive_id = curseur.lastrowid
+            if self.fts:
+                connexion.execute('INSERT INTO archives_fts (rowid, tenant, client_nom, descriptions) '
+                                  'VALUES (?, ?, ?, ?)', (archive_id, tenant_id, document.client_nom or '', descriptions))
+            connexion.execute('COMMIT')
+        except Exception:
+            if connexion.in_transaction:
+                connexion.execute('ROLLBACK')
+            raise
+        return archive_id
+
+    def rechercher(self, tenant_id, criteres=None, date_min=None, date_max=None, texte=None,
+                   apres=None, limite=LIMITE_PAR_DEFAUT):
+        """Page de résultats, du plus récent au plus ancien : (lignes, curseur de la page suivante ou None)
+
+        `criteres` : égalités sur les colonnes de CRITERES ; `date_min` / `date_max` : bornes
+        de la date d'émission (ISO) ; `texte` : mots recherchés dans le nom du client et les
+        descriptions des articles ; `apres` : curseur renvoyé par la page précédente.
+        """
+        source, cle = 'archives a', 'a.id'
+        conditions = ['a.tenant = ?']
+        parametres = [tenant_id]
+        if texte and self.fts:
+            # La recherche part de l'index plein texte, parcouru par rowid décroissant :
+            # la page est complète dès les premières correspondances du client
+            source, cle = 'archives_fts f JOIN archives a ON a.id = f.rowid', 'f.rowid'
+            conditions.append('archives_fts MATCH ?')
+            parametres.append(requete_fts(texte, tenant_id))
+        elif texte:
+            # Sans FTS5 : recherche sur le nom du client seulement (parcours de la table)
+            conditions.append("a.client_nom LIKE ? ESCAPE '\\'")
+            parametres.append('%' + texte.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        for nom, valeur in (criteres or {}).items():
+            conditions.append(f'a.{CRITERES[nom]} = ?')
+            parametres.append(valeur)
+        if date_min:
+            conditions.append('a.date_emission >= ?')
+            parametres.append(date_min)
+        if date_max:
+            conditions.append('a.date_emission <= ?')
+            parametres.append(date_max)
+        if apres is not None:
+            conditions.append(f'{cle} < ?')
+            parametres.append(apres)
+
+        limite = max(1, min(int(limite), LIMITE_MAX))
+        lignes = db.connecter(self.chemin).execute(
+            f"SELECT {', '.join('a.' + colonne for colonne in COLONNES_RESULTAT)} FROM {source} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {cle} DESC LIMIT ?",
+            (*parametres, limite + 1)
+        ).fetchall()
+
+        resultats = [dict(ligne) for ligne in lignes[:limite]]
+        suivant = resultats[-1]['id'] if len(lignes) > limite else None
+        return resultats, suivant
@@ -0,0 +1,108 @@
+# assets.py - Téléchargement et cache des ressources externes (logos)
+#
+# Un logo téléchargé est déposé dans le magasin partagé par les workers
+# (shared_assets.py) : les autres workers le trouvent sans le retélécharger, et tous
+# lisent la même copie projetée en mémoire. Les logos sont alors des memoryview en
+# lecture seule (à convertir par bytes() avant de les transmettre à un autre processus).
+# Le cache de chaque processus expire avec l'index du magasin (RESSOURCES_TTL) : un
+# logo y est daté de son dépôt, pas de sa lecture par ce processus.
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from shared_assets import MAGASIN, RESSOURCES_TTL
+
+try:
+    import httpx
+except ImportError:  # httpx est optionnel : repli sur requests dans un thread
+    httpx = None
+
+LOGO_TIMEOUT = 10
+LOGO_CACHE_TAILLE = 64
+LOGO_TTL = RESSOURCES_TTL
+
+_logos = OrderedDict()
+_logos_lock = threading.Lock()
+
+
+def logo_en_cache(logo_url):
+    """Retourner les octets du logo s'il est déjà en cache (ce worker ou magasin partagé), sinon None"""
+    with _logos_lock:
+        entree = _logos.get(logo_url)
+        if entree is not None:
+            contenu, depose_le = entree
+            if not LOGO_TTL or time.time() - depose_le <= LOGO_TTL:
+                _logos.move_to_end(logo_url)
+                return contenu
+            del _logos[logo_url]
+    trouve = MAGASIN.lire_cle(logo_url)
+    if trouve is None:
+        return None
+    memoriser_logo(logo_url, *trouve)
+    return trouve[0]
+
+
+def memoriser_logo(logo_url, contenu, depose_le=None):
+    """Ajouter un logo au cache (éviction du plus ancien au-delà de LOGO_CACHE_TAILLE)
+
+    depose_le : date du téléchargement (maintenant par défaut), pour l'expiration.
+    """
+    if not logo_url or contenu is None:
+        return
+    with _logos_lock:
+        _logos[logo_url] = (contenu, time.time() if depose_le is None else depose_le)
+        _logos.move_to_end(logo_url)
+        while len(_logos) > LOGO_CACHE_TAILLE:
+            _logos.popitem(last=False)
+
+
+def _partager(logo_url, contenu):
+    """Déposer un logo téléchargé dans le magasin partagé, retourne la copie partagée"""
+    if MAGASIN.actif:
+        contenu = MAGASIN.obtenir(MAGASIN.stocker(contenu, cle=logo_url)) or contenu
+    memoriser_logo(logo_url, contenu)
+    return contenu
+
+
+def telecharger_logo(logo_url):
+    """Télécharger le logo (ou le lire depuis le cache) et retourner ses octets"""
+    if not logo_url:
+        return None
+
+    contenu = logo_en_cache(logo_url)
+    if contenu is not None:
+        return contenu
+
+    try:
+        response = requests.get(logo_url, timeout=LOGO_TIMEOUT)
+        if response.status_code == 200:
+            return _partager(logo_url, response.content)
+    except Exception as e:
+        print(f"Erreur lors du téléchargement du logo: {e}")
+    return None
+
+
+async def telecharger_logo_async(logo_url):
+    """Version non bloquante de telecharger_logo pour l'application ASGI"""
+    if not logo_url:
+        return None
+
+    # Le magasin partagé lit son index et projette le fichier : hors de la boucle
+    contenu = await asyncio.to_thread(logo_en_cache, logo_url)
+    if contenu is not None:
+        return contenu
+
+    if httpx is None:
+        return await asyncio.to_thread(telecharger_logo, logo_url)
+
+    try:
+        async with httpx.AsyncClient(timeout=LOGO_TIMEOUT, follow_redirects=True) as client:
+            response = await client.get(logo_url)
+        if response.status_code == 200:
+            return await asyncio.to_thread(_partager, logo_url, response.content)
+    except Exception as e:
+        print(f"Erreur lors du téléchargement du logo: {e}")
+    return None
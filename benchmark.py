@@ -0,0 +1,778 @@
+# benchmark.py - Outils de mesure de performance de l'API
+#
+# Exemples :
+#   python benchmark.py charge --url http://localhost:5000 --requetes 200 --concurrence 16
+#   python benchmark.py profils --requetes 100 --concurrence 16
+#   python benchmark.py async --requetes 50 --concurrence 16 --delai-logo 1
+#   python benchmark.py validation --articles 10000
+#   python benchmark.py json --articles 20000
+#   python benchmark.py calibrer
+#   python benchmark.py paragraphes --documents 20 --articles 200
+#   python benchmark.py sortie-pdf --articles 100
+#   python benchmark.py archive --lignes 1000000
+#   python benchmark.py numerotation --processus 4 --allocations 2000
+#   python benchmark.py mixte --url http://localhost:5000 --requetes 200 --articles-gros 1500
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import requests
+
+API_KEY_1 = os.environ.get('API_KEY_1', 'your-secret-key-1-here')
+API_KEY_2 = os.environ.get('API_KEY_2', 'your-secret-key-2-here')
+
+
+def construire_payload(nb_articles=5, nb_details=3, logo_url='', output_format='pdf'):
+    """Construire un devis de test avec le nombre d'articles demandé"""
+    return {
+        "client_nom": "Client Benchmark",
+        "client_adresse": "1 Rue du Test",
+        "client_ville": "75001 Paris",
+        "logo_url": logo_url,
+        "format": output_format,
+        "items": [
+            {
+                "description": f"Prestation n°{i + 1}",
+                "prix_unitaire": 100.0 + i,
+                "quantite": 1 + i % 3,
+                "tva_taux": 20,
+                "details": [f"Détail {j + 1} de la prestation {i + 1}" for j in range(nb_details)]
+            }
+            for i in range(nb_articles)
+        ]
+    }
+
+
+def percentile(valeurs, p):
+    """Percentile simple (valeurs déjà triées)"""
+    if not valeurs:
+        return 0.0
+    index = min(len(valeurs) - 1, int(round(p / 100 * (len(valeurs) - 1))))
+    return valeurs[index]
+
+
+def test_charge(url, nb_requetes=100, concurrence=8, endpoint='/api/devis', payload=None,
+                logo_url_unique=None):
+    """Envoyer nb_requetes POST en parallèle et mesurer latences et débit
+
+    Si logo_url_unique est fourni, chaque requête utilise une URL de logo différente
+    (paramètre de requête) pour que le téléchargement ne soit jamais servi par un cache.
+    """
+    payload = payload or construire_payload()
+    headers = {'X-API-Key-1': API_KEY_1, 'X-API-Key-2': API_KEY_2}
+    # requests.Session n'est pas sûre entre threads : une session (et son pool de connexions) par thread
+    local = threading.local()
+    sessions = []
+
+    def une_requete(numero):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            sessions.append(session)
+        corps = payload
+        if logo_url_unique:
+            corps = dict(payload, logo_url=f"{logo_url_unique}?r={numero}")
+        debut = time.perf_counter()
+        try:
+            response = session.post(url + endpoint, json=corps, headers=headers, timeout=300)
+            statut = response.status_code
+        except requests.RequestException:
+            statut = 0
+        return statut, time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as executor:
+        resultats = list(executor.map(une_requete, range(nb_requetes)))
+    duree = time.perf_counter() - debut
+    for session in sessions:
+        session.close()
+
+    # 202 : document volumineux accepté en tâche de fond
+    latences = sorted(latence for statut, latence in resultats if statut in (200, 202))
+    erreurs = sum(1 for statut, _ in resultats if statut not in (200, 202))
+    return {
+        "requetes": nb_requetes,
+        "concurrence": concurrence,
+        "erreurs": erreurs,
+        "duree_s": round(duree, 3),
+        "debit_rps": round(len(latences) / duree, 2) if duree else 0.0,
+        "p50_ms": round(percentile(latences, 50) * 1000, 1),
+        "p95_ms": round(percentile(latences, 95) * 1000, 1),
+        "p99_ms": round(percentile(latences, 99) * 1000, 1),
+        "moyenne_ms": round(statistics.mean(latences) * 1000, 1) if latences else 0.0,
+    }
+
+
+def afficher(titre, resultats):
+    print(f"\n📊 {titre}")
+    for cle, valeur in resultats.items():
+        print(f"   {cle:<12} {valeur}")
+
+
+def _port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _attendre_serveur(url, delai=30):
+    limite = time.time() + delai
+    while time.time() < limite:
+        try:
+            if requests.get(url + '/health', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+@contextmanager
+def serveur_lance(commande, env_supplementaire):
+    """Démarrer un serveur HTTP sur un port libre, retourne son URL (None s'il ne démarre pas)"""
+    port = _port_libre()
+    # Limites par client levées : on mesure le serveur, pas le limiteur
+    env = dict(os.environ, PORT=str(port), GUNICORN_LOGLEVEL='warning', RATE_LIMIT_DEBIT='1e9',
+               RATE_LIMIT_RAFALE='1e9', RATE_LIMIT_SIMULTANES='1e9', **env_supplementaire)
+    commande = [arg.replace('{port}', str(port)) for arg in commande]
+    serveur = subprocess.Popen(commande, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        yield url if _attendre_serveur(url) else None
+    finally:
+        serveur.terminate()
+        try:
+            serveur.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            # Rendus en tâche de fond encore en cours
+            serveur.kill()
+            serveur.wait()
+
+
+def valider_profils(profils, nb_requetes, concurrence, payload):
+    """Démarrer Gunicorn avec chaque profil et lancer le test de charge"""
+    commande = ['gunicorn', '-c', 'gunicorn.conf.py', 'app_students:app']
+    resultats = {}
+    for profil in profils:
+        with serveur_lance(commande, {'GUNICORN_PROFIL': profil}) as url:
+            if url is None:
+                print(f"❌ Le serveur n'a pas démarré avec le profil '{profil}'")
+                continue
+            resultats[profil] = test_charge(url, nb_requetes, concurrence, payload=payload)
+            afficher(f"Profil '{profil}'", resultats[profil])
+    return resultats
+
+
+def _png_minimal():
+    from PIL import Image as PILImage
+    tampon = BytesIO()
+    PILImage.new('RGB', (120, 60), (52, 152, 219)).save(tampon, format='PNG')
+    return tampon.getvalue()
+
+
+@contextmanager
+def serveur_logo_lent(delai):
+    """Servir un logo PNG avec un délai artificiel pour simuler un hébergeur lent"""
+    contenu = _png_minimal()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delai)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(contenu)))
+            self.end_headers()
+            self.wfile.write(contenu)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=serveur.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{serveur.server_address[1]}/logo.png"
+    finally:
+        serveur.shutdown()
+
+
+def comparer_sync_async(nb_requetes, concurrence, payload, delai_logo):
+    """Comparer la concurrence d'un worker synchrone et d'un worker ASGI"""
+    serveurs = {
+        'sync (gunicorn, 1 worker)': (
+            ['gunicorn', '-c', 'gunicorn.conf.py', 'app_students:app'],
+            {'GUNICORN_PROFIL': 'cpu', 'GUNICORN_WORKERS': '1'}),
+        'async (uvicorn, 1 worker)': (
+            ['uvicorn', 'app_async:app', '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning'],
+            {}),
+    }
+    resultats = {}
+    with serveur_logo_lent(delai_logo) as logo_url:
+        for nom, (commande, env) in serveurs.items():
+            # Une URL de logo différente par requête : aucun cache ne masque la latence
+            with serveur_lance(commande, env) as url:
+                if url is None:
+                    print(f"❌ Le serveur '{nom}' n'a pas démarré")
+                    continue
+                resultats[nom] = test_charge(url, nb_requetes, concurrence, payload=payload,
+                                             logo_url_unique=logo_url)
+                afficher(nom, resultats[nom])
+    return resultats
+
+
+def mesurer_validation(nb_articles, repetitions=5):
+    """Mesurer la validation (schéma précompilé) et la construction du modèle"""
+    from app_students import construire_devis
+    from validation import DEVIS_SCHEMA
+
+    payload = construire_payload(nb_articles)
+    # Nombres en chaînes pour mesurer aussi la conversion de type
+    for item in payload['items'][::2]:
+        item['prix_unitaire'] = str(item['prix_unitaire']).replace('.', ',')
+
+    def chronometrer(fonction):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            fonction(payload)
+            durees.append(time.perf_counter() - debut)
+        return min(durees)
+
+    validation = chronometrer(DEVIS_SCHEMA.valider)
+    construction = chronometrer(construire_devis)
+    return {
+        "articles": nb_articles,
+        "validation_ms": round(validation * 1000, 2),
+        "par_article_us": round(validation / nb_articles * 1e6, 2),
+        "avec_modele_ms": round(construction * 1000, 2),
+    }
+
+
+def mesurer_json(nb_articles, repetitions=5):
+    """Comparer le décodage d'un gros corps JSON : module standard et fournisseur de l'application"""
+    import json
+    from app_students import app
+
+    corps = json.dumps(construire_payload(nb_articles, nb_details=5)).encode('utf-8')
+
+    def chronometrer(decoder):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            decoder(corps)
+            durees.append(time.perf_counter() - debut)
+        return min(durees)
+
+    standard = chronometrer(json.loads)
+    fournisseur = chronometrer(app.json.loads)
+    return {
+        "taille_mo": round(len(corps) / 1024 / 1024, 2),
+        "json_ms": round(standard * 1000, 2),
+        "fournisseur": app.json.nom_decodeur,
+        "fournisseur_ms": round(fournisseur * 1000, 2),
+        "gain": round(standard / fournisseur, 2) if fournisseur else 0.0,
+    }
+
+
+def _png_bruite(cote):
+    """Logo PNG peu compressible, pour mesurer l'effet de la taille du logo"""
+    from PIL import Image as PILImage
+    tampon = BytesIO()
+    PILImage.frombytes('RGB', (cote, cote), os.urandom(cote * cote * 3)).save(tampon, format='PNG')
+    return tampon.getvalue()
+
+
+def calibrer_cout(repetitions=3):
+    """Mesurer le temps de rendu PDF en faisant varier une grandeur à la fois
+
+    Chaque coefficient est la pente du temps de rendu pour sa grandeur, divisée par le
+    temps d'un petit devis sans logo (1 unité). Les valeurs sont à reporter dans cost.py.
+    """
+    import assets
+    import cost
+    from app_students import construire_devis
+    from pdf_generator_students import generate_pdf_devis
+
+    assets.memoriser_logo('bench://logo-petit.png', _png_minimal())
+    assets.memoriser_logo('bench://logo-gros.png', _png_bruite(700))
+
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'calibrage.pdf')
+
+    def mesurer(nb_articles, nb_details=0, longueur=0, logo_url=''):
+        payload = construire_payload(nb_articles, nb_details, logo_url)
+        for item in payload['items']:
+            item['description'] += ' lorem ipsum' * (longueur // 12)
+        devis = construire_devis(payload)
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            generate_pdf_devis(devis, 'bleu', chemin)
+            durees.append(time.perf_counter() - debut)
+        return min(durees), cost.mesurer(devis)
+
+    def pente(reference, variante, grandeur):
+        (t0, g0), (t1, g1) = reference, variante
+        return max(0.0, (t1 - t0) / (g1[grandeur] - g0[grandeur]))
+
+    base = mesurer(1)
+    articles = mesurer(300)
+    petit_logo = mesurer(1, logo_url='bench://logo-petit.png')
+    coefficients = {
+        'articles': pente(base, articles, 'articles'),
+        'lignes_detail': pente(articles, mesurer(300, nb_details=5), 'lignes_detail'),
+        'texte_ko': pente(articles, mesurer(300, longueur=300), 'texte_ko'),
+        'logo': pente(base, petit_logo, 'logo'),
+        'logo_mo': pente(petit_logo, mesurer(1, logo_url='bench://logo-gros.png'), 'logo_mo'),
+    }
+    os.remove(chemin)
+
+    resultats = {"base_ms": round(base[0] * 1000, 2)}
+    for nom, coefficient in coefficients.items():
+        resultats[nom] = round(coefficient / base[0], 4)
+    return resultats
+
+
+def mesurer_cache_paragraphes(nb_documents, nb_articles):
+    """Rendre des devis au catalogue commun, sans puis avec le cache de paragraphes
+
+    Le cache de lignes d'articles, qui reprend les paragraphes déjà construits, est désactivé.
+    """
+    import paragraph_cache
+    import row_cache
+    from app_students import construire_devis
+    from pdf_generator_students import generate_pdf_devis
+
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'paragraphes.pdf')
+    devis = [construire_devis(construire_payload(nb_articles, nb_details=4)) for _ in range(nb_documents)]
+    cache = paragraph_cache.CACHE
+    taille = cache.taille
+
+    def rendre_tous():
+        debut = time.perf_counter()
+        for document in devis:
+            generate_pdf_devis(document, 'bleu', chemin)
+        return time.perf_counter() - debut
+
+    taille_lignes = row_cache.CACHE.taille
+    try:
+        row_cache.CACHE.taille = 0
+        cache.taille = 0
+        sans_cache = rendre_tous()
+        cache.taille = taille
+        cache.vider()
+        avec_cache = rendre_tous()
+    finally:
+        cache.taille = taille
+        row_cache.CACHE.taille = taille_lignes
+    os.remove(chemin)
+
+    resultats = {
+        "documents": nb_documents,
+        "sans_cache_ms": round(sans_cache * 1000, 1),
+        "avec_cache_ms": round(avec_cache * 1000, 1),
+        "gain": round(sans_cache / avec_cache, 2) if avec_cache else 0.0,
+    }
+    resultats.update(cache.statistiques())
+    return resultats
+
+
+def mesurer_rendu_parallele(nb_articles, liste_processus, repetitions=2):
+    """Rendu séquentiel puis par plages de pages en parallèle, pour chaque taille de pool
+
+    chemin_critique_ms : pagination + plage la plus lente (temps CPU de son processus) +
+    assemblage, soit la durée attendue avec au moins autant de cœurs libres que de
+    processus (sur une machine qui en a moins, le temps mesuré est plus long).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from app_students import construire_devis
+    from pdf_generator_students import generate_pdf_devis
+    import rendu_parallele
+
+    if rendu_parallele.moteur_assemblage() is None:
+        return {"erreur": "installez PyMuPDF ou pypdf pour assembler les plages"}
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'parallele.pdf')
+    devis = construire_devis(construire_payload(nb_articles, nb_details=2))
+
+    generate_pdf_devis(devis, 'bleu', chemin)  # caches chauds
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        generate_pdf_devis(devis, 'bleu', chemin)
+        durees.append(time.perf_counter() - debut)
+    resultats = {"coeurs": os.cpu_count(), "sequentiel_ms": round(min(durees) * 1000, 1)}
+
+    for processus in liste_processus:
+        with ProcessPoolExecutor(max_workers=processus, mp_context=rendu_parallele.contexte_processus()) as executeur:
+            mesures = []
+            for essai in range(repetitions + 1):  # le premier essai réchauffe les processus
+                etapes = {}
+                debut = time.perf_counter()
+                rendu_parallele.rendre_pdf_parallele(devis, 'devis', 'bleu', chemin, processus=processus,
+                                                     executeur=executeur, durees=etapes)
+                if essai:
+                    mesures.append((time.perf_counter() - debut, etapes))
+        duree, etapes = min(mesures, key=lambda mesure: mesure[0])
+        critique = etapes['pagination_s'] + max(etapes['parties_cpu_s']) + etapes['assemblage_s']
+        resultats[f"{processus}_processus"] = {
+            "rendu_ms": round(duree * 1000, 1),
+            "chemin_critique_ms": round(critique * 1000, 1),
+            "pagination_ms": round(etapes['pagination_s'] * 1000, 1),
+            "plage_max_cpu_ms": round(max(etapes['parties_cpu_s']) * 1000, 1),
+            "assemblage_ms": round(etapes['assemblage_s'] * 1000, 1),
+            "pages": etapes['pages'],
+        }
+    os.remove(chemin)
+    return resultats
+
+
+def mesurer_cache_lignes(nb_documents, nb_articles):
+    """Rendre des devis au catalogue commun, sans puis avec le cache de lignes d'articles"""
+    import row_cache
+    from app_students import construire_devis
+    from pdf_generator_students import generate_pdf_devis
+
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'lignes.pdf')
+    devis = [construire_devis(construire_payload(nb_articles, nb_details=2)) for _ in range(nb_documents)]
+    cache = row_cache.CACHE
+    taille = cache.taille
+
+    def rendre_tous():
+        debut = time.perf_counter()
+        for document in devis:
+            generate_pdf_devis(document, 'bleu', chemin)
+        return time.perf_counter() - debut
+
+    try:
+        cache.taille = 0
+        sans_cache = rendre_tous()
+        cache.taille = taille
+        cache.vider()
+        avec_cache = rendre_tous()
+    finally:
+        cache.taille = taille
+    os.remove(chemin)
+
+    resultats = {
+        "documents": nb_documents,
+        "sans_cache_ms": round(sans_cache * 1000, 1),
+        "avec_cache_ms": round(avec_cache * 1000, 1),
+        "gain": round(sans_cache / avec_cache, 2) if avec_cache else 0.0,
+    }
+    resultats.update(cache.statistiques())
+    return resultats
+
+
+def comparer_profils_pdf(nb_articles, repetitions=5):
+    """Taille du PDF et temps de rendu pour chaque profil de sortie (avec un logo photo)"""
+    import assets
+    from app_students import construire_devis
+    from pdf_generator_students import generate_pdf_devis
+    from pdf_profiles import PROFILS_PDF_DISPONIBLES
+
+    logo_url = 'bench://logo-photo.png'
+    assets.memoriser_logo(logo_url, _png_bruite(600))
+    devis = construire_devis(construire_payload(nb_articles, nb_details=3, logo_url=logo_url))
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'profil.pdf')
+
+    resultats = {}
+    for profil in PROFILS_PDF_DISPONIBLES:
+        generate_pdf_devis(devis, 'bleu', chemin, profil)  # caches chauds
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            generate_pdf_devis(devis, 'bleu', chemin, profil)
+            durees.append(time.perf_counter() - debut)
+        resultats[profil] = {
+            "taille_ko": round(os.path.getsize(chemin) / 1024, 1),
+            "rendu_ms": round(min(durees) * 1000, 1),
+        }
+    os.remove(chemin)
+    return resultats
+
+
+def mesurer_archive(nb_lignes, repetitions=20):
+    """Remplir une archive de nb_lignes documents puis chronométrer les recherches courantes"""
+    import random
+    import db
+    from archive import Archive
+
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'archive_bench.sqlite3')
+    for suffixe in ('', '-wal', '-shm'):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+
+    archive = Archive(chemin)
+    connexion = db.connecter(chemin)
+    hasard = random.Random(42)
+    mots = ['développement', 'maintenance', 'hébergement', 'formation', 'audit', 'licence', 'conseil',
+            'intégration', 'support', 'migration']
+    statuts = ['En attente', 'Payée', 'En retard']
+
+    debut = time.perf_counter()
+    connexion.execute('BEGIN')
+    for premier in range(1, nb_lignes + 1, 10000):
+        lignes, textes = [], []
+        for archive_id in range(premier, min(premier + 10000, nb_lignes + 1)):
+            client = f"Client {hasard.randrange(20000)}"
+            tenant = f"t{archive_id % 10}"
+            type_document = hasard.choice(('devis', 'facture'))
+            jour = f"{hasard.randint(2020, 2025)}-{hasard.randint(1, 12):02d}-{hasard.randint(1, 28):02d}"
+            lignes.append((archive_id, tenant, type_document, f"N-{archive_id}", None, jour, jour,
+                           client, f"SIRET{hash(client) % 100000}",
+                           statuts[archive_id % 3] if type_document == 'facture' else None, None,
+                           100.0, 20.0, 120.0, 3, '{}', time.time()))
+            textes.append((archive_id, tenant, client, ' '.join(hasard.sample(mots, 3))))
+        connexion.executemany('INSERT INTO archives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', lignes)
+        if archive.fts:
+            connexion.executemany('INSERT INTO archives_fts (rowid, tenant, client_nom, descriptions) '
+                                  'VALUES (?, ?, ?, ?)', textes)
+    connexion.execute('COMMIT')
+    connexion.execute('ANALYZE')
+    remplissage = time.perf_counter() - debut
+
+    premiere_page, curseur = archive.rechercher('t0')
+    recherches = {
+        "premiere_page": {},
+        "page_profonde": {'apres': 100},
+        "client_nom": {'criteres': {'client_nom': 'client 123'}},
+        "client_siret": {'criteres': {'client_siret': premiere_page[0]['client_siret']}},
+        "statut_paiement": {'criteres': {'statut_paiement': 'En retard'}, 'apres': nb_lignes // 2},
+        "dates": {'date_min': '2023-03-01', 'date_max': '2023-03-31'},
+        "texte_client": {'texte': 'client 1234'},
+        "texte_articles": {'texte': 'audit migra'},
+    }
+    resultats = {"lignes": nb_lignes, "remplissage_s": round(remplissage, 1), "fts5": archive.fts}
+    for nom, options in recherches.items():
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            archive.rechercher('t0', **options)
+            durees.append(time.perf_counter() - debut)
+        resultats[f"{nom}_ms"] = round(statistics.median(durees) * 1000, 2)
+
+    db.fermer(chemin)
+    for suffixe in ('', '-wal', '-shm'):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+    return resultats
+
+
+def _premier_logo(logo_url, dossier, taille_mo):
+    """Exécuté dans un processus neuf de mesurer_ressources : un worker qui démarre"""
+    import assets
+    from shared_assets import MagasinRessources
+
+    assets.MAGASIN = MagasinRessources(dossier, taille_mo)
+    debut = time.perf_counter()
+    contenu = assets.telecharger_logo(logo_url)
+    return time.perf_counter() - debut, len(contenu) if contenu is not None else 0
+
+
+def mesurer_ressources(nb_processus, delai_logo):
+    """Premier logo de nb_processus workers successifs, sans puis avec le magasin partagé"""
+    import shutil
+    from concurrent.futures import ProcessPoolExecutor
+
+    dossier = os.path.join('generated', '.tmp', 'ressources_bench')
+    resultats = {"processus": nb_processus, "delai_logo_ms": round(delai_logo * 1000)}
+    with serveur_logo_lent(delai_logo) as logo_url:
+        for nom, taille_mo in (('sans_magasin', 0), ('avec_magasin', 64)):
+            shutil.rmtree(dossier, ignore_errors=True)
+            durees = []
+            for _ in range(nb_processus):
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    duree, _ = pool.submit(_premier_logo, logo_url, dossier, taille_mo).result()
+                durees.append(duree)
+            resultats[f"{nom}_total_ms"] = round(sum(durees) * 1000, 1)
+            resultats[f"{nom}_suivants_ms"] = round(max(durees[1:], default=0.0) * 1000, 2)
+    shutil.rmtree(dossier, ignore_errors=True)
+    return resultats
+
+
+def _allouer_numeros(chemin, type_document, nombre, taille_bloc):
+    """Exécuté dans un processus de mesurer_numerotation"""
+    from numerotation import Numerotation
+
+    numerotation = Numerotation(chemin, taille_bloc)
+    return [numerotation.allouer(type_document, 'bench') for _ in range(nombre)]
+
+
+def mesurer_numerotation(nb_processus, nb_allocations, taille_bloc=100):
+    """Débit d'attribution des numéros depuis plusieurs processus, sans doublon ni trou (factures)"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    dossier = os.path.join('generated', '.tmp')
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, 'numerotation_bench.sqlite3')
+    resultats = {"processus": nb_processus}
+    for type_document in ('devis', 'facture'):
+        for suffixe in ('', '-wal', '-shm'):
+            if os.path.exists(chemin + suffixe):
+                os.remove(chemin + suffixe)
+        _allouer_numeros(chemin, type_document, 0, taille_bloc)  # création du schéma
+
+        with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+            debut = time.perf_counter()
+            lots = list(pool.map(_allouer_numeros, [chemin] * nb_processus, [type_document] * nb_processus,
+                                 [nb_allocations] * nb_processus, [taille_bloc] * nb_processus))
+            duree = time.perf_counter() - debut
+
+        numeros = [numero for lot in lots for numero in lot]
+        sequences = sorted(int(numero.rsplit('-', 1)[1]) for numero in numeros)
+        resultats[f"{type_document}_par_s"] = round(len(numeros) / duree)
+        resultats[f"{type_document}_doublons"] = len(numeros) - len(set(numeros))
+        if type_document == 'facture':
+            resultats["facture_sans_trou"] = sequences == list(range(1, len(sequences) + 1))
+
+    for suffixe in ('', '-wal', '-shm'):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+    return resultats
+
+
+def charge_mixte(url, nb_requetes, concurrence, articles_petits, articles_gros, part_gros=0.2):
+    """Charge mixte : latence des petits devis pendant que de gros devis arrivent en parallèle"""
+    nb_gros = max(1, int(nb_requetes * part_gros))
+    resultats = {}
+
+    def lancer(nom, nombre, nb_articles, conc):
+        resultats[nom] = test_charge(url, nombre, conc, payload=construire_payload(nb_articles))
+
+    threads = [
+        threading.Thread(target=lancer, args=('gros', nb_gros, articles_gros, max(1, concurrence // 4))),
+        threading.Thread(target=lancer, args=('petits', nb_requetes - nb_gros, articles_petits, concurrence)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance de l'API devis")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+
+    charge = sous_commandes.add_parser('charge', help="Test de charge contre un serveur lancé")
+    charge.add_argument('--url', default='http://localhost:5000')
+    charge.add_argument('--endpoint', default='/api/devis')
+
+    profils = sous_commandes.add_parser('profils', help="Valider chaque profil Gunicorn")
+    profils.add_argument('--profils', default='cpu,io,gevent')
+
+    comparaison = sous_commandes.add_parser('async', help="Comparer les points d'entrée sync et ASGI")
+    comparaison.add_argument('--delai-logo', type=float, default=1.0,
+                             help="Délai (s) du serveur de logo simulé")
+
+    validation = sous_commandes.add_parser('validation', help="Mesurer le coût de la validation")
+    validation.add_argument('--articles', type=int, default=10000)
+    mesure_json = sous_commandes.add_parser('json', help="Mesurer le décodage des gros corps JSON")
+    mesure_json.add_argument('--articles', type=int, default=20000)
+    sous_commandes.add_parser('calibrer', help="Calibrer le modèle de coût de rendu (cost.py)")
+    sortie_pdf = sous_commandes.add_parser('sortie-pdf', help="Comparer les profils de sortie PDF")
+    sortie_pdf.add_argument('--articles', type=int, default=100)
+    paragraphes = sous_commandes.add_parser('paragraphes', help="Mesurer le cache de paragraphes PDF")
+    paragraphes.add_argument('--documents', type=int, default=20)
+    paragraphes.add_argument('--articles', type=int, default=200)
+    lignes = sous_commandes.add_parser('lignes', help="Mesurer le cache de lignes d'articles")
+    lignes.add_argument('--documents', type=int, default=10)
+    lignes.add_argument('--articles', type=int, default=500)
+    parallele = sous_commandes.add_parser('parallele', help="Mesurer le rendu parallèle des longs documents")
+    parallele.add_argument('--articles', type=int, default=2000)
+    parallele.add_argument('--processus', default='1,2,4', help="Tailles de pool, séparées par des virgules")
+    mesure_archive = sous_commandes.add_parser('archive', help="Mesurer les recherches dans l'archive")
+    mesure_archive.add_argument('--lignes', type=int, default=1000000)
+    numeros = sous_commandes.add_parser('numerotation', help="Mesurer l'attribution des numéros")
+    numeros.add_argument('--processus', type=int, default=4)
+    numeros.add_argument('--allocations', type=int, default=2000, help="Numéros par processus")
+    ressources = sous_commandes.add_parser('ressources', help="Mesurer le magasin de logos partagé")
+    ressources.add_argument('--processus', type=int, default=4)
+    ressources.add_argument('--delai-logo', type=float, default=0.5, help="Délai (s) du serveur de logo simulé")
+    mixte = sous_commandes.add_parser('mixte', help="Latence des petits devis sous une charge mixte")
+    mixte.add_argument('--url', default='http://localhost:5000')
+    mixte.add_argument('--articles-gros', type=int, default=1500)
+
+    for sous_parser in (charge, profils, comparaison, mixte):
+        sous_parser.add_argument('--requetes', type=int, default=100)
+        sous_parser.add_argument('--concurrence', type=int, default=8)
+        sous_parser.add_argument('--articles', type=int, default=5)
+        sous_parser.add_argument('--logo-url', default='')
+        sous_parser.add_argument('--format', default='pdf')
+
+    args = parser.parse_args(argv)
+    if args.commande == 'validation':
+        afficher("Validation", mesurer_validation(args.articles))
+        return 0
+    if args.commande == 'json':
+        afficher("Décodage JSON", mesurer_json(args.articles))
+        return 0
+    if args.commande == 'calibrer':
+        afficher("Coefficients du modèle de coût (unités)", calibrer_cout())
+        return 0
+    if args.commande == 'sortie-pdf':
+        for profil, resultats in comparer_profils_pdf(args.articles).items():
+            afficher(f"Profil PDF '{profil}'", resultats)
+        return 0
+    if args.commande == 'paragraphes':
+        afficher("Cache de paragraphes", mesurer_cache_paragraphes(args.documents, args.articles))
+        return 0
+    if args.commande == 'lignes':
+        afficher("Cache de lignes d'articles", mesurer_cache_lignes(args.documents, args.articles))
+        return 0
+    if args.commande == 'parallele':
+        resultats = mesurer_rendu_parallele(args.articles, [int(valeur) for valeur in args.processus.split(',')])
+        afficher("Rendu parallèle", {cle: valeur for cle, valeur in resultats.items() if not isinstance(valeur, dict)})
+        for nom, valeur in resultats.items():
+            if isinstance(valeur, dict):
+                afficher(f"Rendu parallèle : {nom}", valeur)
+        return 0
+    if args.commande == 'archive':
+        afficher("Archive des documents", mesurer_archive(args.lignes))
+        return 0
+    if args.commande == 'numerotation':
+        afficher("Numérotation", mesurer_numerotation(args.processus, args.allocations))
+        return 0
+    if args.commande == 'ressources':
+        afficher("Magasin de ressources partagé", mesurer_ressources(args.processus, args.delai_logo))
+        return 0
+    if args.commande == 'mixte':
+        for nom, resultats in charge_mixte(args.url, args.requetes, args.concurrence,
+                                           args.articles, args.articles_gros).items():
+            afficher(f"Charge mixte : {nom}", resultats)
+        return 0
+
+    payload = construire_payload(args.articles, logo_url=args.logo_url, output_format=args.format)
+
+    if args.commande == 'charge':
+        afficher(f"Charge {args.url}{args.endpoint}",
+                 test_charge(args.url, args.requetes, args.concurrence, args.endpoint, payload))
+    elif args.commande == 'profils':
+        valider_profils(args.profils.split(','), args.requetes, args.concurrence, payload)
+    elif args.commande == 'async':
+        comparer_sync_async(args.requetes, args.concurrence, payload, args.delai_logo)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
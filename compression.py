@@ -0,0 +1,53 @@
+# compression.py - Négociation gzip / deflate des réponses HTTP
+#
+# Seuls les types qui gagnent à être compressés sont concernés : le JSON, le CSV et
+# le DOCX (archive ZIP dont les en-têtes et le XML restent en partie compressibles).
+# Les PDF sont servis tels quels : leurs flux sont déjà compressés (profils "compact"
+# et "archive") et ils doivent rester découpables par Range.
+import gzip
+import zlib
+
+TYPES_COMPRESSIBLES = {
+    'application/json',
+    'text/csv',
+    'text/plain',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+TAILLE_MIN_COMPRESSION = 1024
+NIVEAU_COMPRESSION = 6
+TAILLE_BLOC = 64 * 1024
+
+# wbits de zlib : en-tête gzip (31) ou zlib (15, "deflate" au sens HTTP)
+_WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def choisir_encodage(accept_encodings, mimetype, taille=None):
+    """Encodage à utiliser d'après Accept-Encoding ("gzip", "deflate"), ou None"""
+    if mimetype not in TYPES_COMPRESSIBLES:
+        return None
+    if taille is not None and taille < TAILLE_MIN_COMPRESSION:
+        return None
+    for encodage in ('gzip', 'deflate'):
+        if accept_encodings.quality(encodage) > 0:
+            return encodage
+    return None
+
+
+def compresser(corps, encodage):
+    if encodage == 'gzip':
+        return gzip.compress(corps, NIVEAU_COMPRESSION, mtime=0)
+    return zlib.compress(corps, NIVEAU_COMPRESSION)
+
+
+def compresser_fichier(chemin, encodage):
+    """Générateur des blocs compressés d'un fichier (réponse envoyée en chunked)"""
+    compresseur = zlib.compressobj(NIVEAU_COMPRESSION, zlib.DEFLATED, _WBITS[encodage])
+    with open(chemin, 'rb') as f:
+        while True:
+            bloc = f.read(TAILLE_BLOC)
+            if not bloc:
+                break
+            sortie = compresseur.compress(bloc)
+            if sortie:
+                yield sortie
+    yield compresseur.flush()
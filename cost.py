@@ -0,0 +1,94 @@
+# cost.py - Estimation du coût de rendu d'un devis ou d'une facture
+#
+# Le coût est exprimé en "unités de rendu" : un petit devis PDF sans logo vaut environ 1
+# (environ 13 ms de rendu sur la machine de calibrage).
+# Les coefficients viennent de `python benchmark.py calibrer` (pente du temps de rendu
+# PDF pour chaque grandeur de mesurer()), ramenés à l'unité.
+#
+# Admission (admettre) :
+#   - coût <= RENDU_SEUIL_ARRIERE_PLAN : rendu dans la requête
+#   - coût <= RENDU_BUDGET_MAX         : rendu en tâche de fond (jobs.py), réponse 202
+#   - au-delà                          : refusé (413)
+import os
+
+import assets
+
+COUT_BASE = 1.0
+COUT_PAR_ARTICLE = 0.08
+COUT_PAR_LIGNE_DETAIL = 0.05
+COUT_PAR_KO_TEXTE = 0.2
+COUT_LOGO = 0.3
+COUT_PAR_MO_LOGO = 25.0
+# Taille supposée d'un logo qui n'a pas encore été téléchargé
+TAILLE_LOGO_INCONNUE = 100 * 1024
+
+SEUIL_ARRIERE_PLAN = float(os.environ.get('RENDU_SEUIL_ARRIERE_PLAN', 20.0))
+BUDGET_MAX = float(os.environ.get('RENDU_BUDGET_MAX', 1000.0))
+
+
+class CoutExcessif(Exception):
+    """Document trop coûteux pour être rendu par l'API"""
+
+    def __init__(self, cout, budget=None):
+        self.cout = cout
+        self.budget = BUDGET_MAX if budget is None else budget
+        super().__init__(f"Document trop volumineux à générer (coût estimé {cout}, maximum {self.budget})")
+
+    def to_dict(self):
+        return {"error": f"❌ {self}", "cout_estime": self.cout, "budget_max": self.budget}
+
+
+def mesurer(document):
+    """Grandeurs du document qui déterminent le temps de rendu"""
+    nb_details = 0
+    # Les factures n'ont ni texte d'introduction ni texte de conclusion
+    nb_caracteres = len(getattr(document, 'texte_intro', '') or '') + len(getattr(document, 'texte_conclusion', '') or '')
+    for item in document.items:
+        nb_details += len(item.details)
+        nb_caracteres += len(item.description) + sum(len(detail) for detail in item.details)
+
+    taille_logo = 0
+    if document.logo_url:
+        contenu = assets.logo_en_cache(document.logo_url)
+        taille_logo = len(contenu) if contenu is not None else TAILLE_LOGO_INCONNUE
+
+    return {
+        'articles': len(document.items),
+        'lignes_detail': nb_details,
+        'texte_ko': nb_caracteres / 1024,
+        'logo': 1 if document.logo_url else 0,
+        'logo_mo': taille_logo / (1024 * 1024),
+    }
+
+
+def _cout(grandeurs, avec_logo=True):
+    cout = (COUT_BASE
+            + COUT_PAR_ARTICLE * grandeurs['articles']
+            + COUT_PAR_LIGNE_DETAIL * grandeurs['lignes_detail']
+            + COUT_PAR_KO_TEXTE * grandeurs['texte_ko'])
+    if avec_logo:
+        cout += COUT_LOGO * grandeurs['logo'] + COUT_PAR_MO_LOGO * grandeurs['logo_mo']
+    return cout
+
+
+def estimer_cout(document, nb_formats=1):
+    """Coût estimé du rendu : articles, lignes de détail, longueur des textes et taille du logo"""
+    return round(_cout(mesurer(document)) * nb_formats, 3)
+
+
+def estimer_cout_lot(documents):
+    """Coût d'un lot de documents rendus dans un seul PDF (chaque logo n'est préparé qu'une fois)"""
+    cout = 0.0
+    logos = set()
+    for document in documents:
+        cout += _cout(mesurer(document), avec_logo=document.logo_url not in logos)
+        logos.add(document.logo_url)
+    return round(cout, 3)
+
+
+def admettre(cout, seuil=None, budget=None):
+    """Retourne True si le rendu doit passer en tâche de fond, lève CoutExcessif au-delà du budget"""
+    budget = BUDGET_MAX if budget is None else budget
+    if cout > budget:
+        raise CoutExcessif(cout, budget)
+    return cout > (SEUIL_ARRIERE_PLAN if seuil is None else seuil)
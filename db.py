@@ -0,0 +1,37 @@
+# db.py - Connexions SQLite locales partagées par les modules de l'application
+#
+# Une connexion par thread et par fichier, en mode WAL pour que plusieurs workers
+# Gunicorn puissent lire pendant qu'un autre écrit.
+import os
+import sqlite3
+import threading
+
+_local = threading.local()
+
+
+def connecter(chemin):
+    """Connexion SQLite du thread courant pour ce fichier (créée au premier appel)"""
+    connexions = getattr(_local, 'connexions', None)
+    if connexions is None:
+        connexions = _local.connexions = {}
+
+    connexion = connexions.get(chemin)
+    if connexion is None:
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        connexion = sqlite3.connect(chemin, timeout=30, isolation_level=None)
+        connexion.row_factory = sqlite3.Row
+        connexion.execute('PRAGMA journal_mode=WAL')
+        connexion.execute('PRAGMA synchronous=NORMAL')
+        connexion.execute('PRAGMA busy_timeout=30000')
+        connexions[chemin] = connexion
+    return connexion
+
+
+def fermer(chemin):
+    """Fermer la connexion du thread courant (tests, fin de processus)"""
+    connexions = getattr(_local, 'connexions', {})
+    connexion = connexions.pop(chemin, None)
+    if connexion is not None:
+        connexion.close()
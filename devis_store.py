@@ -0,0 +1,67 @@
+# devis_store.py - Devis générés, conservés pour être convertis en facture
+#
+# Chaque devis rendu par l'API est enregistré (données validées, articles et totaux)
+# dans une base SQLite locale, sous la clé (client, numéro). POST /api/devis/<numero>/facture
+# reconstruit le devis depuis cette base au lieu de demander au client de renvoyer
+# tout le contenu : pas de nouvelle validation des articles ni de recalcul des totaux.
+# PATCH /api/devis/<numero> y reprend le devis à modifier.
+#
+# DEVIS_DB fixe le fichier (generated/devis.sqlite3 par défaut) ; les devis plus anciens
+# que DEVIS_CONSERVATION_JOURS sont purgés au démarrage.
+import json
+import time
+
+import db
+from models import Devis, DevisItem
+
+# Champs de DevisItem passés à son constructeur
+CHAMPS_ARTICLE = ('description', 'details', 'quantite', 'prix_unitaire', 'tva_taux', 'remise')
+# Attributs calculés, restaurés tels quels
+CHAMPS_TOTAUX = ('total_ht', 'total_tva', 'total_ttc')
+
+
+class DevisStore:
+    """Devis par (client, numéro) dans une base SQLite partagée par les workers"""
+
+    SCHEMA_SQL = (
+        "CREATE TABLE IF NOT EXISTS devis (tenant TEXT NOT NULL, numero TEXT NOT NULL, donnees TEXT NOT NULL, "
+        "total_ht REAL NOT NULL, total_tva REAL NOT NULL, total_ttc REAL NOT NULL, cree_le REAL NOT NULL, "
+        "PRIMARY KEY (tenant, numero))",
+        "CREATE INDEX IF NOT EXISTS devis_cree_le ON devis (cree_le)",
+    )
+
+    def __init__(self, chemin, conservation_jours=365):
+        self.chemin = chemin
+        connexion = db.connecter(chemin)
+        for instruction in self.SCHEMA_SQL:
+            connexion.execute(instruction)
+        if conservation_jours:
+            connexion.execute('DELETE FROM devis WHERE cree_le < ?', (time.time() - conservation_jours * 86400,))
+
+    def enregistrer(self, devis, tenant_id):
+        """Enregistrer (ou remplacer) le devis de ce client sous son numéro"""
+        champs = {nom: valeur for nom, valeur in vars(devis).items() if nom != 'items' and nom not in CHAMPS_TOTAUX}
+        champs['items'] = [{nom: getattr(item, nom) for nom in CHAMPS_ARTICLE} for item in devis.items]
+        db.connecter(self.chemin).execute(
+            'INSERT OR REPLACE INTO devis (tenant, numero, donnees, total_ht, total_tva, total_ttc, cree_le) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (tenant_id, devis.numero, json.dumps(champs, ensure_ascii=False),
+             devis.total_ht, devis.total_tva, devis.total_ttc, time.time())
+        )
+
+    def obtenir(self, numero, tenant_id):
+        """Devis reconstruit (articles et totaux compris), ou None s'il est inconnu"""
+        ligne = db.connecter(self.chemin).execute(
+            'SELECT donnees, total_ht, total_tva, total_ttc FROM devis WHERE tenant = ? AND numero = ?',
+            (tenant_id, numero)
+        ).fetchone()
+        if ligne is None:
+            return None
+
+        champs = json.loads(ligne['donnees'])
+        items = champs.pop('items')
+        devis = Devis(**champs)
+        devis.items = [DevisItem(**item) for item in items]
+        for nom in CHAMPS_TOTAUX:
+            setattr(devis, nom, ligne[nom])
+        return devis
@@ -0,0 +1,174 @@
+# document_store.py - Stockage des documents générés (noms uniques, TTL, quota disque)
+#
+# Chaque rendu écrit dans un fichier temporaire unique puis est publié par renommage
+# atomique sous <dossier>/<id>.<ext>, avec ses métadonnées dans <id>.json. Le disque
+# fait foi : plusieurs workers Gunicorn peuvent partager le même dossier, et la date
+# de modification du fichier de métadonnées sert de date de dernier accès (LRU).
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+ID_VALIDE = re.compile(r'^[0-9a-f]{32}$')
+
+journal = logging.getLogger(__name__)
+
+
+def empreinte_fichier(chemin):
+    """SHA-256 du contenu du fichier (ETag fort des téléchargements)"""
+    h = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+class DocumentStore:
+    """Stockage des documents générés avec éviction TTL et LRU sous quota disque"""
+
+    def __init__(self, dossier, ttl=3600, quota_octets=500 * 1024 * 1024, intervalle=60,
+                 conserver_factures=False):
+        self.dossier = dossier
+        self.dossier_temp = os.path.join(dossier, '.tmp')
+        self.ttl = ttl
+        self.quota_octets = quota_octets
+        self.intervalle = intervalle
+        self.conserver_factures = conserver_factures
+        self._thread = None
+        self._arret = threading.Event()
+        os.makedirs(self.dossier_temp, exist_ok=True)
+
+    def _chemin_meta(self, doc_id):
+        return os.path.join(self.dossier, f'{doc_id}.json')
+
+    def chemin_temporaire(self, extension):
+        """Chemin unique dans lequel le générateur peut écrire sans collision"""
+        return os.path.join(self.dossier_temp, f'{uuid.uuid4().hex}.{extension}')
+
+    def enregistrer(self, chemin_temporaire, nom_telechargement, mimetype, type_document='devis', **infos):
+        """Publier un fichier temporaire dans le stockage, retourne l'identifiant du document"""
+        doc_id = uuid.uuid4().hex
+        extension = os.path.splitext(chemin_temporaire)[1]
+        chemin = os.path.join(self.dossier, f'{doc_id}{extension}')
+        os.replace(chemin_temporaire, chemin)
+
+        meta = {
+            'id': doc_id,
+            'fichier': os.path.basename(chemin),
+            'nom': nom_telechargement,
+            'mimetype': mimetype,
+            'type': type_document,
+            'taille': os.path.getsize(chemin),
+            'sha256': empreinte_fichier(chemin),
+            'cree_le': time.time(),
+            'conserver': self.conserver_factures and type_document == 'facture',
+        }
+        meta.update(infos)
+
+        # Les métadonnées sont écrites en dernier : un document est visible quand son .json existe
+        temp_meta = os.path.join(self.dossier_temp, f'{doc_id}.json')
+        with open(temp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_meta, self._chemin_meta(doc_id))
+        return doc_id
+
+    def obtenir(self, doc_id):
+        """Retourner les métadonnées du document (avec 'chemin'), ou None s'il n'existe plus"""
+        if not doc_id or not ID_VALIDE.match(doc_id):
+            return None
+        chemin_meta = self._chemin_meta(doc_id)
+        try:
+            with open(chemin_meta, encoding='utf-8') as f:
+                meta = json.load(f)
+            os.utime(chemin_meta)  # dernier accès, pour l'éviction LRU
+        except (OSError, ValueError):
+            return None
+
+        meta['chemin'] = os.path.join(self.dossier, meta['fichier'])
+        if not os.path.exists(meta['chemin']):
+            return None
+        return meta
+
+    def supprimer(self, doc_id):
+        meta_chemin = self._chemin_meta(doc_id)
+        try:
+            with open(meta_chemin, encoding='utf-8') as f:
+                fichier = json.load(f)['fichier']
+        except (OSError, ValueError, KeyError):
+            fichier = None
+        for chemin in (meta_chemin, os.path.join(self.dossier, fichier) if fichier else None):
+            if chemin:
+                try:
+                    os.remove(chemin)
+                except FileNotFoundError:
+                    pass
+
+    def _lister(self):
+        documents = []
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith('.json') or not ID_VALIDE.match(nom[:-5]):
+                continue
+            chemin_meta = os.path.join(self.dossier, nom)
+            try:
+                dernier_acces = os.path.getmtime(chemin_meta)
+                with open(chemin_meta, encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            documents.append((dernier_acces, meta))
+        return documents
+
+    def evincer(self):
+        """Supprimer les documents expirés puis les moins récemment utilisés au-delà du quota"""
+        maintenant = time.time()
+        supprimes = 0
+        restants = []
+
+        for dernier_acces, meta in self._lister():
+            if meta.get('conserver'):
+                continue
+            if maintenant - dernier_acces > self.ttl:
+                self.supprimer(meta['id'])
+                supprimes += 1
+            else:
+                restants.append((dernier_acces, meta))
+
+        total = sum(meta.get('taille', 0) for _, meta in restants)
+        for _, meta in sorted(restants, key=lambda r: r[0]):
+            if total <= self.quota_octets:
+                break
+            self.supprimer(meta['id'])
+            total -= meta.get('taille', 0)
+            supprimes += 1
+
+        # Fichiers temporaires abandonnés (rendu interrompu)
+        for nom in os.listdir(self.dossier_temp):
+            chemin = os.path.join(self.dossier_temp, nom)
+            try:
+                if maintenant - os.path.getmtime(chemin) > self.ttl:
+                    os.remove(chemin)
+            except OSError:
+                pass
+
+        return supprimes
+
+    def _boucle_nettoyage(self):
+        while not self._arret.wait(self.intervalle):
+            try:
+                self.evincer()
+            except Exception:
+                journal.exception("Erreur lors du nettoyage des documents")
+
+    def demarrer_nettoyage(self):
+        """Lancer l'éviction périodique dans un thread d'arrière-plan"""
+        if self._thread is None or not self._thread.is_alive():
+            self._arret.clear()
+            self._thread = threading.Thread(target=self._boucle_nettoyage, daemon=True)
+            self._thread.start()
+
+    def arreter_nettoyage(self):
+        self._arret.set()
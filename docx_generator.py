@@ -6,41 +6,20 @@ from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 import os
-import requests
 from io import BytesIO
 
-# Thèmes de couleurs pour DOCX (format RGB)
+from assets import telecharger_logo
+from number_format import formater_colonne, formater_montant, formater_quantite, formater_taux
+from themes import THEMES, hex_vers_rgb
+
+# Thèmes de couleurs pour DOCX (format RGB), dérivés de la définition commune dans themes.py
 THEMES_COULEURS_DOCX = {
-    'bleu': {
-        'principale': RGBColor(44, 62, 80),
-        'header_bg': "2d3436",
-        'accent': RGBColor(52, 152, 219)
-    },
-    'vert': {
-        'principale': RGBColor(39, 174, 96),
-        'header_bg': "1e8449", 
-        'accent': RGBColor(88, 214, 141)
-    },
-    'rouge': {
-        'principale': RGBColor(231, 76, 60),
-        'header_bg': "c0392b",
-        'accent': RGBColor(241, 148, 138)
-    },
-    'violet': {
-        'principale': RGBColor(155, 89, 182),
-        'header_bg': "8e44ad",
-        'accent': RGBColor(215, 189, 226)
-    },
-    'orange': {
-        'principale': RGBColor(230, 126, 34),
-        'header_bg': "d35400",
-        'accent': RGBColor(245, 176, 65)
-    },
-    'noir': {
-        'principale': RGBColor(44, 62, 80),
-        'header_bg': "2c3e50",
-        'accent': RGBColor(149, 165, 166)
+    nom: {
+        'principale': RGBColor(*hex_vers_rgb(couleurs['principale'])),
+        'header_bg': couleurs['header_bg'].lstrip('#'),
+        'accent': RGBColor(*hex_vers_rgb(couleurs['accent']))
     }
+    for nom, couleurs in THEMES.items()
 }
 
 def set_cell_background(cell, color):
@@ -55,10 +34,10 @@ def download_and_add_logo(doc, logo_url):
         return None
     
     try:
-        # Télécharger l'image avec un timeout
-        response = requests.get(logo_url, timeout=10)
-        if response.status_code == 200:
-            img_data = BytesIO(response.content)
+        # Télécharger l'image (ou la reprendre du cache)
+        contenu = telecharger_logo(logo_url)
+        if contenu is not None:
+            img_data = BytesIO(contenu)
             
             # Créer un paragraphe pour le logo aligné à droite
             logo_paragraph = doc.add_paragraph()
@@ -104,9 +83,9 @@ def create_header_with_logo_and_title(doc, logo_url, title):
     # Télécharger et ajouter le logo
     if logo_url:
         try:
-            response = requests.get(logo_url, timeout=10)
-            if response.status_code == 200:
-                img_data = BytesIO(response.content)
+            contenu = telecharger_logo(logo_url)
+            if contenu is not None:
+                img_data = BytesIO(contenu)
                 run = logo_paragraph.add_run()
                 run.add_picture(img_data, width=Inches(1.2))  # 1.2 pouces de largeur
         except Exception as e:
@@ -126,12 +105,13 @@ def create_header_with_logo_and_title(doc, logo_url, title):
     
     return header_table
 
-def generate_docx_devis(devis, theme='bleu'):
+def generate_docx_devis(devis, theme='bleu', filename=None):
     """Générer un DOCX de devis modifiable avec thème coloré et logo"""
     # Récupérer les couleurs du thème
     couleurs = THEMES_COULEURS_DOCX.get(theme, THEMES_COULEURS_DOCX['bleu'])
     
-    filename = os.path.join('generated', f'devis_{devis.numero}_{theme}.docx')
+    if filename is None:
+        filename = os.path.join('generated', f'devis_{devis.numero}_{theme}.docx')
     doc = Document()
     
     # Styles du document
@@ -210,8 +190,14 @@ def generate_docx_devis(devis, theme='bleu'):
         if i > 0:
             header_cells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
     
+    # Colonnes formatées en une passe (chaque valeur distincte n'est formatée qu'une fois)
+    quantites = formater_colonne((item.quantite for item in devis.items), formater_quantite)
+    prix = formater_colonne(item.prix_unitaire for item in devis.items)
+    taux = formater_colonne((item.tva_taux for item in devis.items), formater_taux)
+    totaux = formater_colonne(item.total_ht for item in devis.items)
+    
     # Articles
-    for item in devis.items:
+    for item, quantite, prix_unitaire, tva, total in zip(devis.items, quantites, prix, taux, totaux):
         row = items_table.add_row()
         cells = row.cells
         
@@ -222,10 +208,10 @@ def generate_docx_devis(devis, theme='bleu'):
         cells[0].text = desc_text
         
         # Données numériques
-        cells[1].text = str(item.quantite)
-        cells[2].text = f'{item.prix_unitaire:.2f} €'
-        cells[3].text = f'{item.tva_taux} %'
-        cells[4].text = f'{item.total_ht:.2f} €'
+        cells[1].text = quantite
+        cells[2].text = prix_unitaire
+        cells[3].text = tva
+        cells[4].text = total
         
         # Alignement des cellules numériques
         for i in range(1, 5):
@@ -236,7 +222,7 @@ def generate_docx_devis(devis, theme='bleu'):
             remise_row = items_table.add_row()
             remise_cells = remise_row.cells
             remise_cells[3].text = 'Remise'
-            remise_cells[4].text = f'-{item.remise:.2f} €'
+            remise_cells[4].text = f'-{formater_montant(item.remise)}'
             remise_cells[4].paragraphs[0].runs[0].font.color.rgb = RGBColor(231, 76, 60)  # Rouge
             remise_cells[3].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
             remise_cells[4].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
@@ -248,9 +234,9 @@ def generate_docx_devis(devis, theme='bleu'):
     totals_table.style = 'Light List'
     
     totals_data = [
-        ('Total HT', f'{devis.total_ht:.2f} €'),
-        ('TVA (20%)', f'{devis.total_tva:.2f} €'),
-        ('TOTAL TTC', f'{devis.total_ttc:.2f} €')
+        ('Total HT', formater_montant(devis.total_ht)),
+        ('TVA (20%)', formater_montant(devis.total_tva)),
+        ('TOTAL TTC', formater_montant(devis.total_ttc))
     ]
     
     for i, (label, value) in enumerate(totals_data):
@@ -308,12 +294,13 @@ def generate_docx_devis(devis, theme='bleu'):
     doc.save(filename)
     return filename
 
-def generate_docx_facture(facture, theme='bleu'):
+def generate_docx_facture(facture, theme='bleu', filename=None):
     """Générer un DOCX de facture modifiable avec thème coloré et logo"""
     # Récupérer les couleurs du thème
     couleurs = THEMES_COULEURS_DOCX.get(theme, THEMES_COULEURS_DOCX['bleu'])
     
-    filename = os.path.join('generated', f'facture_{facture.numero}_{theme}.docx')
+    if filename is None:
+        filename = os.path.join('generated', f'facture_{facture.numero}_{theme}.docx')
     doc = Document()
     
     # Styles du document
@@ -397,8 +384,14 @@ def generate_docx_facture(facture, theme='bleu'):
         run.font.color.rgb = RGBColor(255, 255, 255)
         set_cell_background(header_cells[i], couleurs['header_bg'])
     
+    # Colonnes formatées en une passe
+    quantites = formater_colonne((item.quantite for item in facture.items), formater_quantite)
+    prix = formater_colonne(item.prix_unitaire for item in facture.items)
+    taux = formater_colonne((item.tva_taux for item in facture.items), formater_taux)
+    totaux = formater_colonne(item.total_ht for item in facture.items)
+    
     # Ajouter les articles
-    for item in facture.items:
+    for item, quantite, prix_unitaire, tva, total in zip(facture.items, quantites, prix, taux, totaux):
         row = items_table.add_row()
         cells = row.cells
         
@@ -407,10 +400,10 @@ def generate_docx_facture(facture, theme='bleu'):
             desc_text += '\n' + '\n'.join([f'• {detail}' for detail in item.details])
         
         cells[0].text = desc_text
-        cells[1].text = str(item.quantite)
-        cells[2].text = f'{item.prix_unitaire:.2f} €'
-        cells[3].text = f'{item.tva_taux} %'
-        cells[4].text = f'{item.total_ht:.2f} €'
+        cells[1].text = quantite
+        cells[2].text = prix_unitaire
+        cells[3].text = tva
+        cells[4].text = total
         
         for i in range(1, 5):
             cells[i].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
@@ -421,9 +414,9 @@ def generate_docx_facture(facture, theme='bleu'):
     totals_table.style = 'Light List'
     
     totals_data = [
-        ('Total HT', f'{facture.total_ht:.2f} €'),
-        ('TVA (20%)', f'{facture.total_tva:.2f} €'),
-        ('TOTAL TTC', f'{facture.total_ttc:.2f} €')
+        ('Total HT', formater_montant(facture.total_ht)),
+        ('TVA (20%)', formater_montant(facture.total_tva)),
+        ('TOTAL TTC', formater_montant(facture.total_ttc))
     ]
     
     for i, (label, value) in enumerate(totals_data):
@@ -0,0 +1,97 @@
+# gunicorn.conf.py - Configuration Gunicorn avec profils adaptés au rendu des documents
+#
+# Chargé automatiquement par `gunicorn -c gunicorn.conf.py app_students:app`.
+# Le profil se choisit avec la variable d'environnement GUNICORN_PROFIL :
+#   - "cpu"    : workers processus synchrones, un par cœur (rendu ReportLab/python-docx)
+#   - "io"     : workers multi-threadés (beaucoup de logos à télécharger)
+#   - "gevent" : workers coopératifs gevent (I/O très majoritaire), repli sur "io"
+#                si gevent n'est pas installé
+import os
+
+
+def _nombre_coeurs():
+    """Nombre de cœurs réellement utilisables par le processus"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(nom, defaut):
+    valeur = os.environ.get(nom)
+    return int(valeur) if valeur else defaut
+
+
+PROFILS = {
+    'cpu': {
+        'worker_class': 'sync',
+        'workers': lambda coeurs: coeurs + 1,
+        'threads': 1,
+    },
+    'io': {
+        'worker_class': 'gthread',
+        'workers': lambda coeurs: max(2, coeurs),
+        'threads': 8,
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'workers': lambda coeurs: coeurs,
+        'threads': 1,
+        'worker_connections': 200,
+    },
+}
+
+profil_nom = os.environ.get('GUNICORN_PROFIL', 'cpu').lower()
+if profil_nom not in PROFILS:
+    print(f"⚠️ Profil Gunicorn inconnu '{profil_nom}', utilisation du profil 'cpu'")
+    profil_nom = 'cpu'
+
+if profil_nom == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("⚠️ gevent n'est pas installé, utilisation du profil 'io'")
+        profil_nom = 'io'
+
+profil = PROFILS[profil_nom]
+coeurs = _nombre_coeurs()
+
+# Écoute
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Workers (WEB_CONCURRENCY / GUNICORN_WORKERS permettent de forcer le nombre)
+worker_class = profil['worker_class']
+workers = _env_int('GUNICORN_WORKERS', _env_int('WEB_CONCURRENCY', profil['workers'](coeurs)))
+threads = _env_int('GUNICORN_THREADS', profil['threads'])
+if 'worker_connections' in profil:
+    worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', profil['worker_connections'])
+
+# Délais : un devis de plusieurs centaines de lignes peut prendre plusieurs secondes,
+# et un logo lent peut à lui seul consommer 10 s
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recyclage des workers pour contenir la croissance mémoire de ReportLab,
+# avec une gigue pour éviter qu'ils redémarrent tous en même temps
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 500)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max(1, max_requests // 10))
+
+# Journaux sur la sortie standard (Railway)
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def when_ready(server):
+    server.log.info(
+        f"Profil '{profil_nom}' : {workers} worker(s) {worker_class}, "
+        f"{threads} thread(s), timeout {timeout}s, max_requests {max_requests}±{max_requests_jitter}"
+    )
+
+
+def post_worker_init(worker):
+    # Préchauffage des caches de rendu dès le démarrage du worker (voir warmup.py) :
+    # GET /health répond 503 jusqu'à ce qu'il soit terminé
+    from app_students import prechauffage
+    prechauffage.demarrer()
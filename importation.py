@@ -0,0 +1,159 @@
+# importation.py - Import en masse de devis depuis un export CSV (ou XLSX) d'ERP
+#
+# Une ligne par article, les articles d'un même devis sur des lignes consécutives portant
+# le même "numero". Les colonnes du devis (client_nom, client_siret, date_emission...) sont
+# lues sur la première ligne du groupe ; les colonnes d'article sont celles d'ITEM_SCHEMA
+# (description, details séparés par "|", quantite, prix_unitaire, tva_taux, remise).
+#
+#   numero;client_nom;description;quantite;prix_unitaire
+#   D-001;ACME;Audit;1;1500
+#   D-001;;Formation;2;800
+#   D-002;Globex;Licence;10;49,90
+#
+# Le CSV est lu au fil de l'eau (séparateur ";" ou "," détecté sur l'en-tête) : un devis
+# est construit dès que son groupe de lignes est complet. Le XLSX nécessite openpyxl
+# (optionnel) et, étant une archive ZIP, doit être reçu en entier avant d'être lu.
+import codecs
+import csv
+import io
+import itertools
+import tempfile
+import zipfile
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl est optionnel : import CSV seulement
+    openpyxl = None
+
+from validation import ITEM_SCHEMA
+
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+COLONNES_ARTICLE = {champ.nom for champ in ITEM_SCHEMA.champs}
+SEPARATEUR_DETAILS = '|'
+COLONNES_RESULTATS = ('ligne', 'numero', 'statut', 'document_id', 'fichier', 'total_ht', 'total_ttc', 'erreur')
+
+
+class ImportInvalide(Exception):
+    """Fichier d'import illisible (format, en-tête)"""
+
+
+def _lignes_csv(flux):
+    texte = codecs.getreader('utf-8-sig')(flux, errors='replace')
+    entete = texte.readline()
+    if not entete.strip():
+        raise ImportInvalide("Fichier vide")
+    separateur = ';' if entete.count(';') >= entete.count(',') else ','
+    return csv.reader(itertools.chain([entete], texte), delimiter=separateur)
+
+
+def _lignes_xlsx(flux):
+    if openpyxl is None:
+        raise ImportInvalide("Import XLSX indisponible (module openpyxl non installé), envoyez un CSV")
+    copie = tempfile.TemporaryFile()
+    while True:
+        bloc = flux.read(64 * 1024)
+        if not bloc:
+            break
+        copie.write(bloc)
+    copie.seek(0)
+    classeur = openpyxl.load_workbook(copie, read_only=True, data_only=True)
+    for valeurs in classeur.active.iter_rows(values_only=True):
+        yield ['' if valeur is None else str(valeur) for valeur in valeurs]
+    classeur.close()
+    copie.close()
+
+
+def lire_lignes(flux, mimetype=None):
+    """Lignes du fichier en dictionnaires (colonne -> valeur non vide), avec leur numéro de ligne
+
+    L'en-tête est lu et vérifié immédiatement (lève ImportInvalide), le reste à l'itération.
+    """
+    lignes = _lignes_xlsx(flux) if mimetype == MIMETYPE_XLSX else _lignes_csv(flux)
+    entete = [colonne.strip().lower() for colonne in next(lignes, [])]
+    if 'numero' not in entete:
+        raise ImportInvalide("La colonne 'numero' est obligatoire")
+
+    def iterer():
+        for numero_ligne, valeurs in enumerate(lignes, start=2):
+            ligne = {colonne: valeur.strip() for colonne, valeur in zip(entete, valeurs) if colonne and valeur.strip()}
+            if ligne:
+                yield numero_ligne, ligne
+    return iterer()
+
+
+def regrouper_devis(lignes):
+    """Données JSON de chaque devis (comme pour POST /api/devis), groupe par groupe
+
+    Produit (première ligne, numéro, données) ; un numéro qui réapparaît après un autre
+    devis donne des données None (lignes non regroupées).
+    """
+    vus = set()
+    for numero, groupe in itertools.groupby(lignes, key=lambda element: element[1].get('numero', '')):
+        groupe = list(groupe)
+        premiere = groupe[0][0]
+        if not numero or numero in vus:
+            yield premiere, numero, None
+            continue
+        vus.add(numero)
+
+        data = {colonne: valeur for colonne, valeur in groupe[0][1].items() if colonne not in COLONNES_ARTICLE}
+        data['items'] = []
+        for _, ligne in groupe:
+            item = {colonne: valeur for colonne, valeur in ligne.items() if colonne in COLONNES_ARTICLE}
+            if 'details' in item:
+                item['details'] = [detail.strip() for detail in item['details'].split(SEPARATEUR_DETAILS)
+                                   if detail.strip()]
+            data['items'].append(item)
+        yield premiere, numero, data
+
+
+class _Tampon(io.RawIOBase):
+    """Flux d'écriture non positionnable dont on vide le contenu au fur et à mesure"""
+
+    def __init__(self):
+        self._morceaux = []
+
+    def writable(self):
+        return True
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def vider(self):
+        contenu = b''.join(self._morceaux)
+        self._morceaux = []
+        return contenu
+
+
+class ZipEnFlux:
+    """Archive ZIP produite morceau par morceau (réponse HTTP en chunked)
+
+    zipfile écrit les tailles après chaque fichier (descripteurs de données) quand la
+    sortie n'est pas positionnable : rien n'est gardé en mémoire entre deux fichiers.
+    """
+
+    def __init__(self):
+        self._tampon = _Tampon()
+        self._archive = zipfile.ZipFile(self._tampon, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def ajouter_fichier(self, chemin, nom):
+        self._archive.write(chemin, arcname=nom)
+        return self._tampon.vider()
+
+    def ajouter(self, nom, contenu):
+        self._archive.writestr(nom, contenu)
+        return self._tampon.vider()
+
+    def fermer(self):
+        self._archive.close()
+        return self._tampon.vider()
+
+
+def csv_resultats(resultats):
+    """Contenu du fichier resultats.csv"""
+    sortie = io.StringIO()
+    ecrivain = csv.DictWriter(sortie, fieldnames=COLONNES_RESULTATS, delimiter=';', extrasaction='ignore')
+    ecrivain.writeheader()
+    ecrivain.writerows(resultats)
+    return sortie.getvalue().encode('utf-8-sig')
@@ -0,0 +1,115 @@
+# jobs.py - File des rendus exécutés en tâche de fond
+#
+# Les rendus trop coûteux pour être faits dans la requête (voir cost.admettre) sont
+# exécutés par un pool de threads du worker qui les reçoit. L'état de chaque tâche est
+# écrit dans <dossier>/<id>.json : n'importe quel worker Gunicorn peut répondre à
+# GET /api/jobs/<id>, et une tâche "en_cours" depuis plus de duree_max secondes (worker
+# arrêté pendant le rendu) est signalée en erreur. Une tâche en attente n'expire que
+# par le ttl, quelle que soit la longueur de la file.
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from document_store import ID_VALIDE
+from rate_limit import QuotaDepasse
+
+EN_ATTENTE = 'en_attente'
+EN_COURS = 'en_cours'
+TERMINE = 'termine'
+ERREUR = 'erreur'
+
+journal = logging.getLogger(__name__)
+
+
+class FileRendus:
+    """Pool de rendus en tâche de fond avec état persistant sur disque"""
+
+    def __init__(self, dossier, workers=1, max_en_attente=100, ttl=3600, duree_max=600):
+        self.dossier = dossier
+        self.max_en_attente = max_en_attente
+        self.ttl = ttl
+        self.duree_max = duree_max
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rendu')
+        self._en_attente = 0
+        self._lock = threading.Lock()
+        self._dernier_nettoyage = 0.0
+        os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, job_id):
+        return os.path.join(self.dossier, f'{job_id}.json')
+
+    def _ecrire(self, etat):
+        etat['maj'] = time.time()
+        temp = os.path.join(self.dossier, f".{etat['id']}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(etat, f, ensure_ascii=False)
+        os.replace(temp, self._chemin(etat['id']))
+
+    def soumettre(self, fonction, *args, **infos):
+        """Mettre un rendu en file, retourne l'identifiant de la tâche
+
+        `fonction(*args)` doit retourner un dict JSON, recopié dans l'état de la tâche.
+        Lève QuotaDepasse si la file de ce worker est pleine.
+        """
+        with self._lock:
+            if self._en_attente >= self.max_en_attente:
+                raise QuotaDepasse("File de rendus pleine", 5)
+            self._en_attente += 1
+
+        job_id = uuid.uuid4().hex
+        etat = {'id': job_id, 'statut': EN_ATTENTE, 'cree_le': time.time()}
+        etat.update(infos)
+        self._ecrire(etat)
+        self._pool.submit(self._executer, etat, fonction, args)
+        self._nettoyer_si_necessaire()
+        return job_id
+
+    def _executer(self, etat, fonction, args):
+        with self._lock:
+            self._en_attente -= 1
+        etat.update(statut=EN_COURS, debut=time.time())
+        self._ecrire(etat)
+        try:
+            etat.update(fonction(*args))
+            etat['statut'] = TERMINE
+        except Exception as e:
+            journal.exception("Erreur du rendu en tâche de fond %s", etat['id'])
+            etat.update(statut=ERREUR, error=str(e))
+        etat['duree_s'] = round(time.time() - etat['debut'], 3)
+        self._ecrire(etat)
+
+    def obtenir(self, job_id):
+        """État de la tâche, ou None si elle est inconnue ou expirée"""
+        if not job_id or not ID_VALIDE.match(job_id):
+            return None
+        try:
+            with open(self._chemin(job_id), encoding='utf-8') as f:
+                etat = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Seul un rendu commencé peut avoir été interrompu : une tâche en attente n'expire
+        # que par le ttl, quelle que soit la longueur de la file
+        if etat['statut'] == EN_COURS and time.time() - etat.get('debut', etat['maj']) > self.duree_max:
+            etat.update(statut=ERREUR, error="Rendu interrompu")
+        return etat
+
+    def _nettoyer_si_necessaire(self):
+        maintenant = time.time()
+        if maintenant - self._dernier_nettoyage < 60:
+            return
+        self._dernier_nettoyage = maintenant
+        for nom in os.listdir(self.dossier):
+            chemin = os.path.join(self.dossier, nom)
+            try:
+                if maintenant - os.path.getmtime(chemin) > self.ttl:
+                    os.remove(chemin)
+            except OSError:
+                pass
+
+    def arreter(self, attendre=True):
+        self._pool.shutdown(wait=attendre)
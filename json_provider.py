@@ -0,0 +1,40 @@
+# json_provider.py - Sérialisation JSON rapide pour Flask (orjson si disponible)
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Fournisseur JSON utilisant orjson quand il est installé, json sinon"""
+
+    nom_decodeur = 'orjson' if orjson is not None else 'json'
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        # orjson.JSONDecodeError hérite de ValueError : Flask le traite comme le module standard
+        return orjson.loads(s)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        options = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=options).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+
+def charger_json(contenu):
+    """Décoder du JSON hors contexte Flask avec le même décodeur que l'application"""
+    if orjson is not None:
+        return orjson.loads(contenu)
+    return json.loads(contenu)
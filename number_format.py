@@ -0,0 +1,72 @@
+# number_format.py - Formatage des nombres et montants selon les conventions françaises
+#
+#   formater_montant(1234.5)  -> "1 234,50 €"
+#   formater_taux(5.5)        -> "5,5 %"
+#   formater_quantite(1000)   -> "1 000"
+#
+# Séparateur de milliers et espace avant € / % : espace insécable U+00A0. L'espace fine
+# insécable (U+202F) recommandée par l'Imprimerie nationale n'existe pas dans le
+# codage des polices standard PDF (Helvetica), elle s'afficherait comme un glyphe manquant.
+#
+# Les mêmes valeurs reviennent d'une ligne et d'un document à l'autre (prix catalogue,
+# taux de TVA, quantités) : chaque fonction est mémoïsée, et formater_colonne formate
+# une colonne entière en ne calculant qu'une fois chaque valeur distincte.
+from functools import lru_cache
+
+ESPACE_INSECABLE = '\u00a0'
+TAILLE_MEMO = 8192
+
+
+def _grouper(entier):
+    """Chiffres d'un entier positif (chaîne) groupés par milliers"""
+    if len(entier) <= 3:
+        return entier
+    tete = len(entier) % 3 or 3
+    groupes = [entier[:tete]] + [entier[i:i + 3] for i in range(tete, len(entier), 3)]
+    return ESPACE_INSECABLE.join(groupes)
+
+
+def _formater(valeur, decimales):
+    # Toujours en notation positionnelle (jamais 1e+16 ni 1e-05) ; sans nombre de décimales,
+    # six au plus, zéros finaux retirés plus bas (0.1 + 0.2 -> "0,3")
+    texte = f"{valeur:.{decimales}f}" if decimales is not None else f"{float(valeur):f}"
+    signe = ''
+    if texte.startswith('-'):
+        signe, texte = '-', texte[1:]
+    if signe and not texte.strip('0.'):
+        signe = ''  # "-0,00" après arrondi
+    entier, _, fraction = texte.partition('.')
+    if decimales is None:
+        fraction = fraction.rstrip('0')
+    return signe + _grouper(entier) + (',' + fraction if fraction else '')
+
+
+@lru_cache(maxsize=TAILLE_MEMO)
+def formater_nombre(valeur, decimales=2):
+    """Nombre à la française : "1 234,50" (decimales=None : sans zéros inutiles)"""
+    return _formater(valeur, decimales)
+
+
+@lru_cache(maxsize=TAILLE_MEMO)
+def formater_montant(valeur):
+    """Montant en euros : "1 234,50 €" """
+    return f"{formater_nombre(valeur)}{ESPACE_INSECABLE}€"
+
+
+@lru_cache(maxsize=TAILLE_MEMO)
+def formater_taux(valeur):
+    """Taux en pourcentage : "20 %", "5,5 %" """
+    return f"{formater_nombre(valeur, None)}{ESPACE_INSECABLE}%"
+
+
+@lru_cache(maxsize=TAILLE_MEMO)
+def formater_quantite(valeur):
+    """Quantité : "3", "1 000", "2,5" """
+    return formater_nombre(valeur, None)
+
+
+def formater_colonne(valeurs, formateur=formater_montant):
+    """Formater toute une colonne, chaque valeur distincte n'étant formatée qu'une fois"""
+    valeurs = list(valeurs)
+    textes = {valeur: formateur(valeur) for valeur in set(valeurs)}
+    return [textes[valeur] for valeur in valeurs]
@@ -0,0 +1,152 @@
+# numerotation.py - Numéros de devis et de factures attribués par client et par année
+#
+#   devis    : D-2025-000001, D-2025-000002, ...
+#   factures : F-2025-000001, F-2025-000002, ...
+#
+# Les séquences sont conservées dans une base SQLite locale partagée par les workers
+# (NUMEROTATION_DB, generated/numerotation.sqlite3 par défaut) :
+#   - devis : chaque worker réserve un bloc de NUMEROTATION_BLOC numéros en une seule
+#     transaction, puis les distribue depuis la mémoire. Pas de contention entre workers ;
+#     les numéros d'un bloc non épuisé (redémarrage) sont perdus, ce qui est sans
+#     conséquence pour un devis.
+#   - factures : la numérotation doit être continue (article 242 nonies A du CGI). Chaque
+#     numéro est pris dans sa propre transaction, écrite sur disque avant d'être rendu
+#     (synchronous=FULL), et consigné dans le journal `numeros_factures`. Le journal garde
+#     l'issue de chaque numéro : "attribue" à l'attribution, puis "emis" avec l'identifiant
+#     du document publié, ou "annule" avec le motif si le rendu a échoué. Un numéro sans
+#     facture est ainsi toujours justifié ; un numéro resté "attribue" signale un worker
+#     arrêté pendant le rendu.
+# Le numéro n'est attribué qu'une fois la requête admise (coût et limites de débit), juste
+# avant le rendu : une requête refusée ne consomme pas de numéro.
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import db
+
+PREFIXES = {'devis': 'D', 'facture': 'F'}
+CHIFFRES = 6
+
+# Issue d'un numéro de facture dans le journal
+ATTRIBUE = 'attribue'
+EMIS = 'emis'
+ANNULE = 'annule'
+
+SCHEMA_SQL = (
+    "CREATE TABLE IF NOT EXISTS sequences (tenant TEXT NOT NULL, type TEXT NOT NULL, annee INTEGER NOT NULL, "
+    "prochain INTEGER NOT NULL, PRIMARY KEY (tenant, type, annee))",
+    "CREATE TABLE IF NOT EXISTS numeros_factures (tenant TEXT NOT NULL, annee INTEGER NOT NULL, "
+    "sequence INTEGER NOT NULL, numero TEXT NOT NULL, attribue_le REAL NOT NULL, PRIMARY KEY (tenant, annee, sequence))",
+    "CREATE INDEX IF NOT EXISTS numeros_factures_numero ON numeros_factures (tenant, numero)",
+)
+
+
+def formater_numero(type_document, annee, sequence):
+    return f"{PREFIXES[type_document]}-{annee}-{sequence:0{CHIFFRES}d}"
+
+
+class Numerotation:
+    """Attribution des numéros, sans doublon entre workers ni trou dans les factures"""
+
+    def __init__(self, chemin, taille_bloc=100):
+        self.chemin = chemin
+        self.taille_bloc = max(1, taille_bloc)
+        self._blocs = {}
+        self._lock = threading.Lock()
+        connexion = db.connecter(chemin)
+        for instruction in SCHEMA_SQL:
+            connexion.execute(instruction)
+        for colonne in (f"statut TEXT NOT NULL DEFAULT '{ATTRIBUE}'", 'document_id TEXT', 'motif TEXT', 'maj REAL'):
+            try:
+                connexion.execute(f'ALTER TABLE numeros_factures ADD COLUMN {colonne}')
+            except sqlite3.OperationalError:
+                pass  # base déjà migrée
+
+    def _reserver(self, tenant_id, type_document, annee, quantite):
+        """Avancer la séquence de `quantite` numéros, retourne le premier (transaction dédiée)"""
+        connexion = db.connecter(self.chemin)
+        if type_document == 'facture':
+            connexion.execute('PRAGMA synchronous=FULL')
+        try:
+            return self._avancer(connexion, tenant_id, type_document, annee, quantite)
+        finally:
+            if type_document == 'facture':
+                # Connexion partagée par le thread : les écritures suivantes (blocs de devis) restent en NORMAL
+                connexion.execute('PRAGMA synchronous=NORMAL')
+
+    def _avancer(self, connexion, tenant_id, type_document, annee, quantite):
+        connexion.execute('BEGIN IMMEDIATE')
+        try:
+            connexion.execute('INSERT OR IGNORE INTO sequences (tenant, type, annee, prochain) VALUES (?, ?, ?, 1)',
+                              (tenant_id, type_document, annee))
+            premier = connexion.execute(
+                'UPDATE sequences SET prochain = prochain + ? WHERE tenant = ? AND type = ? AND annee = ? '
+                'RETURNING prochain - ?',
+                (quantite, tenant_id, type_document, annee, quantite)
+            ).fetchone()[0]
+            if type_document == 'facture':
+                connexion.execute(
+                    'INSERT INTO numeros_factures (tenant, annee, sequence, numero, attribue_le) VALUES (?, ?, ?, ?, ?)',
+                    (tenant_id, annee, premier, formater_numero(type_document, annee, premier), time.time())
+                )
+            connexion.execute('COMMIT')
+        except Exception:
+            if connexion.in_transaction:
+                connexion.execute('ROLLBACK')
+            raise
+        return premier
+
+    def allouer(self, type_document, tenant_id):
+        """Prochain numéro du client pour l'année en cours"""
+        annee = datetime.now().year
+        if type_document == 'facture':
+            return formater_numero(type_document, annee, self._reserver(tenant_id, type_document, annee, 1))
+
+        cle = (tenant_id, type_document, annee)
+        with self._lock:
+            prochain, fin = self._blocs.get(cle, (0, 0))
+            if prochain >= fin:
+                prochain = self._reserver(tenant_id, type_document, annee, self.taille_bloc)
+                fin = prochain + self.taille_bloc
+            self._blocs[cle] = (prochain + 1, fin)
+        return formater_numero(type_document, annee, prochain)
+
+    def _consigner(self, numero, tenant_id, statut, document_id=None, motif=None):
+        """Issue d'un numéro de facture encore "attribue" ; retourne False s'il n'y en a pas"""
+        connexion = db.connecter(self.chemin)
+        connexion.execute('PRAGMA synchronous=FULL')
+        try:
+            curseur = connexion.execute(
+                'UPDATE numeros_factures SET statut = ?, document_id = ?, motif = ?, maj = ? '
+                'WHERE tenant = ? AND numero = ? AND statut = ?',
+                (statut, document_id, motif, time.time(), tenant_id, numero, ATTRIBUE)
+            )
+        finally:
+            connexion.execute('PRAGMA synchronous=NORMAL')
+        return curseur.rowcount > 0
+
+    def confirmer(self, numero, tenant_id, document_id):
+        """La facture `numero` est publiée sous `document_id`"""
+        return self._consigner(numero, tenant_id, EMIS, document_id=document_id)
+
+    def annuler(self, numero, tenant_id, motif):
+        """Le rendu de la facture `numero` a échoué : le numéro reste sans facture, justifié par `motif`"""
+        return self._consigner(numero, tenant_id, ANNULE, motif=motif)
+
+    def journal(self, tenant_id, annee):
+        """Numéros de facture attribués au client pour l'année, dans l'ordre, avec leur issue"""
+        lignes = db.connecter(self.chemin).execute(
+            'SELECT sequence, numero, statut, document_id, motif, attribue_le, maj FROM numeros_factures '
+            'WHERE tenant = ? AND annee = ? ORDER BY sequence',
+            (tenant_id, annee)
+        ).fetchall()
+        return [dict(ligne) for ligne in lignes]
+
+
+def numerotation_depuis_environnement(dossier='generated'):
+    return Numerotation(
+        os.environ.get('NUMEROTATION_DB', os.path.join(dossier, 'numerotation.sqlite3')),
+        taille_bloc=int(os.environ.get('NUMEROTATION_BLOC', 100))
+    )
@@ -0,0 +1,147 @@
+# paragraph_cache.py - Cache des paragraphes ReportLab analysés et coupés en lignes
+#
+# Les catalogues réutilisent les mêmes descriptions et listes de détails d'un document
+# à l'autre. Chaque Paragraph ReportLab ré-analyse pourtant son mini-balisage à la
+# construction, puis recalcule ses coupures de lignes à chaque wrap(). Ce module garde,
+# pour tout le worker :
+#   - le résultat de l'analyse, par (texte, style) ;
+#   - le résultat de la coupure en lignes, par (texte, style, largeur disponible).
+# Les structures mises en cache sont partagées en lecture seule entre les paragraphes
+# (ReportLab ne les modifie pas au dessin pour un texte de gauche à droite).
+#
+# PARAGRAPHES_CACHE_TAILLE fixe le nombre d'entrées (0 désactive le cache).
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from reportlab.platypus import Paragraph
+from reportlab.platypus.paragraph import cleanBlockQuotedText, textTransformFrags
+from reportlab.platypus.paraparser import ParaParser
+
+PARAGRAPHES_CACHE_TAILLE = int(os.environ.get('PARAGRAPHES_CACHE_TAILLE', 4096))
+
+# Attributs posés par Paragraph.wrap() et restaurés depuis le cache
+_ATTRIBUTS_COUPURE = ('width', 'height', 'blPara', 'frags', '_wrapWidths', '_width_max',
+                      '_splitLongWordCount', '_hyphenations')
+
+
+def signature_style(style):
+    """Clé hachable représentant tous les attributs du style (calculée une fois par objet)
+
+    Mémorisée avec l'id du style : un style créé avec parent=style copie les attributs
+    de son parent, dont cette signature, qui ne le décrit pas.
+    """
+    proprietaire, signature = style.__dict__.get('_signature_cache', (None, None))
+    if proprietaire != id(style):
+        valeurs = []
+        for nom in sorted(style.defaults):
+            valeur = getattr(style, nom, None)
+            try:
+                hash(valeur)
+            except TypeError:
+                valeur = repr(valeur)
+            valeurs.append((nom, valeur))
+        signature = tuple(valeurs)
+        style.__dict__['_signature_cache'] = (id(style), signature)
+    return signature
+
+
+class CacheParagraphes:
+    """Cache LRU borné des analyses et coupures de paragraphes, avec statistiques"""
+
+    def __init__(self, taille=PARAGRAPHES_CACHE_TAILLE):
+        self.taille = taille
+        self._entrees = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'analyses_hits': 0, 'analyses_misses': 0, 'coupures_hits': 0, 'coupures_misses': 0,
+                       'temps_economise_s': 0.0}
+
+    def obtenir(self, cle, categorie):
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self._stats[f'{categorie}_misses'] += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._stats[f'{categorie}_hits'] += 1
+            self._stats['temps_economise_s'] += entree[1]
+            return entree[0]
+
+    def memoriser(self, cle, valeur, duree):
+        with self._lock:
+            self._entrees[cle] = (valeur, duree)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def statistiques(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entrees'] = len(self._entrees)
+        for categorie in ('analyses', 'coupures'):
+            total = stats[f'{categorie}_hits'] + stats[f'{categorie}_misses']
+            stats[f'{categorie}_taux'] = round(stats[f'{categorie}_hits'] / total, 3) if total else 0.0
+        stats['temps_economise_ms'] = round(stats.pop('temps_economise_s') * 1000, 1)
+        return stats
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+            for cle in self._stats:
+                self._stats[cle] = 0
+
+
+CACHE = CacheParagraphes()
+
+
+class ParagrapheCache(Paragraph):
+    """Paragraph dont l'analyse et les coupures de lignes passent par le cache"""
+
+    def __init__(self, text, style, cache=None):
+        self._cache = CACHE if cache is None else cache
+        self._cle = None
+        if self._cache.taille <= 0:
+            Paragraph.__init__(self, text, style)
+            return
+
+        self._cle = (text, signature_style(style))
+        analyse = self._cache.obtenir(('analyse',) + self._cle, 'analyses')
+        if analyse is None:
+            debut = time.perf_counter()
+            analyse = self._analyser(text, style)
+            self._cache.memoriser(('analyse',) + self._cle, analyse, time.perf_counter() - debut)
+
+        style_analyse, frags, bullet_text = analyse
+        Paragraph.__init__(self, text, style_analyse, bulletText=bullet_text, frags=frags)
+
+    @staticmethod
+    def _analyser(text, style):
+        """Même analyse que Paragraph._setup"""
+        parser = ParaParser()
+        parser.caseSensitive = 1
+        style_analyse, frags, bullet_frags = parser.parse(cleanBlockQuotedText(text), style)
+        if frags is None:
+            raise ValueError("xml parser error (%s) in paragraph beginning\n'%s'" % (parser.errors[0], text[:30]))
+        textTransformFrags(frags, style_analyse)
+        return style_analyse, frags, bullet_frags or getattr(style, 'bulletText', None)
+
+    def wrap(self, availWidth, availHeight):
+        if self._cle is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        if self.__dict__.get('_largeur_coupure') == availWidth:
+            # Déjà coupé à cette largeur (ou copie d'un paragraphe coupé, voir row_cache.py)
+            return self.width, self.height
+
+        cle = ('coupure', availWidth) + self._cle
+        coupure = self._cache.obtenir(cle, 'coupures')
+        if coupure is None:
+            debut = time.perf_counter()
+            Paragraph.wrap(self, availWidth, availHeight)
+            coupure = tuple(getattr(self, nom, None) for nom in _ATTRIBUTS_COUPURE)
+            self._cache.memoriser(cle, coupure, time.perf_counter() - debut)
+        else:
+            for nom, valeur in zip(_ATTRIBUTS_COUPURE, coupure):
+                setattr(self, nom, valeur)
+        self._largeur_coupure = availWidth
+        return self.width, self.height
@@ -1,59 +1,29 @@
 # pdf_generator.py - Version avec design professionnel, thèmes colorés et support logo
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable, Image, PageBreak, Flowable, Frame, PageTemplate
+from reportlab.platypus.doctemplate import BaseDocTemplate
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm
 from reportlab.pdfgen import canvas
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_JUSTIFY, TA_LEFT
 import os
-import requests
+from functools import partial
+from bisect import bisect_left
 from io import BytesIO
+from itertools import accumulate
 
-# Thèmes de couleurs disponibles
+from assets import telecharger_logo
+from number_format import formater_colonne, formater_montant, formater_quantite, formater_taux
+from paragraph_cache import ParagrapheCache
+from row_cache import CACHE as CACHE_LIGNES, LignesArticle
+from pdf_profiles import CanvasProfil, options_document, preparer_logo
+from themes import THEMES
+
+# Thèmes de couleurs disponibles (dérivés de la définition commune dans themes.py)
 THEMES_COULEURS = {
-    'bleu': {
-        'principale': colors.HexColor('#2c3e50'),
-        'secondaire': colors.HexColor('#34495e'), 
-        'accent': colors.HexColor('#3498db'),
-        'fond': colors.HexColor('#ecf0f1'),
-        'header_bg': colors.HexColor('#2d3436')
-    },
-    'vert': {
-        'principale': colors.HexColor('#27ae60'),
-        'secondaire': colors.HexColor('#2d5016'), 
-        'accent': colors.HexColor('#58d68d'),
-        'fond': colors.HexColor('#e8f8f5'),
-        'header_bg': colors.HexColor('#1e8449')
-    },
-    'rouge': {
-        'principale': colors.HexColor('#e74c3c'),
-        'secondaire': colors.HexColor('#922b21'), 
-        'accent': colors.HexColor('#f1948a'),
-        'fond': colors.HexColor('#fadbd8'),
-        'header_bg': colors.HexColor('#c0392b')
-    },
-    'violet': {
-        'principale': colors.HexColor('#9b59b6'),
-        'secondaire': colors.HexColor('#6c3483'), 
-        'accent': colors.HexColor('#d7bde2'),
-        'fond': colors.HexColor('#f4ecf7'),
-        'header_bg': colors.HexColor('#8e44ad')
-    },
-    'orange': {
-        'principale': colors.HexColor('#e67e22'),
-        'secondaire': colors.HexColor('#a04000'), 
-        'accent': colors.HexColor('#f5b041'),
-        'fond': colors.HexColor('#fdeaa7'),
-        'header_bg': colors.HexColor('#d35400')
-    },
-    'noir': {
-        'principale': colors.HexColor('#2c3e50'),
-        'secondaire': colors.HexColor('#34495e'), 
-        'accent': colors.HexColor('#95a5a6'),
-        'fond': colors.HexColor('#ecf0f1'),
-        'header_bg': colors.HexColor('#2c3e50')
-    }
+    nom: {role: colors.HexColor(valeur) for role, valeur in couleurs.items()}
+    for nom, couleurs in THEMES.items()
 }
 
 # Couleurs par défaut (pour compatibilité)
@@ -63,24 +33,39 @@ COULEUR_ACCENT = colors.HexColor('#3498db')
 COULEUR_FOND = colors.HexColor('#ecf0f1')
 COULEUR_TEXTE = colors.HexColor('#2c3e50')
 
-class SimpleCanvas(canvas.Canvas):
-    """Canvas simple pour ajouter le footer personnalisé"""
+class SimpleCanvas(CanvasProfil):
+    """Canvas simple pour ajouter le footer personnalisé (profil : voir pdf_profiles.py)"""
     def __init__(self, *args, **kwargs):
-        canvas.Canvas.__init__(self, *args, **kwargs)
+        CanvasProfil.__init__(self, *args, **kwargs)
         self.doc_info = {}
+        self.signets = []
         self._saved_page_states = []
 
     def showPage(self):
         self._saved_page_states.append(dict(self.__dict__))
+        self.signets = []
         self._startPage()
 
     def save(self):
-        num_pages = len(self._saved_page_states)
-        for idx, state in enumerate(self._saved_page_states):
+        # Numérotation par document : dans un lot, chaque facture pose son propre
+        # doc_info et ses pages sont numérotées 1/N indépendamment des autres
+        totaux = {}
+        for state in self._saved_page_states:
+            cle = id(state['doc_info'])
+            totaux[cle] = totaux.get(cle, 0) + 1
+        
+        numeros = {}
+        for state in self._saved_page_states:
             self.__dict__.update(state)
-            self.draw_footer(idx + 1, num_pages)
+            cle = id(self.doc_info)
+            numeros[cle] = numeros.get(cle, 0) + 1
+            # Les pages n'existent dans le PDF qu'à partir d'ici : signets posés au rejeu
+            for cle_signet, titre in self.signets:
+                self.bookmarkPage(cle_signet)
+                self.addOutlineEntry(titre, cle_signet, level=0)
+            self.draw_footer(numeros[cle], totaux[cle])
             canvas.Canvas.showPage(self)
-        canvas.Canvas.save(self)
+        CanvasProfil.save(self)
 
     def draw_footer(self, page_num, total_pages):
         """Dessiner le footer avec les informations de l'entreprise"""
@@ -100,16 +85,382 @@ class SimpleCanvas(canvas.Canvas):
         
         self.restoreState()
 
-def download_logo(logo_url):
-    """Télécharger et traiter le logo depuis une URL"""
+class DebutDocument(Flowable):
+    """Marqueur invisible placé en tête de chaque facture d'un lot
+
+    Au dessin, il remplace les informations du pied de page et ajoute un signet
+    (entrée du sommaire du PDF) pointant vers la première page de la facture.
+    """
+    def __init__(self, doc_info, titre, cle):
+        Flowable.__init__(self)
+        self.doc_info = doc_info
+        self.titre = titre
+        self.cle = cle
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.doc_info = self.doc_info
+        self.canv.signets.append((self.cle, self.titre))
+
+def _cellule_entete(table):
+    """Première cellule de l'en-tête (ReportLab la place dans un tuple une fois le tableau mesuré)"""
+    if isinstance(table, TableauArticles):
+        return table.entete[0]
+    cellule = table._cellvalues[0][0]
+    if isinstance(cellule, (list, tuple)) and cellule:
+        cellule = cellule[0]
+    return cellule
+
+class DocumentPdf(SimpleDocTemplate):
+    """SimpleDocTemplate qui relève la page de chaque ligne du tableau des articles
+
+    Le tableau des articles porte `lignes_articles` (index de l'article de chaque ligne,
+    None pour l'en-tête) : ses morceaux sont reconnus à leur ligne d'en-tête, répétée
+    sur chaque page. Après le rendu, `pages_articles` donne la page de chaque article et
+    lignes_par_page() le nombre de lignes du tableau sur chaque page (voir Pagination).
+    """
+    def build(self, flowables, **options):
+        self._suivre_articles(flowables)
+        SimpleDocTemplate.build(self, flowables, **options)
+
+    def _suivre_articles(self, flowables):
+        self.pages_articles = {}
+        self._lignes_pages = {}
+        self._tableaux_articles = {}
+        self._nb_articles = 0
+        for flowable in flowables:
+            lignes = getattr(flowable, 'lignes_articles', None)
+            if lignes is not None:
+                self._tableaux_articles[id(_cellule_entete(flowable))] = [lignes, 1]
+                self._nb_articles += len({index for index in lignes if index is not None})
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, TableauArticles):
+            nb_lignes = len(flowable.lignes) - flowable.debut
+        elif isinstance(flowable, Table) and flowable._cellvalues:
+            nb_lignes = len(flowable._cellvalues) - 1  # l'en-tête est répété sur chaque morceau
+        else:
+            return
+        suivi = self._tableaux_articles.get(id(_cellule_entete(flowable)))
+        if suivi is None:
+            return
+        lignes, debut = suivi
+        fin = debut + nb_lignes
+        for index in lignes[debut:fin]:
+            if index is not None:
+                self.pages_articles.setdefault(index, self.page)
+        self._lignes_pages[self.page] = self._lignes_pages.get(self.page, 0) + fin - debut
+        suivi[1] = fin
+
+    def lignes_par_page(self):
+        return [self._lignes_pages[page] for page in sorted(self._lignes_pages)]
+
+class _PremierePageTerminee(Exception):
+    pass
+
+class DocumentApercu(DocumentPdf):
+    """Mise en page arrêtée à la fin de la première page (aperçu) : les pages suivantes
+    ne sont ni dessinées ni écrites, et le pied de page indique 1/1"""
+    def afterPage(self):
+        raise _PremierePageTerminee()
+
+def _ne_pas_dessiner(*args, **kwargs):
+    pass
+
+class _CadreMiseEnPage(Frame):
+    """Cadre qui place les flowables (wrap/split) sans les dessiner"""
+    def _add(self, flowable, canv, trySplit=0):
+        flowable.drawOn = _ne_pas_dessiner
+        try:
+            return Frame._add(self, flowable, canv, trySplit)
+        finally:
+            del flowable.drawOn
+    add = _add
+
+class DocumentMiseEnPage(DocumentPdf):
+    """Mise en page seule (dry run) : coupures et pagination calculées, rien n'est dessiné,
+    aucune image n'est incorporée et aucun fichier n'est écrit"""
+    _doSave = 0
+
+    def build(self, flowables, canvasmaker=None, **options):
+        # Ni pied de page (SimpleCanvas) ni callbacks onPage : un seul modèle de page, sans dessin
+        self._calc()
+        cadre = _CadreMiseEnPage(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='First', frames=cadre, pagesize=self.pagesize),
+                               PageTemplate(id='Later', frames=cadre, pagesize=self.pagesize)])
+        self._suivre_articles(flowables)
+        BaseDocTemplate.build(self, flowables, canvasmaker=canvas.Canvas)
+        self.nb_pages = self.canv.getPageNumber() - 1
+
+    def resultat(self):
+        """Nombre de pages et page de chaque article (dans l'ordre des articles)"""
+        return {'pages': self.nb_pages,
+                'pages_articles': [self.pages_articles.get(index) for index in range(self._nb_articles)]}
+
+class _CadrePlage(Frame):
+    """Cadre qui ne dessine que sur les pages de la plage de son document"""
+    def __init__(self, document, *args, **kwargs):
+        Frame.__init__(self, *args, **kwargs)
+        self.document = document
+
+    def _add(self, flowable, canv, trySplit=0):
+        debut, fin = self.document.plage
+        if debut <= self.document.page <= fin:
+            return Frame._add(self, flowable, canv, trySplit)
+        return _CadreMiseEnPage._add(self, flowable, canv, trySplit)
+    add = _add
+
+def _rien(canvas_obj, doc):
+    pass
+
+class DocumentPlage(DocumentPdf):
+    """Document dont seules les pages `plage` (première, dernière) sont dessinées (rendu parallèle)
+
+    Toutes les pages sont mises en page, pour que les coupures et la numérotation n/N du
+    pied de page soient celles du document entier ; les autres restent blanches et sont
+    écartées à l'assemblage (rendu_parallele.py).
+    """
+    plage = (1, 0)
+
+    def build(self, flowables, onFirstPage=_rien, onLaterPages=_rien, canvasmaker=canvas.Canvas):
+        self._calc()
+        cadre = _CadrePlage(self, self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([
+            PageTemplate(id='First', frames=cadre, onPage=onFirstPage, pagesize=self.pagesize),
+            PageTemplate(id='Later', frames=cadre, onPage=onLaterPages, pagesize=self.pagesize),
+        ])
+        self._suivre_articles(flowables)
+        BaseDocTemplate.build(self, flowables, canvasmaker=canvasmaker)
+
+CLASSES_DOCUMENT = {None: DocumentPdf, 'apercu': DocumentApercu, 'mise_en_page': DocumentMiseEnPage,
+                    'plage': DocumentPlage}
+
+class Pagination:
+    """Découpage du tableau des articles en pages, relevé par un rendu et imposé à un autre
+
+    `precedente` est le nombre de lignes du tableau sur chaque page d'une passe de mise
+    en page : ses `pages_figees` premières pages sont posées telles quelles (un tableau
+    par page, sans recalcul des coupures), si bien que chaque processus du rendu parallèle
+    coupe le document exactement de la même façon. `lignes_par_page` est relevé par le
+    rendu PDF (vide tant qu'il n'a pas eu lieu).
+
+    `plage` (première, dernière page) : pages à dessiner en mode "plage" (rendu parallèle).
+    """
+    def __init__(self, precedente=None, pages_figees=0, plage=None):
+        self.precedente = list(precedente or [])
+        self.pages_figees = pages_figees
+        self.plage = plage
+        self.lignes_par_page = []
+
+def nb_lignes_article(details, remise):
+    """Lignes du tableau occupées par un article (description, détails, remise)"""
+    return 1 + (1 if details else 0) + (1 if remise > 0 else 0)
+
+# Styles des lignes d'articles (communs au devis et à la facture)
+STYLE_ARTICLE = ParagraphStyle('ItemDesc', fontSize=9, textColor=colors.black)
+STYLE_ARTICLE_CENTRE = ParagraphStyle('ItemCenter', fontSize=9, textColor=colors.black, alignment=TA_CENTER)
+STYLE_ARTICLE_DROITE = ParagraphStyle('ItemRight', fontSize=9, textColor=colors.black, alignment=TA_RIGHT)
+STYLE_ARTICLE_DETAILS = ParagraphStyle('DetailStyle', fontSize=9, textColor=colors.black, leftIndent=0)
+
+# Largeurs des colonnes du tableau des articles
+LARGEURS_ARTICLES = [8.5*cm, 2*cm, 3*cm, 2.5*cm, 2.5*cm]
+
+def lignes_article(couleurs, description, details, quantite, prix_unitaire, tva, total, remise):
+    """Lignes d'un article dans le tableau (LignesArticle), reprises du cache de lignes
+
+    quantite, prix_unitaire, tva et total sont déjà formatés. couleurs est l'une des
+    tables de THEMES_COULEURS (constantes : leur id identifie le thème).
+    """
+    cle = (id(couleurs), description, tuple(details or ()), quantite, prix_unitaire, tva, total, remise)
+    if CACHE_LIGNES.taille > 0:
+        article = CACHE_LIGNES.obtenir(cle)
+        if article is not None:
+            return article
+    
+    lignes = [[
+        ParagrapheCache(f"<b>{description}</b>", STYLE_ARTICLE),
+        ParagrapheCache(quantite, STYLE_ARTICLE_CENTRE),
+        ParagrapheCache(prix_unitaire, STYLE_ARTICLE_DROITE),
+        ParagrapheCache(tva, STYLE_ARTICLE_CENTRE),
+        ParagrapheCache(total, STYLE_ARTICLE_DROITE)
+    ]]
+    ligne_detail = None
+    if details:
+        ligne_detail = len(lignes)
+        lignes.append([ParagrapheCache("<br/>".join(details), STYLE_ARTICLE_DETAILS), '', '', '', ''])
+    if remise > 0:
+        lignes.append([
+            '', '', '',
+            ParagrapheCache("Remise", STYLE_ARTICLE_DROITE),
+            ParagrapheCache(f"-{formater_montant(remise)}", STYLE_ARTICLE_DROITE)
+        ])
+    return LignesArticle(cle, lignes, ligne_detail)
+
+def _style_articles(table_style, lignes_detail):
+    """Style du tableau, les lignes de détails (index dans le tableau) en span sur toutes les colonnes"""
+    style = list(table_style)
+    style.extend(('SPAN', (0, ligne), (-1, ligne)) for ligne in lignes_detail)
+    return TableStyle(style)
+
+def mesurer_articles(entete, articles, table_style):
+    """Mesurer les lignes des articles qui ne l'ont pas encore été, puis les mettre en cache
+
+    Un seul tableau (non découpé) pour tous les articles nouveaux : chacun n'est mesuré
+    qu'une fois, même s'il apparaît plusieurs fois dans le document.
+    """
+    nouveaux = {}
+    for article in articles:
+        if article.hauteurs is None:
+            nouveaux.setdefault(article.cle, []).append(article)
+    if not nouveaux:
+        return
+    
+    lignes = [list(entete)]
+    lignes_detail = []
+    for premier, *_ in nouveaux.values():
+        if premier.ligne_detail is not None:
+            lignes_detail.append(len(lignes) + premier.ligne_detail)
+        lignes.extend(list(ligne) for ligne in premier.lignes)
+    table = Table(lignes, colWidths=LARGEURS_ARTICLES)
+    table.setStyle(_style_articles(table_style, lignes_detail))
+    table.wrap(sum(LARGEURS_ARTICLES), float('inf'))
+    
+    debut = 1
+    for memes in nouveaux.values():
+        fin = debut + len(memes[0].lignes)
+        hauteurs = tuple(table._rowHeights[debut:fin])
+        for article in memes:
+            article.hauteurs = hauteurs
+        CACHE_LIGNES.memoriser(memes[0].cle, memes[0])
+        debut = fin
+
+class TableauArticles(Flowable):
+    """Reste du tableau des articles, dont les hauteurs de lignes sont toutes connues
+
+    ReportLab recalcule les spans et la géométrie de tout le reste d'un tableau à chaque
+    coupure de page : un coût quadratique sur un long document. Ici la coupure est
+    trouvée en cumulant les hauteurs connues, comme le fait Table (en-tête compris), et
+    seul le morceau de la page devient un Table ; la suite reste un TableauArticles.
+    """
+    def __init__(self, entete, lignes, hauteurs, lignes_detail, table_style, debut=1):
+        Flowable.__init__(self)
+        self.hAlign = 'CENTER'  # comme Table
+        self.entete = entete
+        self.lignes = lignes  # lignes du tableau entier, en-tête compris (index 0)
+        self.hauteurs = hauteurs
+        self.lignes_detail = lignes_detail  # index (croissants) des lignes de détails
+        self.table_style = table_style
+        self.debut = debut
+        self.hauteur_entete = None
+        self._cumul = None
+
+    def morceau(self, debut, fin):
+        """Table des lignes [debut, fin) précédées de l'en-tête"""
+        detail = self.lignes_detail[bisect_left(self.lignes_detail, debut):bisect_left(self.lignes_detail, fin)]
+        table = Table([list(self.entete)] + self.lignes[debut:fin], colWidths=LARGEURS_ARTICLES,
+                      rowHeights=[None] + self.hauteurs[debut:fin], repeatRows=1)
+        table.setStyle(_style_articles(self.table_style, [ligne - debut + 1 for ligne in detail]))
+        return table
+
+    def reste(self, debut):
+        """Lignes à partir de debut, en nouveau flowable (sans l'état de placement de celui-ci)"""
+        reste = TableauArticles(self.entete, self.lignes, self.hauteurs, self.lignes_detail, self.table_style, debut)
+        reste.hauteur_entete, reste._cumul = self.hauteur_entete, self._cumul
+        return reste
+
+    def wrap(self, availWidth, availHeight):
+        if self.hauteur_entete is None:
+            entete = Table([list(self.entete)], colWidths=LARGEURS_ARTICLES)
+            entete.setStyle(_style_articles(self.table_style, []))
+            entete.wrap(availWidth, availHeight)
+            self.hauteur_entete = entete._rowHeights[0]
+            self._cumul = list(accumulate(self.hauteurs[1:], initial=0))
+        self.width = sum(LARGEURS_ARTICLES)
+        self.height = self.hauteur_entete + self._cumul[-1] - self._cumul[self.debut - 1]
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        self.wrap(availWidth, availHeight)
+        hauteur = self.hauteur_entete
+        if hauteur > availHeight:
+            return []
+        fin = self.debut
+        while fin < len(self.lignes) and hauteur + self.hauteurs[fin] <= availHeight:
+            hauteur += self.hauteurs[fin]
+            fin += 1
+        if fin == self.debut:
+            return []
+        if fin == len(self.lignes):
+            return [self]
+        return [self.morceau(self.debut, fin), self.reste(fin)]
+
+    def draw(self):
+        tableau = self.morceau(self.debut, len(self.lignes))
+        tableau.wrapOn(self.canv, self.width, self.height)
+        tableau.drawOn(self.canv, 0, 0)
+
+def tableaux_articles(entete, articles, table_style, pagination=None):
+    """Tableau des articles (en-tête répété sur chaque page), sous forme de flowables
+
+    Les hauteurs de toutes les lignes sont connues (cache de lignes) : le tableau est
+    coupé page par page sans remesurer ses cellules (TableauArticles). Avec une
+    pagination figée : un tableau par page reprise, suivi d'un saut de page, puis le reste.
+    """
+    mesurer_articles(entete, articles, table_style)
+    
+    # lignes_articles : article de chaque ligne du tableau (None pour l'en-tête)
+    items_data = [entete]
+    hauteurs = [None]
+    lignes_articles = [None]
+    lignes_detail = []
+    for index, article in enumerate(articles):
+        if article.ligne_detail is not None:
+            lignes_detail.append(len(items_data) + article.ligne_detail)
+        lignes = article.copier()
+        items_data.extend(lignes)
+        hauteurs.extend(article.hauteurs)
+        lignes_articles.extend([index] * len(lignes))
+    
+    tableau = TableauArticles(entete, items_data, hauteurs, lignes_detail, table_style)
+    flowables = []
+    debut = 1
+    if pagination is not None:
+        for nombre in pagination.precedente[:pagination.pages_figees]:
+            flowables.extend([tableau.morceau(debut, debut + nombre), PageBreak()])
+            debut += nombre
+    if debut < len(items_data) or not flowables:
+        flowables.append(tableau.reste(debut))
+    else:
+        flowables.pop()
+    flowables[0].lignes_articles = lignes_articles
+    return flowables
+
+def construire_pdf(doc, elements, pagination=None, profil=None, **options):
+    """doc.build avec le pied de page SimpleCanvas (première page seulement pour un DocumentApercu)"""
+    if pagination is not None and pagination.plage:
+        doc.plage = pagination.plage
+    try:
+        doc.build(elements, canvasmaker=partial(SimpleCanvas, profil=profil), **options)
+    except _PremierePageTerminee:
+        doc.canv.showPage()
+        doc.canv.save()
+    else:
+        if pagination is not None:
+            pagination.lignes_par_page = doc.lignes_par_page()
+    return doc.resultat() if isinstance(doc, DocumentMiseEnPage) else doc.filename
+
+def download_logo(logo_url, profil=None):
+    """Télécharger et traiter le logo depuis une URL (réencodé selon le profil de sortie)"""
     if not logo_url:
         return None
     
     try:
-        # Télécharger l'image avec un timeout
-        response = requests.get(logo_url, timeout=10)
-        if response.status_code == 200:
-            img_data = BytesIO(response.content)
+        # Télécharger l'image (ou la reprendre du cache)
+        contenu = preparer_logo(profil, telecharger_logo(logo_url), 4 * cm, 2.5 * cm)
+        if contenu is not None:
+            img_data = BytesIO(contenu)
             logo = Image(img_data)
             
             # Redimensionner le logo (hauteur max 2.5cm)
@@ -130,9 +481,10 @@ def download_logo(logo_url):
     
     return None
 
-def create_header_with_logo(logo_url, title, title_size=18):
-    """Créer l'en-tête avec logo et titre"""
-    logo = download_logo(logo_url)
+def create_header_with_logo(logo_url, title, title_size=18, profil=None, logo=None):
+    """Créer l'en-tête avec logo et titre (logo : image déjà préparée, partagée par un lot)"""
+    if logo is None:
+        logo = download_logo(logo_url, profil)
     
     title_paragraph = Paragraph(title, ParagraphStyle('Title', 
         fontSize=title_size, textColor=colors.black, fontName='Helvetica-Bold', leftIndent=0))
@@ -204,28 +556,36 @@ def create_styles(couleurs):
     
     return styles
 
-def generate_student_style_devis(data, theme='bleu'):
-    """Générer un PDF de devis avec le style étudiant"""
+def generate_student_style_devis(data, theme='bleu', filename=None, profil=None, mode=None, pagination=None):
+    """Générer un PDF de devis avec le style étudiant
+
+    mode "apercu" : première page seulement ; "mise_en_page" : pagination sans rendu,
+    retourne {'pages', 'pages_articles'} au lieu du nom de fichier ; "plage" : seules
+    les pages pagination.plage sont dessinées.
+    pagination : découpage imposé et relevé (voir Pagination).
+    """
     # Récupérer les couleurs du thème
     couleurs = THEMES_COULEURS.get(theme, THEMES_COULEURS['bleu'])
     
-    filename = os.path.join('generated', f'devis_{data["numero"]}_{theme}.pdf')
+    if filename is None:
+        filename = os.path.join('generated', f'devis_{data["numero"]}_{theme}.pdf')
     
     # Configuration du document
-    doc = SimpleDocTemplate(
+    doc = CLASSES_DOCUMENT[mode](
         filename,
         pagesize=A4,
         rightMargin=2*cm,
         leftMargin=2*cm,
         topMargin=0.8*cm,
-        bottomMargin=3*cm
+        bottomMargin=3*cm,
+        **options_document(profil, f"Devis {data['numero']}", data['fournisseur_nom'], f"Devis pour {data['client_nom']}")
     )
     
     styles = create_styles(couleurs)
     elements = []
     
     # En-tête avec logo et titre
-    header_table = create_header_with_logo(data.get('logo_url', ''), "Devis", 18)
+    header_table = create_header_with_logo(data.get('logo_url', ''), "Devis", 18, profil)
     elements.append(header_table)
     
     # Informations du devis - alignées en deux colonnes comme Fournisseur/Client
@@ -304,8 +664,6 @@ Numéro de TVA: {data.get('client_tva', '')}"""
         elements.append(Spacer(1, 10*mm))
     
     # Tableau des articles avec en-tête coloré selon le thème
-    items_data = []
-    
     # En-tête du tableau avec la couleur du thème
     headers = [
         Paragraph("<b>Description</b>", ParagraphStyle('TableHeader', 
@@ -319,58 +677,20 @@ Numéro de TVA: {data.get('client_tva', '')}"""
         Paragraph("<b>Total HT</b>", ParagraphStyle('TableHeader', 
             textColor=colors.white, fontSize=10, alignment=TA_RIGHT, fontName='Helvetica-Bold'))
     ]
-    items_data.append(headers)
-    
-    # Style pour les items
-    item_desc_style = ParagraphStyle('ItemDesc', fontSize=9, textColor=colors.black)
-    item_center_style = ParagraphStyle('ItemCenter', fontSize=9, textColor=colors.black, 
-                                      alignment=TA_CENTER)
-    item_right_style = ParagraphStyle('ItemRight', fontSize=9, textColor=colors.black, 
-                                     alignment=TA_RIGHT)
-    
-    # Articles
-    for item in data['items']:
-        # Description principale en gras
-        desc_text = f"<b>{item['description']}</b>"
-        
-        # Si il y a des détails, les ajouter sur des lignes séparées
-        if item.get('details'):
-            items_data.append([
-                Paragraph(desc_text, item_desc_style),
-                Paragraph(str(item.get('quantite', 1)), item_center_style),
-                Paragraph(f"{item.get('prix_unitaire', 0):.2f} €", item_right_style),
-                Paragraph(f"{item.get('tva_taux', 20)} %", item_center_style),
-                Paragraph(f"{item.get('prix_unitaire', 0) * item.get('quantite', 1):.2f} €", item_right_style)
-            ])
-            
-            # Ajouter les détails sur une nouvelle ligne
-            detail_text = "<br/>".join(item['details'])
-            items_data.append([
-                Paragraph(detail_text, ParagraphStyle('DetailStyle', fontSize=9, 
-                         textColor=colors.black, leftIndent=0)),
-                '', '', '', ''
-            ])
-        else:
-            # Pas de détails, juste la ligne principale
-            items_data.append([
-                Paragraph(desc_text, item_desc_style),
-                Paragraph(str(item.get('quantite', 1)), item_center_style),
-                Paragraph(f"{item.get('prix_unitaire', 0):.2f} €", item_right_style),
-                Paragraph(f"{item.get('tva_taux', 20)} %", item_center_style),
-                Paragraph(f"{item.get('prix_unitaire', 0) * item.get('quantite', 1):.2f} €", item_right_style)
-            ])
-        
-        # Ligne de remise si applicable
-        if item.get('remise', 0) > 0:
-            items_data.append([
-                '', '', '', 
-                Paragraph("Remise", item_right_style),
-                Paragraph(f"-{item['remise']:.2f} €", item_right_style)
-            ])
-    
-    # Créer le tableau - largeurs exactes du modèle
-    col_widths = [8.5*cm, 2*cm, 3*cm, 2.5*cm, 2.5*cm]
-    items_table = Table(items_data, colWidths=col_widths, repeatRows=1)
+    
+    # Colonnes formatées en une passe (chaque valeur distincte n'est formatée qu'une fois)
+    items = data['items']
+    quantites = formater_colonne((item.get('quantite', 1) for item in items), formater_quantite)
+    prix = formater_colonne(item.get('prix_unitaire', 0) for item in items)
+    taux = formater_colonne((item.get('tva_taux', 20) for item in items), formater_taux)
+    totaux = formater_colonne(item.get('prix_unitaire', 0) * item.get('quantite', 1) for item in items)
+    
+    # Lignes de chaque article : description en gras, détails, remise (cache de lignes)
+    articles = [
+        lignes_article(couleurs, item['description'], item.get('details'), quantite, prix_unitaire, tva, total,
+                       item.get('remise', 0))
+        for item, quantite, prix_unitaire, tva, total in zip(items, quantites, prix, taux, totaux)
+    ]
     
     # Style du tableau avec la couleur du thème pour l'en-tête
     table_style = [
@@ -403,35 +723,25 @@ Numéro de TVA: {data.get('client_tva', '')}"""
         ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
     ]
     
-    # Pour les lignes de détails, faire un span
-    row_num = 1
-    for item in data['items']:
-        if item.get('details'):
-            # La ligne de détails doit span toutes les colonnes
-            table_style.append(('SPAN', (0, row_num + 1), (-1, row_num + 1)))
-            row_num += 2
-        else:
-            row_num += 1
-        
-        if item.get('remise', 0) > 0:
-            row_num += 1
-    
-    items_table.setStyle(TableStyle(table_style))
-    elements.append(items_table)
+    # Tableau (ou un tableau par page figée), les lignes de détails en span sur toutes les colonnes
+    elements.extend(tableaux_articles(headers, articles, table_style, pagination))
     elements.append(Spacer(1, 15*mm))
     
-    # Calcul des totaux
-    total_ht = 0
-    total_tva = 0
-    
-    for item in data['items']:
-        item_total = item.get('quantite', 1) * item.get('prix_unitaire', 0)
-        if item.get('remise', 0) > 0:
-            item_total -= item['remise']
-        total_ht += item_total
-        total_tva += item_total * (item.get('tva_taux', 20) / 100)
-    
-    total_ttc = total_ht + total_tva
+    # Calcul des totaux (repris tels quels s'ils ont déjà été calculés sur le modèle)
+    if 'total_ttc' in data:
+        total_ht, total_tva, total_ttc = data['total_ht'], data['total_tva'], data['total_ttc']
+    else:
+        total_ht = 0
+        total_tva = 0
+        
+        for item in data['items']:
+            item_total = item.get('quantite', 1) * item.get('prix_unitaire', 0)
+            if item.get('remise', 0) > 0:
+                item_total -= item['remise']
+            total_ht += item_total
+            total_tva += item_total * (item.get('tva_taux', 20) / 100)
+        
+        total_ttc = total_ht + total_tva
     
     # Totaux alignés à droite
     totals_style = ParagraphStyle('TotalsStyle', fontSize=10, textColor=colors.black)
@@ -440,11 +750,11 @@ Numéro de TVA: {data.get('client_tva', '')}"""
     
     totals_data = [
         [Paragraph("Total HT", totals_style), 
-         Paragraph(f"{total_ht:.2f} €", totals_bold)],
+         Paragraph(formater_montant(total_ht), totals_bold)],
         [Paragraph("Montant total de la TVA", totals_style), 
-         Paragraph(f"{total_tva:.2f} €", totals_bold)],
+         Paragraph(formater_montant(total_tva), totals_bold)],
         [Paragraph("<b>Total TTC</b>", totals_bold), 
-         Paragraph(f"<b>{total_ttc:.2f} €</b>", totals_bold)]
+         Paragraph(f"<b>{formater_montant(total_ttc)}</b>", totals_bold)]
     ]
     
     totals_table = Table(totals_data, colWidths=[13*cm, 4*cm])
@@ -522,11 +832,9 @@ Numéro de TVA: {data.get('client_tva', '')}"""
             'doc_number': data['numero']
         }
     
-    doc.build(elements, canvasmaker=SimpleCanvas, onFirstPage=build_with_canvas)
-    
-    return filename
+    return construire_pdf(doc, elements, pagination, profil, onFirstPage=build_with_canvas)
 
-def generate_pdf_devis(devis, theme='bleu'):
+def generate_pdf_devis(devis, theme='bleu', filename=None, profil=None, mode=None, pagination=None):
     """Générer un PDF de devis avec le thème de couleur choisi"""
     # Convertir l'objet Devis en dictionnaire
     data = {
@@ -559,6 +867,10 @@ def generate_pdf_devis(devis, theme='bleu'):
         'texte_intro': devis.texte_intro,
         'texte_conclusion': devis.texte_conclusion,
         
+        'total_ht': devis.total_ht,
+        'total_tva': devis.total_tva,
+        'total_ttc': devis.total_ttc,
+        
         'items': []
     }
     
@@ -573,30 +885,16 @@ def generate_pdf_devis(devis, theme='bleu'):
             'remise': item.remise
         })
     
-    return generate_student_style_devis(data, theme)
+    return generate_student_style_devis(data, theme, filename, profil, mode, pagination)
 
-def generate_pdf_facture(facture, theme='bleu'):
-    """Générer un PDF de facture avec le thème de couleur choisi"""
-    couleurs = THEMES_COULEURS.get(theme, THEMES_COULEURS['bleu'])
-    
-    filename = os.path.join('generated', f'facture_{facture.numero}_{theme}.pdf')
-    
-    # Configuration du document
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=0.8*cm,
-        bottomMargin=3*cm
-    )
-    
+def elements_facture(facture, couleurs, profil=None, logo=None, pagination=None):
+    """Flowables d'une facture (en-tête, articles, totaux, mentions), sans le pied de page"""
     styles = create_styles(couleurs)
     elements = []
     
     # En-tête avec logo et titre
     if facture.logo_url:
-        header_table = create_header_with_logo(facture.logo_url, "FACTURE", 16)
+        header_table = create_header_with_logo(facture.logo_url, "FACTURE", 16, profil, logo)
         elements.append(header_table)
     else:
         # En-tête sans logo
@@ -711,8 +1009,6 @@ Numéro de TVA: {facture.client_tva}"""
     elements.append(Spacer(1, 15*mm))
     
     # Tableau des articles - même style que devis
-    items_data = []
-    
     # En-tête avec couleur du thème
     headers = [
         Paragraph("<b>Description</b>", ParagraphStyle('TableHeader', 
@@ -726,53 +1022,19 @@ Numéro de TVA: {facture.client_tva}"""
         Paragraph("<b>Total HT</b>", ParagraphStyle('TableHeader', 
             textColor=colors.white, fontSize=10, alignment=TA_RIGHT, fontName='Helvetica-Bold'))
     ]
-    items_data.append(headers)
-    
-    # Styles pour les items
-    item_desc_style = ParagraphStyle('ItemDesc', fontSize=9, textColor=colors.black)
-    item_center_style = ParagraphStyle('ItemCenter', fontSize=9, textColor=colors.black, 
-                                      alignment=TA_CENTER)
-    item_right_style = ParagraphStyle('ItemRight', fontSize=9, textColor=colors.black, 
-                                     alignment=TA_RIGHT)
-    
-    # Articles
-    for item in facture.items:
-        desc_text = f"<b>{item.description}</b>"
-        
-        if item.details:
-            items_data.append([
-                Paragraph(desc_text, item_desc_style),
-                Paragraph(str(item.quantite), item_center_style),
-                Paragraph(f"{item.prix_unitaire:.2f} €", item_right_style),
-                Paragraph(f"{item.tva_taux} %", item_center_style),
-                Paragraph(f"{item.total_ht:.2f} €", item_right_style)
-            ])
-            
-            detail_text = "<br/>".join(item.details)
-            items_data.append([
-                Paragraph(detail_text, ParagraphStyle('DetailStyle', fontSize=9, 
-                         textColor=colors.black, leftIndent=0)),
-                '', '', '', ''
-            ])
-        else:
-            items_data.append([
-                Paragraph(desc_text, item_desc_style),
-                Paragraph(str(item.quantite), item_center_style),
-                Paragraph(f"{item.prix_unitaire:.2f} €", item_right_style),
-                Paragraph(f"{item.tva_taux} %", item_center_style),
-                Paragraph(f"{item.total_ht:.2f} €", item_right_style)
-            ])
-        
-        if item.remise > 0:
-            items_data.append([
-                '', '', '', 
-                Paragraph("Remise", item_right_style),
-                Paragraph(f"-{item.remise:.2f} €", item_right_style)
-            ])
     
-    # Créer le tableau
-    col_widths = [8.5*cm, 2*cm, 3*cm, 2.5*cm, 2.5*cm]
-    items_table = Table(items_data, colWidths=col_widths, repeatRows=1)
+    # Colonnes formatées en une passe (chaque valeur distincte n'est formatée qu'une fois)
+    quantites = formater_colonne((item.quantite for item in facture.items), formater_quantite)
+    prix = formater_colonne(item.prix_unitaire for item in facture.items)
+    taux = formater_colonne((item.tva_taux for item in facture.items), formater_taux)
+    totaux = formater_colonne(item.total_ht for item in facture.items)
+    
+    # Lignes de chaque article (cache de lignes)
+    articles = [
+        lignes_article(couleurs, item.description, item.details, quantite, prix_unitaire, tva, total,
+                       item.remise)
+        for item, quantite, prix_unitaire, tva, total in zip(facture.items, quantites, prix, taux, totaux)
+    ]
     
     # Style du tableau avec couleur du thème
     table_style = [
@@ -800,20 +1062,8 @@ Numéro de TVA: {facture.client_tva}"""
         ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
     ]
     
-    # Pour les lignes de détails, faire un span
-    row_num = 1
-    for item in facture.items:
-        if item.details:
-            table_style.append(('SPAN', (0, row_num + 1), (-1, row_num + 1)))
-            row_num += 2
-        else:
-            row_num += 1
-        
-        if item.remise > 0:
-            row_num += 1
-    
-    items_table.setStyle(TableStyle(table_style))
-    elements.append(items_table)
+    # Tableau (ou un tableau par page figée), les lignes de détails en span sur toutes les colonnes
+    elements.extend(tableaux_articles(headers, articles, table_style, pagination))
     elements.append(Spacer(1, 15*mm))
     
     # Totaux
@@ -823,11 +1073,11 @@ Numéro de TVA: {facture.client_tva}"""
     
     totals_data = [
         [Paragraph("Total HT", totals_style), 
-         Paragraph(f"{facture.total_ht:.2f} €", totals_bold)],
+         Paragraph(formater_montant(facture.total_ht), totals_bold)],
         [Paragraph("Montant total de la TVA", totals_style), 
-         Paragraph(f"{facture.total_tva:.2f} €", totals_bold)],
+         Paragraph(formater_montant(facture.total_tva), totals_bold)],
         [Paragraph("<b>Total TTC</b>", totals_bold), 
-         Paragraph(f"<b>{facture.total_ttc:.2f} €</b>", totals_bold)]
+         Paragraph(f"<b>{formater_montant(facture.total_ttc)}</b>", totals_bold)]
     ]
     
     totals_table = Table(totals_data, colWidths=[13*cm, 4*cm])
@@ -878,6 +1128,28 @@ Numéro de TVA: {facture.client_tva}"""
     elements.append(Paragraph(legal_text, ParagraphStyle('LegalText', 
         fontSize=8, textColor=colors.grey, fontName='Helvetica', alignment=TA_JUSTIFY)))
     
+    return elements
+
+def generate_pdf_facture(facture, theme='bleu', filename=None, profil=None, mode=None, pagination=None):
+    """Générer un PDF de facture avec le thème de couleur choisi (mode : voir generate_student_style_devis)"""
+    couleurs = THEMES_COULEURS.get(theme, THEMES_COULEURS['bleu'])
+    
+    if filename is None:
+        filename = os.path.join('generated', f'facture_{facture.numero}_{theme}.pdf')
+    
+    # Configuration du document
+    doc = CLASSES_DOCUMENT[mode](
+        filename,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=0.8*cm,
+        bottomMargin=3*cm,
+        **options_document(profil, f"Facture {facture.numero}", facture.fournisseur_nom, f"Facture pour {facture.client_nom}")
+    )
+    
+    elements = elements_facture(facture, couleurs, profil, pagination=pagination)
+    
     # Construire le PDF avec footer personnalisé
     def build_with_canvas(canvas_obj, doc):
         canvas_obj.doc_info = {
@@ -885,7 +1157,51 @@ Numéro de TVA: {facture.client_tva}"""
             'doc_number': facture.numero
         }
     
-    doc.build(elements, canvasmaker=SimpleCanvas, onFirstPage=build_with_canvas)
+    return construire_pdf(doc, elements, pagination, profil, onFirstPage=build_with_canvas)
+
+def generate_pdf_factures(factures, theme='bleu', filename=None, profil=None):
+    """Générer un seul PDF regroupant plusieurs factures (un seul build ReportLab)
+
+    Chaque facture commence sur une nouvelle page, a sa propre numérotation dans le
+    pied de page et un signet dans le sommaire du PDF. Les logos sont préparés une
+    fois par URL et le même objet image est réutilisé par toutes les factures.
+    """
+    if not factures:
+        raise ValueError("Aucune facture à générer")
+    couleurs = THEMES_COULEURS.get(theme, THEMES_COULEURS['bleu'])
+    
+    premiere, derniere = factures[0], factures[-1]
+    if filename is None:
+        filename = os.path.join('generated', f'factures_{premiere.numero}_{derniere.numero}_{theme}.pdf')
+    
+    doc = SimpleDocTemplate(
+        filename,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=0.8*cm,
+        bottomMargin=3*cm,
+        **options_document(profil, f"Factures {premiere.numero} à {derniere.numero}", premiere.fournisseur_nom,
+                           f"{len(factures)} factures")
+    )
+    
+    logos = {}
+    for facture in factures:
+        if facture.logo_url and facture.logo_url not in logos:
+            logos[facture.logo_url] = download_logo(facture.logo_url, profil)
+    
+    elements = []
+    for index, facture in enumerate(factures):
+        if index:
+            elements.append(PageBreak())
+        doc_info = {
+            'company_name': facture.fournisseur_nom,
+            'doc_number': facture.numero
+        }
+        elements.append(DebutDocument(doc_info, f"Facture {facture.numero} - {facture.client_nom}", f"facture{index}"))
+        elements.extend(elements_facture(facture, couleurs, profil, logos.get(facture.logo_url)))
+    
+    doc.build(elements, canvasmaker=partial(SimpleCanvas, profil=profil))
     
     return filename
 
@@ -0,0 +1,126 @@
+# pdf_profiles.py - Profils de sortie PDF (vitesse, taille, archivage)
+#
+#   fast    : flux de page non compressés (rendu le plus rapide, fichier plus gros)
+#   compact : flux de page compressés
+#   archive : flux compressés, logo d'origine, métadonnées complètes (titre, auteur,
+#             sujet, mots-clés, langue) dans l'esprit PDF/A
+#
+# fast et compact intègrent le logo réduit à sa taille d'affichage et réencodé : la
+# version réduite est mémorisée, et l'intégrer coûte moins cher que l'original.
+#
+# Les PDF sont servis en binaire : aucun profil n'encode ses flux en ASCII85 (pensé pour
+# les canaux 7 bits, il ajoute 25 % de taille et du temps de rendu). ReportLab ne lit ce
+# choix que dans son réglage global rl_config.useA85, laissé intact : CanvasProfil
+# réécrit en binaire les flux du document qu'il enregistre.
+#
+# Le profil est choisi par le champ "profil" de la requête, PDF_PROFIL sinon.
+# ReportLab n'intègre chaque image qu'une fois par document (dédoublonnage par
+# empreinte) ; le profil "archive" ne produit pas un PDF/A validé (pas d'XMP ni
+# d'OutputIntent dans ReportLab open source).
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfbase.pdfutils import asciiBase85Decode
+from reportlab.pdfgen import canvas
+
+PROFILS_PDF = {
+    'fast': {'compression': 0, 'recompresser_images': True, 'metadonnees': False, 'ascii85': False},
+    'compact': {'compression': 1, 'recompresser_images': True, 'metadonnees': False, 'ascii85': False},
+    'archive': {'compression': 1, 'recompresser_images': False, 'metadonnees': True, 'ascii85': False},
+}
+PROFILS_PDF_DISPONIBLES = list(PROFILS_PDF)
+PROFIL_PDF_PAR_DEFAUT = os.environ.get('PDF_PROFIL', 'compact')
+if PROFIL_PDF_PAR_DEFAUT not in PROFILS_PDF:
+    PROFIL_PDF_PAR_DEFAUT = 'compact'
+
+# Résolution des logos réencodés par le profil "compact"
+DPI_LOGO = 300
+
+
+def profil_pdf(nom):
+    """Options du profil demandé (profil par défaut si le nom est inconnu)"""
+    return PROFILS_PDF.get(nom) or PROFILS_PDF[PROFIL_PDF_PAR_DEFAUT]
+
+
+def options_document(nom, titre='', auteur='', sujet=''):
+    """Arguments supplémentaires de SimpleDocTemplate pour le profil"""
+    profil = profil_pdf(nom)
+    options = {'pageCompression': profil['compression']}
+    if profil['metadonnees']:
+        options.update(
+            title=titre,
+            author=auteur,
+            subject=sujet,
+            creator='API Générateur de Devis',
+            keywords=[mot for mot in (sujet, auteur) if mot],
+            lang='fr-FR',
+            displayDocTitle=True,
+        )
+    return options
+
+
+def _image_binaire(image):
+    filtres = image._filters or ()
+    if filtres[:1] == ('ASCII85Decode',):
+        image.streamContent = asciiBase85Decode(image.streamContent)
+        image._filters = tuple(filtres[1:])
+
+
+def flux_binaires(document):
+    """Réécrire sans ASCII85 les flux de pages et d'images d'un PDFDocument pas encore écrit"""
+    for page in document.Pages.pages:
+        if page.compression and page.stream and not page.Contents:
+            flux = pdfdoc.PDFStream(content=page.stream, filters=[pdfdoc.PDFZCompress])
+            flux.__Comment__ = "page stream"
+            page.Contents = flux
+    for objet in list(document.idToObject.values()):
+        if isinstance(objet, pdfdoc.PDFImageXObject):
+            _image_binaire(objet)
+            if getattr(objet, '_smask', None) is not None:
+                _image_binaire(objet._smask)
+
+
+class CanvasProfil(canvas.Canvas):
+    """Canvas qui enregistre le document avec l'encodage des flux de son profil"""
+
+    def __init__(self, *args, profil=None, **kwargs):
+        canvas.Canvas.__init__(self, *args, **kwargs)
+        self.profil = profil
+
+    def save(self):
+        if not profil_pdf(self.profil)['ascii85']:
+            flux_binaires(self._doc)
+        canvas.Canvas.save(self)
+
+
+@lru_cache(maxsize=64)
+def _recompresser(contenu, largeur_max_px, hauteur_max_px):
+    from PIL import Image as PILImage
+
+    image = PILImage.open(BytesIO(contenu))
+    image.load()
+    image.thumbnail((largeur_max_px, hauteur_max_px), PILImage.LANCZOS)
+
+    sortie = BytesIO()
+    transparent = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    if transparent or image.getcolors(256) is not None:
+        # Logos à aplats ou transparents : PNG optimisé (le JPEG baverait sur les contours)
+        image.save(sortie, format='PNG', optimize=True)
+    else:
+        image.convert('RGB').save(sortie, format='JPEG', quality=85, optimize=True)
+
+    recompresse = sortie.getvalue()
+    return recompresse if len(recompresse) < len(contenu) else contenu
+
+
+def preparer_logo(nom, contenu, largeur_max_pt, hauteur_max_pt):
+    """Octets du logo à intégrer selon le profil (réduit à la taille d'affichage sauf pour "archive")"""
+    if contenu is None or not profil_pdf(nom)['recompresser_images']:
+        return contenu
+    try:
+        return _recompresser(contenu, round(largeur_max_pt / 72 * DPI_LOGO), round(hauteur_max_pt / 72 * DPI_LOGO))
+    except Exception as e:
+        print(f"Erreur lors de la recompression du logo: {e}")
+        return contenu
@@ -0,0 +1,154 @@
+# rate_limit.py - Limitation de débit et de rendus simultanés par client
+#
+# Deux limites par client, toutes deux pondérées par le coût estimé du rendu (cost.py) :
+#   - un seau à jetons : `debit` unités par seconde, capacité `rafale` ; un rendu plus
+#     coûteux que la rafale passe seau plein et le laisse à découvert, du coût entier
+#   - un budget de rendus en cours : somme des coûts en cours <= `simultanes`
+#     (un rendu est toujours accepté si le client n'en a aucun en cours)
+#
+# L'état est gardé en mémoire du processus, ou dans une base SQLite locale
+# (RATE_LIMIT_DB) pour être partagé entre les workers Gunicorn.
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import db
+
+DEBIT_PAR_DEFAUT = float(os.environ.get('RATE_LIMIT_DEBIT', 20.0))
+RAFALE_PAR_DEFAUT = float(os.environ.get('RATE_LIMIT_RAFALE', 200.0))
+SIMULTANES_PAR_DEFAUT = float(os.environ.get('RATE_LIMIT_SIMULTANES', 30.0))
+# Au-delà, une réservation est considérée comme abandonnée (worker tué pendant le rendu)
+DUREE_MAX_RENDU = 600
+
+
+class QuotaDepasse(Exception):
+    """Limite atteinte : retry_after est le délai conseillé en secondes"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+    def to_dict(self):
+        return {"error": f"❌ {self}", "retry_after": self.retry_after}
+
+
+def limites_tenant(tenant):
+    """Limites du client : options du registre de clés, sinon valeurs par défaut"""
+    options = getattr(tenant, 'options', None) or {}
+    return (
+        float(options.get('debit', DEBIT_PAR_DEFAUT)),
+        float(options.get('rafale', RAFALE_PAR_DEFAUT)),
+        float(options.get('simultanes', SIMULTANES_PAR_DEFAUT)),
+    )
+
+
+def _verifier(jetons, en_cours, cout, debit, rafale, simultanes):
+    """Décision commune aux deux backends, lève QuotaDepasse si la demande est refusée"""
+    # Un rendu plus coûteux que la rafale entière passe quand le seau est plein, mais il est
+    # débité de son coût entier : le seau reste à découvert jusqu'à ce que le débit l'ait payé
+    besoin = min(cout, rafale)
+    if jetons < besoin:
+        raise QuotaDepasse("Limite de débit atteinte", (besoin - jetons) / debit)
+    if en_cours > 0 and en_cours + cout > simultanes:
+        raise QuotaDepasse("Trop de rendus simultanés", 1)
+    return jetons - cout
+
+
+class LimiteurMemoire:
+    """État des limites dans la mémoire du processus"""
+
+    def __init__(self):
+        self._seaux = {}
+        self._en_cours = {}
+        self._lock = threading.Lock()
+
+    def acquerir(self, tenant_id, cout, debit, rafale, simultanes):
+        maintenant = time.monotonic()
+        with self._lock:
+            jetons, maj = self._seaux.get(tenant_id, (rafale, maintenant))
+            jetons = min(rafale, jetons + (maintenant - maj) * debit)
+            en_cours = self._en_cours.get(tenant_id, 0.0)
+            try:
+                jetons = _verifier(jetons, en_cours, cout, debit, rafale, simultanes)
+            finally:
+                self._seaux[tenant_id] = (jetons, maintenant)
+            self._en_cours[tenant_id] = en_cours + cout
+        return None
+
+    def liberer(self, tenant_id, cout, reservation):
+        with self._lock:
+            self._en_cours[tenant_id] = max(0.0, self._en_cours.get(tenant_id, 0.0) - cout)
+
+
+class LimiteurSQLite:
+    """État des limites dans une base SQLite partagée par les workers"""
+
+    SCHEMA_SQL = (
+        "CREATE TABLE IF NOT EXISTS seaux (tenant TEXT PRIMARY KEY, jetons REAL NOT NULL, maj REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS reservations (id TEXT PRIMARY KEY, tenant TEXT NOT NULL, "
+        "cout REAL NOT NULL, debut REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS reservations_tenant ON reservations (tenant)",
+    )
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        connexion = db.connecter(chemin)
+        for instruction in self.SCHEMA_SQL:
+            connexion.execute(instruction)
+
+    def acquerir(self, tenant_id, cout, debit, rafale, simultanes):
+        connexion = db.connecter(self.chemin)
+        maintenant = time.time()
+        connexion.execute('BEGIN IMMEDIATE')
+        try:
+            connexion.execute('DELETE FROM reservations WHERE debut < ?', (maintenant - DUREE_MAX_RENDU,))
+            ligne = connexion.execute('SELECT jetons, maj FROM seaux WHERE tenant = ?', (tenant_id,)).fetchone()
+            jetons = rafale if ligne is None else min(rafale, ligne['jetons'] + (maintenant - ligne['maj']) * debit)
+            en_cours = connexion.execute(
+                'SELECT COALESCE(SUM(cout), 0) FROM reservations WHERE tenant = ?', (tenant_id,)
+            ).fetchone()[0]
+
+            reservation = None
+            try:
+                jetons = _verifier(jetons, en_cours, cout, debit, rafale, simultanes)
+                reservation = uuid.uuid4().hex
+                connexion.execute('INSERT INTO reservations (id, tenant, cout, debut) VALUES (?, ?, ?, ?)',
+                                  (reservation, tenant_id, cout, maintenant))
+            finally:
+                connexion.execute('INSERT OR REPLACE INTO seaux (tenant, jetons, maj) VALUES (?, ?, ?)',
+                                  (tenant_id, jetons, maintenant))
+                connexion.execute('COMMIT')
+        except Exception:
+            if connexion.in_transaction:
+                connexion.execute('ROLLBACK')
+            raise
+        return reservation
+
+    def liberer(self, tenant_id, cout, reservation):
+        db.connecter(self.chemin).execute('DELETE FROM reservations WHERE id = ?', (reservation,))
+
+
+class Limiteur:
+    """Point d'entrée utilisé par l'application"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @contextmanager
+    def reserver(self, tenant, cout):
+        """Réserver le rendu pour la durée du bloc, lève QuotaDepasse si une limite est atteinte"""
+        debit, rafale, simultanes = limites_tenant(tenant)
+        reservation = self.backend.acquerir(tenant.id, cout, debit, rafale, simultanes)
+        try:
+            yield
+        finally:
+            self.backend.liberer(tenant.id, cout, reservation)
+
+
+def limiteur_depuis_environnement(environ=os.environ):
+    if environ.get('RATE_LIMIT_DB'):
+        return Limiteur(LimiteurSQLite(environ['RATE_LIMIT_DB']))
+    return Limiteur(LimiteurMemoire())
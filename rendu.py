@@ -0,0 +1,52 @@
+# rendu.py - Rendu d'un devis ou d'une facture dans un fichier (PDF ou DOCX)
+#
+# Module volontairement léger : il n'importe que les générateurs, leurs caches et le
+# rendu parallèle. Les processus du pool de rendu de app_async.py n'importent que lui,
+# sans app_students et son initialisation (stockage des documents et son thread de
+# nettoyage, file de tâches, bases SQLite). Ils sont préchauffés à leur démarrage,
+# avant leur première tâche (prechauffer_processus).
+import assets
+import rendu_parallele
+from docx_generator import generate_docx_devis, generate_docx_facture
+from pdf_generator_students import generate_pdf_devis, generate_pdf_facture
+from themes import THEMES_DISPONIBLES
+from warmup import Prechauffage
+
+# Types MIME des formats de sortie
+MIMETYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+
+def rendre_document(document, type_document, output_format, theme, filename=None, profil=None, mode=None):
+    """Générer le fichier du devis ou de la facture, retourne (chemin, mimetype)"""
+    if output_format not in MIMETYPES:
+        raise ValueError("Format non supporté. Utilisez 'pdf' ou 'docx'")
+
+    if output_format == 'pdf':
+        # Très long document : plages de pages rendues en parallèle
+        if mode is None and filename is not None and rendu_parallele.eligible(document):
+            chemin = rendu_parallele.rendre_pdf_parallele(document, type_document, theme, filename, profil)
+            return chemin, MIMETYPES[output_format]
+        generateur = generate_pdf_devis if type_document == 'devis' else generate_pdf_facture
+        chemin = generateur(document, theme=theme, filename=filename, profil=profil, mode=mode)
+    else:
+        generateur = generate_docx_devis if type_document == 'devis' else generate_docx_facture
+        chemin = generateur(document, theme=theme, filename=filename)
+
+    return chemin, MIMETYPES[output_format]
+
+
+def rendre_avec_logo(document, type_document, output_format, theme, logo, chemin, profil=None):
+    """Point d'entrée du pool de processus : réutilise le logo déjà téléchargé par le parent"""
+    assets.memoriser_logo(document.logo_url, logo)
+    return rendre_document(document, type_document, output_format, theme, chemin, profil)
+
+
+def prechauffer_processus(documents):
+    """Initialisation d'un processus du pool : préchauffer ses caches avant sa première tâche
+
+    documents : {type_document: document}, construits par le processus parent.
+    """
+    Prechauffage(rendre_document, lambda: documents, THEMES_DISPONIBLES, MIMETYPES).demarrer(attendre=True)
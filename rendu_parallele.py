@@ -0,0 +1,196 @@
+# rendu_parallele.py - Rendu des très longs PDF par plages de pages, sur plusieurs cœurs
+#
+# doc.build() de ReportLab ne s'exécute que sur un cœur. Pour un document d'au moins
+# RENDU_PARALLELE_PAGES pages (estimées d'après ses lignes d'articles) :
+#   1. une passe de mise en page sans dessin (mode "mise_en_page" : hauteurs de lignes
+#      reprises du cache de lignes, tableau coupé par simple cumul de ces hauteurs) donne
+#      le nombre de pages et le nombre de lignes du tableau sur chaque page ;
+#   2. le document est découpé en plages de pages contiguës, rendues en parallèle par un
+#      pool de processus : chaque processus met en page tout le document avec ce découpage
+#      figé mais ne dessine que sa plage (mode "plage"), si bien que le thème, les styles
+#      et le pied de page "n/N" sont ceux du document entier ;
+#   3. les plages sont assemblées dans un seul PDF par PyMuPDF ou pypdf (optionnels).
+# Sans l'un ni l'autre, pour un document plus court, ou dans un processus qui est
+# lui-même un worker de pool (app_async.py), le rendu reste séquentiel.
+#
+# Le pool est créé depuis un worker qui a plusieurs threads (threads Gunicorn, file de
+# tâches, boucle asyncio) : un fork y copierait des verrous tenus par d'autres threads
+# (logging, caches, SQLite) et pourrait bloquer le processus enfant. Les processus du pool
+# sont donc démarrés par forkserver (spawn là où il n'existe pas).
+#
+# RENDU_PARALLELE_PROCESSUS fixe la taille du pool (nombre de cœurs par défaut) ;
+# RENDU_PARALLELE_PAGES=0 désactive le rendu parallèle.
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz  # anciennes versions de PyMuPDF
+    except ImportError:  # PyMuPDF est optionnel : assemblage par pypdf
+        fitz = None
+
+try:
+    import pypdf
+except ImportError:  # pypdf est optionnel
+    pypdf = None
+
+import assets
+from pdf_generator_students import Pagination, generate_pdf_devis, generate_pdf_facture, nb_lignes_article
+
+RENDU_PARALLELE_PAGES = int(os.environ.get('RENDU_PARALLELE_PAGES', 100))
+RENDU_PARALLELE_PROCESSUS = int(os.environ.get('RENDU_PARALLELE_PROCESSUS', 0)) or os.cpu_count() or 1
+# Lignes du tableau par page, pour estimer la longueur d'un document avant sa mise en page
+LIGNES_PAR_PAGE_ESTIMEES = 20
+
+_executeur = None
+_lock = threading.Lock()
+
+
+def moteur_assemblage():
+    """Bibliothèque utilisée pour assembler les plages : "pymupdf", "pypdf" ou None"""
+    if fitz is not None:
+        return 'pymupdf'
+    if pypdf is not None:
+        return 'pypdf'
+    return None
+
+
+def pages_estimees(document):
+    """Nombre de pages approximatif du document, d'après les lignes de son tableau d'articles"""
+    lignes = sum(nb_lignes_article(item.details, item.remise) for item in document.items)
+    return lignes // LIGNES_PAR_PAGE_ESTIMEES + 1
+
+
+def eligible(document, processus=None):
+    """Le document est-il assez long pour être rendu en parallèle ?"""
+    processus = processus or RENDU_PARALLELE_PROCESSUS
+    return (RENDU_PARALLELE_PAGES > 0 and processus > 1 and moteur_assemblage() is not None
+            and multiprocessing.parent_process() is None
+            and pages_estimees(document) >= RENDU_PARALLELE_PAGES)
+
+
+def decouper(nb_pages, nb_plages):
+    """Plages (première, dernière page) contiguës et de tailles égales à une page près"""
+    nb_plages = max(1, min(nb_plages, nb_pages))
+    taille, reste = divmod(nb_pages, nb_plages)
+    plages = []
+    debut = 1
+    for index in range(nb_plages):
+        fin = debut + taille + (1 if index < reste else 0) - 1
+        plages.append((debut, fin))
+        debut = fin + 1
+    return plages
+
+
+def _generateur(type_document):
+    return generate_pdf_devis if type_document == 'devis' else generate_pdf_facture
+
+
+def paginer(document, type_document, theme, profil=None):
+    """Passe de mise en page sans dessin, retourne (nombre de pages, lignes du tableau par page)"""
+    pagination = Pagination()
+    resultat = _generateur(type_document)(document, theme=theme, profil=profil, mode='mise_en_page',
+                                          pagination=pagination)
+    return resultat['pages'], pagination.lignes_par_page
+
+
+def rendre_plage(document, type_document, theme, chemin, lignes_par_page, plage, profil=None, logo=None):
+    """Rendre le document en ne dessinant que les pages de `plage` (exécuté dans le pool)
+
+    Retourne (chemin, temps CPU du rendu en secondes) : la durée qu'il aurait sur un cœur libre.
+    """
+    debut = time.process_time()
+    if logo is not None:
+        assets.memoriser_logo(document.logo_url, logo)
+    pagination = Pagination(lignes_par_page, len(lignes_par_page), plage)
+    _generateur(type_document)(document, theme=theme, filename=chemin, profil=profil, mode='plage',
+                               pagination=pagination)
+    return chemin, time.process_time() - debut
+
+
+def assembler(parties, filename):
+    """Écrire dans filename les pages (première, dernière) de chaque partie, dans l'ordre"""
+    if fitz is not None:
+        with fitz.open() as sortie:
+            for chemin, (debut, fin) in parties:
+                with fitz.open(chemin) as partie:
+                    if not sortie.metadata.get('title'):
+                        sortie.set_metadata(partie.metadata)
+                    sortie.insert_pdf(partie, from_page=debut - 1, to_page=fin - 1)
+            # garbage=3 : les polices communes aux plages ne sont écrites qu'une fois
+            sortie.save(filename, garbage=3, deflate=True)
+        return filename
+
+    if pypdf is None:
+        raise RuntimeError("Assemblage impossible : installez PyMuPDF (pip install pymupdf) ou pypdf")
+    writer = pypdf.PdfWriter()
+    for chemin, (debut, fin) in parties:
+        reader = pypdf.PdfReader(chemin)
+        if reader.metadata and not writer.metadata.get('/Title'):
+            writer.add_metadata(reader.metadata)
+        for index in range(debut - 1, fin):
+            writer.add_page(reader.pages[index])
+    writer.compress_identical_objects()
+    with open(filename, 'wb') as f:
+        writer.write(f)
+    return filename
+
+
+def contexte_processus():
+    """Contexte multiprocessing des pools de rendu : forkserver, ou spawn sans lui (Windows)"""
+    methodes = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methodes else 'spawn')
+
+
+def _obtenir_executeur():
+    global _executeur
+    with _lock:
+        if _executeur is None:
+            _executeur = ProcessPoolExecutor(max_workers=RENDU_PARALLELE_PROCESSUS, mp_context=contexte_processus())
+        return _executeur
+
+
+def rendre_pdf_parallele(document, type_document, theme, filename, profil=None, processus=None,
+                         executeur=None, durees=None):
+    """Rendre le PDF par plages de pages en parallèle puis les assembler, retourne filename
+
+    durees (dictionnaire optionnel) reçoit la durée de chaque étape, et le temps CPU du
+    rendu de chaque plage dans son processus (parties_cpu_s).
+    """
+    processus = processus or RENDU_PARALLELE_PROCESSUS
+    durees = {} if durees is None else durees
+    debut = time.perf_counter()
+    nb_pages, lignes_par_page = paginer(document, type_document, theme, profil)
+    durees['pagination_s'] = time.perf_counter() - debut
+
+    plages = decouper(nb_pages, processus)
+    logo = assets.telecharger_logo(document.logo_url)
+    logo = bytes(logo) if logo is not None else None  # memoryview du magasin partagé : non transmissible
+    dossier = tempfile.mkdtemp(prefix='.plages-', dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        executeur = executeur or _obtenir_executeur()
+        debut = time.perf_counter()
+        futures = [
+            executeur.submit(rendre_plage, document, type_document, theme, os.path.join(dossier, f'{index}.pdf'),
+                             lignes_par_page, plage, profil, logo)
+            for index, plage in enumerate(plages)
+        ]
+        resultats = [future.result() for future in futures]
+        durees['plages_s'] = time.perf_counter() - debut
+        durees['parties_cpu_s'] = [duree for _, duree in resultats]
+        parties = [(chemin, plage) for (chemin, _), plage in zip(resultats, plages)]
+
+        debut = time.perf_counter()
+        assembler(parties, filename)
+        durees['assemblage_s'] = time.perf_counter() - debut
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+    durees.update(pages=nb_pages, plages=len(plages))
+    return filename
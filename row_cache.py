@@ -0,0 +1,86 @@
+# row_cache.py - Cache des lignes du tableau des articles, construites et mesurées
+#
+# Deux articles identiques (description, détails, quantité, prix, TVA, total, remise)
+# donnent les mêmes lignes de tableau, dans un même devis comme d'un devis à l'autre
+# pour un même catalogue. Ce module garde, pour tout le worker et par (thème, contenu
+# de l'article) :
+#   - les cellules des lignes de l'article, paragraphes déjà analysés et coupés en lignes ;
+#   - la hauteur mesurée de chacune de ces lignes dans le tableau.
+# Avec les hauteurs de toutes ses lignes, le tableau n'a plus à mesurer ses cellules à
+# chaque coupure de page (ReportLab remesure sinon chaque reste du tableau découpé).
+# Chaque document reçoit des copies des cellules : deux rendus simultanés ne dessinent
+# jamais le même paragraphe.
+#
+# LIGNES_CACHE_TAILLE fixe le nombre d'articles gardés (0 désactive le cache).
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+from reportlab.platypus import Flowable
+
+LIGNES_CACHE_TAILLE = int(os.environ.get('LIGNES_CACHE_TAILLE', 4096))
+
+
+class LignesArticle:
+    """Lignes d'un article dans le tableau (modèles de cellules) et leurs hauteurs mesurées"""
+
+    __slots__ = ('cle', 'lignes', 'ligne_detail', 'hauteurs')
+
+    def __init__(self, cle, lignes, ligne_detail=None):
+        self.cle = cle
+        self.lignes = tuple(tuple(ligne) for ligne in lignes)
+        self.ligne_detail = ligne_detail  # position de la ligne de détails (en span), ou None
+        self.hauteurs = None  # mesurées par le premier tableau qui contient l'article
+
+    def copier(self):
+        """Lignes prêtes à placer dans un tableau (cellules copiées, coupures conservées)"""
+        return [[copy.copy(cellule) if isinstance(cellule, Flowable) else cellule for cellule in ligne]
+                for ligne in self.lignes]
+
+
+class CacheLignes:
+    """Cache LRU borné des lignes d'articles mesurées, avec statistiques"""
+
+    def __init__(self, taille=LIGNES_CACHE_TAILLE):
+        self.taille = taille
+        self._entrees = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def obtenir(self, cle):
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self._stats['misses'] += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._stats['hits'] += 1
+            return entree
+
+    def memoriser(self, cle, entree):
+        """Garder un article dont les hauteurs ont été mesurées"""
+        if self.taille <= 0:
+            return
+        with self._lock:
+            self._entrees[cle] = entree
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def statistiques(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entrees'] = len(self._entrees)
+        total = stats['hits'] + stats['misses']
+        stats['taux'] = round(stats['hits'] / total, 3) if total else 0.0
+        return stats
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+            for cle in self._stats:
+                self._stats[cle] = 0
+
+
+CACHE = CacheLignes()
@@ -0,0 +1,218 @@
+# shared_assets.py - Ressources partagées par tous les workers (logos, polices)
+#
+# Chaque worker Gunicorn gardait sa propre copie des logos téléchargés et les
+# retéléchargeait pour son compte. Les ressources sont déposées une seule fois sous
+# RESSOURCES_DOSSIER (generated/ressources par défaut) :
+#   - <empreinte>.bin : le contenu, nommé par son SHA-256, écrit une fois (fichier
+#     temporaire puis renommage atomique) et jamais modifié. Chaque worker le projette en
+#     mémoire en lecture seule (mmap) : une seule copie, dans le cache de pages du noyau,
+#     pour tous les processus ;
+#   - index/<SHA-256 de la clé> : l'empreinte du contenu d'une clé (URL d'un logo, nom
+#     d'une police), pour retrouver une ressource par sa clé comme par son empreinte.
+#
+# Une clé n'est valable que RESSOURCES_TTL secondes après son dernier dépôt (date du
+# fichier d'index ; 3600 par défaut, 0 : sans expiration). Passé ce délai elle est absente
+# et le logo est retéléchargé : un logo remplacé à la même URL est pris en compte.
+#
+# Au-delà de RESSOURCES_TAILLE_MO (64 par défaut ; 0 désactive le magasin), les contenus
+# les moins récemment lus sont supprimés, par un seul worker à la fois (verrou fcntl sur
+# le fichier .verrou). Une projection déjà ouverte reste valide après la suppression de
+# son fichier ; une clé dont le contenu a été supprimé est simplement absente.
+#
+# Aucune police TrueType n'est enregistrée aujourd'hui (polices standard Helvetica) :
+# une police déposée par stocker() s'enregistre dans ReportLab depuis chemin().
+import hashlib
+import mmap
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # fcntl n'existe pas sous Windows : éviction sans verrou entre processus
+    fcntl = None
+
+RESSOURCES_DOSSIER = os.environ.get('RESSOURCES_DOSSIER', os.path.join('generated', 'ressources'))
+RESSOURCES_TAILLE_MO = int(os.environ.get('RESSOURCES_TAILLE_MO', 64))
+RESSOURCES_TTL = int(os.environ.get('RESSOURCES_TTL', 3600))
+
+
+def empreinte(contenu):
+    """SHA-256 (hexadécimal) d'un contenu"""
+    return hashlib.sha256(contenu).hexdigest()
+
+
+class MagasinRessources:
+    """Ressources sur disque projetées en lecture seule, retrouvées par clé ou par empreinte"""
+
+    def __init__(self, dossier, taille_max, intervalle=60, ttl=RESSOURCES_TTL):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.intervalle = intervalle
+        self.ttl = ttl
+        self._dernier_nettoyage = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+        if self.actif:
+            os.makedirs(os.path.join(dossier, 'index'), exist_ok=True)
+
+    @property
+    def actif(self):
+        return self.taille_max > 0
+
+    def chemin(self, empreinte_contenu):
+        return os.path.join(self.dossier, f'{empreinte_contenu}.bin')
+
+    def _chemin_index(self, cle):
+        return os.path.join(self.dossier, 'index', hashlib.sha256(cle.encode('utf-8')).hexdigest())
+
+    def _compter(self, resultat):
+        with self._lock:
+            self._stats['hits' if resultat is not None else 'misses'] += 1
+        return resultat
+
+    def obtenir(self, empreinte_contenu):
+        """Contenu projeté en mémoire (memoryview en lecture seule), ou None"""
+        if not self.actif:
+            return None
+        chemin = self.chemin(empreinte_contenu)
+        try:
+            with open(chemin, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    projection = memoryview(b'')
+                else:
+                    projection = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            os.utime(chemin)  # dernier accès, pour l'éviction
+        except OSError:
+            return self._compter(None)
+        return self._compter(projection)
+
+    def obtenir_cle(self, cle):
+        """Contenu enregistré sous `cle` (URL, nom de police), ou None (absent ou expiré)"""
+        trouve = self.lire_cle(cle)
+        return trouve[0] if trouve is not None else None
+
+    def lire_cle(self, cle):
+        """(contenu, date de dépôt de la clé) si `cle` est enregistrée et pas expirée, sinon None"""
+        if not self.actif or not cle:
+            return None
+        try:
+            with open(self._chemin_index(cle), encoding='ascii') as f:
+                depose_le = os.fstat(f.fileno()).st_mtime
+                empreinte_contenu = f.read().strip()
+        except OSError:
+            return self._compter(None)
+        if self.ttl and time.time() - depose_le > self.ttl:
+            return self._compter(None)
+        contenu = self.obtenir(empreinte_contenu)
+        return (contenu, depose_le) if contenu is not None else None
+
+    def _ecrire(self, chemin, donnees):
+        # Fichier unique puis renommage atomique : un autre worker ne lit jamais un fichier partiel
+        temporaire = os.path.join(self.dossier, f'.{uuid.uuid4().hex}')
+        try:
+            with open(temporaire, 'wb') as f:
+                f.write(donnees)
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+
+    def stocker(self, contenu, cle=None):
+        """Déposer un contenu (une seule fois), sous `cle` si elle est donnée ; retourne son empreinte"""
+        empreinte_contenu = empreinte(contenu)
+        if not self.actif:
+            return empreinte_contenu
+        chemin = self.chemin(empreinte_contenu)
+        try:
+            if not os.path.exists(chemin):
+                self._ecrire(chemin, contenu)
+            if cle:
+                self._ecrire(self._chemin_index(cle), empreinte_contenu.encode('ascii'))
+        except OSError as e:
+            print(f"Erreur lors de l'enregistrement d'une ressource partagée: {e}")
+            return empreinte_contenu
+        self._nettoyer_si_necessaire()
+        return empreinte_contenu
+
+    def evincer(self):
+        """Supprimer les contenus les moins récemment lus au-delà de taille_max Mo
+
+        Un seul worker évince à la fois : les autres passent leur tour.
+        """
+        if not self.actif:
+            return 0
+        with open(os.path.join(self.dossier, '.verrou'), 'a') as verrou:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return 0
+            return self._evincer()
+
+    def _evincer(self):
+        fichiers = []
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith('.bin'):
+                continue
+            try:
+                infos = os.stat(os.path.join(self.dossier, nom))
+            except OSError:
+                continue
+            fichiers.append((infos.st_mtime, infos.st_size, nom))
+        total = sum(taille for _, taille, _ in fichiers)
+        limite = self.taille_max * 1024 * 1024
+        supprimes = 0
+        for _, taille, nom in sorted(fichiers):
+            if total <= limite:
+                break
+            try:
+                os.remove(os.path.join(self.dossier, nom))
+            except OSError:
+                continue
+            total -= taille
+            supprimes += 1
+        if supprimes:
+            self._nettoyer_index()
+        return supprimes
+
+    def _nettoyer_index(self):
+        """Supprimer les clés dont le contenu a été évincé"""
+        dossier_index = os.path.join(self.dossier, 'index')
+        for nom in os.listdir(dossier_index):
+            chemin = os.path.join(dossier_index, nom)
+            try:
+                with open(chemin, encoding='ascii') as f:
+                    if not os.path.exists(self.chemin(f.read().strip())):
+                        os.remove(chemin)
+            except OSError:
+                continue
+
+    def _nettoyer_si_necessaire(self):
+        with self._lock:
+            if time.time() - self._dernier_nettoyage < self.intervalle:
+                return
+            self._dernier_nettoyage = time.time()
+        self.evincer()
+
+    def statistiques(self):
+        """Succès et échecs de ce worker, contenus et octets sur disque (tous workers)"""
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['taux'] = round(stats['hits'] / total, 3) if total else 0.0
+        stats['entrees'] = 0
+        stats['octets'] = 0
+        if self.actif:
+            for entree in os.scandir(self.dossier):
+                if entree.name.endswith('.bin'):
+                    try:
+                        stats['octets'] += entree.stat().st_size
+                    except OSError:
+                        continue
+                    stats['entrees'] += 1
+        return stats
+
+
+MAGASIN = MagasinRessources(RESSOURCES_DOSSIER, RESSOURCES_TAILLE_MO)
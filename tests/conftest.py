@@ -0,0 +1,49 @@
+# Les modules de l'API sont à la racine du dépôt
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+# Clés des deux clients de test de l'application
+CLES_ACME = {'X-API-Key-1': 'acme-1', 'X-API-Key-2': 'acme-2'}
+CLES_GLOBEX = {'X-API-Key-1': 'globex-1', 'X-API-Key-2': 'globex-2'}
+
+
+@pytest.fixture
+def app_students(tmp_path, monkeypatch):
+    """Module de l'application, avec stockage, bases, limites et clés propres au test"""
+    import app_students
+    from api_keys import RegistreCles, Tenant, hacher
+    from apercu import CacheApercus
+    from archive import Archive
+    from devis_store import DevisStore
+    from document_store import DocumentStore
+    from jobs import FileRendus
+    from numerotation import Numerotation
+    from rate_limit import Limiteur, LimiteurMemoire
+    from warmup import Prechauffage
+
+    tenants = [Tenant('acme', cle1_sha256=hacher('acme-1'), cle2_sha256=hacher('acme-2')),
+               Tenant('globex', cle1_sha256=hacher('globex-1'), cle2_sha256=hacher('globex-2'))]
+    file_rendus = FileRendus(str(tmp_path / 'jobs'))
+    for nom, valeur in {
+        'documents': DocumentStore(str(tmp_path / 'documents')),
+        'devis_enregistres': DevisStore(str(tmp_path / 'devis.sqlite3')),
+        'archive': Archive(str(tmp_path / 'archive.sqlite3')),
+        'apercus': CacheApercus(str(tmp_path / 'apercus')),
+        'numerotation': Numerotation(str(tmp_path / 'numerotation.sqlite3')),
+        'registre_cles': RegistreCles(lambda: tenants),
+        'limiteur': Limiteur(LimiteurMemoire()),
+        'file_rendus': file_rendus,
+        'prechauffage': Prechauffage(None, None, [], [], actif=False),
+    }.items():
+        monkeypatch.setattr(app_students, nom, valeur)
+    yield app_students
+    file_rendus.arreter()
+
+
+@pytest.fixture
+def client(app_students):
+    return app_students.app.test_client()
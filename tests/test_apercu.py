@@ -0,0 +1,85 @@
+import os
+import struct
+import time
+
+import pytest
+
+import apercu
+from apercu import CacheApercus, empreinte_document, lire_largeur
+from conftest import CLES_ACME
+from test_rendu_parallele import devis
+
+DEVIS = {'client_nom': 'ACME', 'items': [{'description': 'Audit', 'prix_unitaire': 100}]}
+
+avec_moteur = pytest.mark.skipif(apercu.moteur() is None, reason="ni PyMuPDF ni pdftoppm")
+
+
+def largeur_png(contenu):
+    assert contenu.startswith(b'\x89PNG')
+    return struct.unpack('>I', contenu[16:20])[0]
+
+
+@pytest.mark.parametrize('valeur, attendu', [(None, apercu.LARGEUR_PAR_DEFAUT), ('', apercu.LARGEUR_PAR_DEFAUT),
+                                             ('300', 300), (10, 100), (5000, 1600)])
+def test_lire_largeur(valeur, attendu):
+    assert lire_largeur(valeur) == attendu
+
+
+def test_empreinte_document():
+    document = devis(2)
+    assert empreinte_document(document, 'devis', 'bleu') == empreinte_document(devis(2), 'devis', 'bleu')
+    assert empreinte_document(document, 'devis', 'bleu') != empreinte_document(document, 'devis', 'vert')
+    document.items[0].description = 'Autre'
+    assert empreinte_document(document, 'devis', 'bleu') != empreinte_document(devis(2), 'devis', 'bleu')
+
+
+def test_cache_ttl(tmp_path):
+    cache = CacheApercus(str(tmp_path), ttl=60)
+    empreinte = 'a' * 64
+    assert cache.obtenir(empreinte, 400) is None
+    assert cache.obtenir('../x', 400) is None
+
+    chemin = cache.chemin(empreinte, 400)
+    open(chemin, 'wb').close()
+    assert cache.obtenir(empreinte, 400) == chemin
+    os.utime(chemin, (time.time() - 120, time.time() - 120))
+    assert cache.evincer() == 1 and cache.obtenir(empreinte, 400) is None
+
+
+def test_sans_moteur(client, monkeypatch):
+    import app_students
+    monkeypatch.setattr(app_students, 'moteur_apercu', lambda: None)
+    reponse = client.post('/api/devis', json=dict(DEVIS, preview=True), headers=CLES_ACME)
+    assert reponse.status_code == 501
+
+
+@avec_moteur
+def test_apercu_avant_generation(client, app_students, monkeypatch):
+    reponse = client.post('/api/devis', json=dict(DEVIS, preview=True, largeur_apercu=200), headers=CLES_ACME)
+    assert reponse.status_code == 200 and largeur_png(reponse.data) == 200
+    # Ni document enregistré, ni numéro attribué
+    assert 'X-Document-Id' not in reponse.headers
+    assert client.get('/api/documents', headers=CLES_ACME).get_json()['documents'] == []
+
+    # Même contenu : aperçu repris du cache, sans nouveau rendu
+    monkeypatch.setattr(app_students, 'rendre_document', lambda *args, **kwargs: pytest.fail('nouveau rendu'))
+    encore = client.post('/api/devis', json=dict(DEVIS, preview=True, largeur_apercu=200), headers=CLES_ACME)
+    assert encore.data == reponse.data and encore.headers['ETag'] == reponse.headers['ETag']
+
+
+@avec_moteur
+def test_apercu_d_un_document(client):
+    doc_id = client.post('/api/devis', json=dict(DEVIS, format=['pdf', 'docx']),
+                         headers=CLES_ACME).headers['X-Document-Id']
+    reponse = client.get(f'/api/documents/{doc_id}/preview?largeur=150', headers=CLES_ACME)
+    assert reponse.status_code == 200 and largeur_png(reponse.data) == 150
+
+
+def test_apercu_largeur_invalide(client):
+    reponse = client.post('/api/devis', json=dict(DEVIS, preview=True, largeur_apercu='large'), headers=CLES_ACME)
+    assert reponse.status_code == 400
+
+
+def test_apercu_docx_refuse(client):
+    doc_id = client.post('/api/devis', json=dict(DEVIS, format='docx'), headers=CLES_ACME).headers['X-Document-Id']
+    assert client.get(f'/api/documents/{doc_id}/preview', headers=CLES_ACME).status_code == 415
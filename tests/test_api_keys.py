@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+import db
+from api_keys import (RegistreCles, Tenant, ajouter_tenant, charger_fichier, charger_sqlite, hacher,
+                      registre_depuis_environnement)
+from conftest import CLES_ACME, CLES_GLOBEX
+
+
+def registre(*tenants, ttl=60):
+    return RegistreCles(lambda: list(tenants), ttl)
+
+
+ACME = Tenant('acme', cle1_sha256=hacher('a1'), cle2_sha256=hacher('a2'))
+
+
+@pytest.mark.parametrize('key1, key2, erreur', [
+    ('a1', 'a2', None),
+    ('a1', 'b2', "Clés API invalides"),
+    ('inconnue', 'a2', "Clés API invalides"),
+    ('a2', 'a1', "Clés API invalides"),
+    ('a1', None, "Clés API manquantes"),
+    ('', 'a2', "Clés API manquantes"),
+])
+def test_verifier(key1, key2, erreur):
+    tenant, message = registre(ACME).verifier(key1, key2)
+    assert message == erreur
+    assert tenant is (ACME if erreur is None else None)
+
+
+def test_rechargement_apres_ttl():
+    tenants = []
+    cles = RegistreCles(lambda: list(tenants), ttl=3600)
+    assert cles.verifier('a1', 'a2')[0] is None
+    tenants.append(ACME)
+    assert cles.verifier('a1', 'a2')[0] is None
+    cles.invalider()
+    assert cles.verifier('a1', 'a2')[0] is ACME
+
+
+def test_source_illisible_garde_la_table():
+    sources = [lambda: [ACME], lambda: 1 / 0]
+    cles = RegistreCles(lambda: sources.pop(0)(), ttl=0)
+    assert cles.verifier('a1', 'a2')[0] is ACME
+    assert cles.verifier('a1', 'a2')[0] is ACME
+
+
+def test_charger_fichier(tmp_path):
+    chemin = tmp_path / 'cles.json'
+    chemin.write_text(json.dumps({'tenants': [
+        {'id': 'acme', 'cle1_sha256': hacher('a1'), 'cle2_sha256': hacher('a2'), 'options': {'quota': 5}},
+        {'id': 'ancien', 'cle1_sha256': hacher('x1'), 'cle2_sha256': hacher('x2'), 'actif': False},
+    ]}))
+    cles = RegistreCles(charger_fichier(str(chemin)))
+    tenant, _ = cles.verifier('a1', 'a2')
+    assert tenant.id == 'acme' and tenant.options == {'quota': 5}
+    assert cles.verifier('x1', 'x2') == (None, "Clés API invalides")
+
+
+def test_ajouter_tenant_sqlite(tmp_path):
+    chemin = str(tmp_path / 'cles.sqlite3')
+    try:
+        key1, key2 = ajouter_tenant(chemin, 'acme', 'ACME SA', {'quota': 5})
+        tenant, _ = RegistreCles(charger_sqlite(chemin)).verifier(key1, key2)
+        assert (tenant.id, tenant.nom, tenant.options) == ('acme', 'ACME SA', {'quota': 5})
+        # Seuls les hachages sont stockés
+        ligne = db.connecter(chemin).execute('SELECT cle1_sha256, cle2_sha256 FROM cles_api').fetchone()
+        assert tuple(ligne) == (hacher(key1), hacher(key2))
+    finally:
+        db.fermer(chemin)
+
+
+def test_registre_depuis_environnement():
+    cles = registre_depuis_environnement({'API_KEY_1': 'k1', 'API_KEY_2': 'k2'})
+    assert cles.verifier('k1', 'k2')[0].id == 'defaut'
+
+
+def test_route_identifie_le_client(client):
+    assert client.get('/api/test-auth', headers=CLES_ACME).get_json()['tenant'] == 'acme'
+    assert client.get('/api/test-auth', headers=CLES_GLOBEX).get_json()['tenant'] == 'globex'
+    assert client.get('/api/test-auth', headers={'X-API-Key-1': 'acme-1'}).status_code == 401
+    assert client.get('/api/test-auth', headers={'X-API-Key-1': 'acme-1',
+                                                 'X-API-Key-2': 'globex-2'}).status_code == 401
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import CLES_ACME
+
+DEVIS = {'client_nom': 'ACME', 'items': [{'description': 'Audit', 'prix_unitaire': 100}]}
+
+
+@pytest.fixture
+def app_async(app_students, monkeypatch):
+    import app_async
+    # Pool de threads : les tests n'ont pas à démarrer de processus de rendu
+    monkeypatch.setattr(app_async, 'ASYNC_EXECUTEUR', 'threads')
+    monkeypatch.setattr(app_async, 'ASYNC_WORKERS', 1)
+    monkeypatch.setattr(app_async, '_executeur', None)
+    yield app_async
+    if app_async._executeur is not None:
+        app_async._executeur.shutdown(wait=True)
+
+
+def appeler(application, methode, chemin, corps=b'', headers=None):
+    """Requête HTTP sur l'application ASGI, retourne (statut, en-têtes, corps)"""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': methode, 'path': chemin, 'query_string': b'',
+        'headers': [(nom.lower().encode('latin-1'), valeur.encode('latin-1'))
+                    for nom, valeur in (headers or {}).items()],
+    }
+    messages = [{'type': 'http.request', 'body': corps, 'more_body': False}]
+    envoyes = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        envoyes.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    debut = envoyes[0]
+    entetes = {nom.decode('latin-1'): valeur.decode('latin-1') for nom, valeur in debut['headers']}
+    return debut['status'], entetes, b''.join(m.get('body', b'') for m in envoyes[1:])
+
+
+def test_creation_devis_pdf(app_async):
+    statut, entetes, corps = appeler(app_async.app, 'POST', '/api/devis', json.dumps(DEVIS).encode(), CLES_ACME)
+    assert statut == 200
+    assert entetes['content-type'] == 'application/pdf'
+    assert corps.startswith(b'%PDF')
+    assert entetes['x-document-ids'] == f"pdf={entetes['x-document-id']}"
+
+
+def test_cles_invalides(app_async):
+    statut, _, corps = appeler(app_async.app, 'POST', '/api/devis', json.dumps(DEVIS).encode(),
+                               {'X-API-Key-1': 'acme-1', 'X-API-Key-2': 'mauvaise'})
+    assert statut == 401 and 'error' in json.loads(corps)
+
+
+def test_erreur_de_validation_comme_flask(app_async, client):
+    corps = json.dumps({'items': []}).encode()
+    statut, _, reponse = appeler(app_async.app, 'POST', '/api/devis', corps, CLES_ACME)
+    attendu = client.post('/api/devis', data=corps, content_type='application/json', headers=CLES_ACME)
+    assert statut == attendu.status_code == 400
+    assert json.loads(reponse) == attendu.get_json()
+
+
+def test_corps_trop_volumineux(app_async, monkeypatch):
+    monkeypatch.setitem(app_async.flask_app.config, 'MAX_CONTENT_LENGTH', 10)
+    statut, _, _ = appeler(app_async.app, 'POST', '/api/devis', json.dumps(DEVIS).encode(), CLES_ACME)
+    assert statut == 413
+
+
+def test_dry_run(app_async):
+    corps = json.dumps(dict(DEVIS, dry_run=True)).encode()
+    statut, entetes, reponse = appeler(app_async.app, 'POST', '/api/devis', corps, CLES_ACME)
+    assert statut == 200 and entetes['content-type'] == 'application/json'
+    assert json.loads(reponse)['pages'] == 1
+
+
+def test_autres_routes_servies_par_flask(app_async):
+    statut, _, corps = appeler(app_async.app, 'GET', '/api/themes')
+    assert statut == 200 and json.loads(corps)
+
+
+def test_rendu_avec_logo_du_parent(monkeypatch):
+    import assets
+    import rendu
+    from test_rendu_parallele import devis
+
+    monkeypatch.setattr(assets, '_logos', type(assets._logos)())
+    rendus = []
+    monkeypatch.setattr(rendu, 'rendre_document', lambda *args: rendus.append(args) or ('d.pdf', 'application/pdf'))
+    document = devis(1)
+    document.logo_url = 'test://logo'
+    # Le processus de rendu reprend le logo téléchargé par le parent, sans le télécharger à nouveau
+    assert rendu.rendre_avec_logo(document, 'devis', 'pdf', 'bleu', b'logo', 'd.pdf') == ('d.pdf', 'application/pdf')
+    assert assets.logo_en_cache('test://logo') == b'logo'
+    assert rendus == [(document, 'devis', 'pdf', 'bleu', 'd.pdf', None)]
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+import db
+from archive import Archive, date_iso, requete_fts
+
+
+@pytest.fixture
+def archive(tmp_path):
+    chemin = str(tmp_path / 'archive.sqlite3')
+    yield Archive(chemin)
+    db.fermer(chemin)
+
+
+def document(numero, client_nom='Dupont', date_emission='27/09/2025', descriptions=('Prestation',)):
+    return SimpleNamespace(
+        numero=numero, date_emission=date_emission, client_nom=client_nom, client_siret='',
+        total_ht=100.0, total_tva=20.0, total_ttc=120.0,
+        items=[SimpleNamespace(description=description) for description in descriptions],
+    )
+
+
+def numeros(lignes):
+    return [ligne['numero'] for ligne in lignes]
+
+
+def test_pagination_par_curseur(archive):
+    for i in range(5):
+        archive.enregistrer(document(f'D-{i}'), 'devis', 'a')
+    archive.enregistrer(document('D-autre'), 'devis', 'b')
+
+    page, suivant = archive.rechercher('a', limite=2)
+    assert numeros(page) == ['D-4', 'D-3'] and suivant == page[-1]['id']
+    page, suivant = archive.rechercher('a', apres=suivant, limite=2)
+    assert numeros(page) == ['D-2', 'D-1']
+    page, suivant = archive.rechercher('a', apres=suivant, limite=2)
+    assert numeros(page) == ['D-0'] and suivant is None
+
+
+def test_criteres_et_dates(archive):
+    archive.enregistrer(document('D-1', date_emission='01/01/2025'), 'devis', 'a')
+    archive.enregistrer(document('F-1', date_emission='2025-06-01'), 'facture', 'a')
+    archive.enregistrer(document('F-2', date_emission='31/12/2025'), 'facture', 'a')
+
+    assert numeros(archive.rechercher('a', {'type': 'facture'})[0]) == ['F-2', 'F-1']
+    assert numeros(archive.rechercher('a', date_min='2025-02-01', date_max='2025-12-01')[0]) == ['F-1']
+    # Le nom du client est comparé sans tenir compte de la casse
+    assert len(archive.rechercher('a', {'client_nom': 'DUPONT'})[0]) == 3
+
+
+def test_recherche_texte(archive):
+    archive.enregistrer(document('D-1', client_nom='Électricité Martin', descriptions=('Tableau',)), 'devis', 'a')
+    archive.enregistrer(document('D-2', client_nom='Plomberie', descriptions=('Chauffe-eau',)), 'devis', 'a')
+    archive.enregistrer(document('D-3', client_nom='Electricite Martin'), 'devis', 'b')
+
+    assert numeros(archive.rechercher('a', texte='martin')[0]) == ['D-1']
+    if archive.fts:
+        assert numeros(archive.rechercher('a', texte='electricite mar')[0]) == ['D-1']
+        assert numeros(archive.rechercher('a', texte='chauffe')[0]) == ['D-2']
+
+
+def test_limite_bornee(archive):
+    for i in range(3):
+        archive.enregistrer(document(f'D-{i}'), 'devis', 'a')
+    assert len(archive.rechercher('a', limite=0)[0]) == 1
+
+
+def test_date_iso():
+    assert date_iso('27/09/2025') == '2025-09-27'
+    assert date_iso(' 2025-09-27 ') == '2025-09-27'
+    assert date_iso('septembre') is None
+
+
+def test_requete_fts_echappe_les_guillemets():
+    assert requete_fts('a"b', 't') == 'tenant : "t" AND {client_nom descriptions} : ("a""b"*)'
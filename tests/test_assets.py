@@ -0,0 +1,31 @@
+import time
+
+import pytest
+
+import assets
+from shared_assets import MagasinRessources
+
+
+@pytest.fixture
+def magasin(tmp_path, monkeypatch):
+    ressources = MagasinRessources(str(tmp_path), taille_max=1, ttl=60)
+    monkeypatch.setattr(assets, 'MAGASIN', ressources)
+    monkeypatch.setattr(assets, 'LOGO_TTL', 60)
+    monkeypatch.setattr(assets, '_logos', type(assets._logos)())
+    return ressources
+
+
+def test_logo_memorise_expire(magasin):
+    assets.memoriser_logo('https://exemple.fr/logo.png', b'logo')
+    assert assets.logo_en_cache('https://exemple.fr/logo.png') == b'logo'
+
+    assets.memoriser_logo('https://exemple.fr/logo.png', b'logo', depose_le=time.time() - 120)
+    assert assets.logo_en_cache('https://exemple.fr/logo.png') is None
+    assert 'https://exemple.fr/logo.png' not in assets._logos
+
+
+def test_logo_du_magasin_garde_sa_date_de_depot(magasin):
+    magasin.stocker(b'logo partage', cle='https://exemple.fr/logo.png')
+    assert bytes(assets.logo_en_cache('https://exemple.fr/logo.png')) == b'logo partage'
+    _, depose_le = assets._logos['https://exemple.fr/logo.png']
+    assert depose_le == magasin.lire_cle('https://exemple.fr/logo.png')[1]
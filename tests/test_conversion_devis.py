@@ -0,0 +1,62 @@
+import time
+
+import db
+from app_students import construire_facture_depuis_devis
+from conftest import CLES_ACME, CLES_GLOBEX
+from devis_store import DevisStore
+from test_rendu_parallele import devis
+
+DEVIS = {'numero': 'D-1', 'client_nom': 'ACME', 'texte_intro': 'Bonjour',
+         'items': [{'description': 'Audit', 'details': ['Revue'], 'quantite': 3, 'prix_unitaire': 33.33,
+                    'remise': 5}]}
+
+
+def test_enregistrer_et_obtenir(tmp_path):
+    store = DevisStore(str(tmp_path / 'devis.sqlite3'))
+    original = devis(3)
+    store.enregistrer(original, 'acme')
+
+    relu = store.obtenir('D-TEST', 'acme')
+    assert [vars(item) for item in relu.items] == [vars(item) for item in original.items]
+    assert (relu.total_ht, relu.total_ttc) == (original.total_ht, original.total_ttc)
+    assert store.obtenir('D-TEST', 'globex') is None
+
+
+def test_purge_au_demarrage(tmp_path):
+    chemin = str(tmp_path / 'devis.sqlite3')
+    DevisStore(chemin).enregistrer(devis(1), 'acme')
+    db.connecter(chemin).execute('UPDATE devis SET cree_le = ?', (time.time() - 10 * 86400,))
+    assert DevisStore(chemin, conservation_jours=30).obtenir('D-TEST', 'acme') is not None
+    assert DevisStore(chemin, conservation_jours=7).obtenir('D-TEST', 'acme') is None
+
+
+def test_facture_reprend_articles_et_totaux():
+    source = devis(2)
+    source.total_ttc = 999.99  # repris tel quel, sans recalcul
+    facture = construire_facture_depuis_devis(source, {'numero': 'F-1', 'statut_paiement': 'Payée'})
+    assert facture.items is source.items and facture.total_ttc == 999.99
+    assert (facture.numero, facture.reference_devis, facture.statut_paiement) == ('F-1', 'D-TEST', 'Payée')
+    assert not hasattr(facture, 'date_expiration') and not hasattr(facture, 'texte_intro')
+
+
+def test_conversion_par_l_api(client):
+    assert client.post('/api/devis', json=DEVIS, headers=CLES_ACME).status_code == 200
+
+    reponse = client.post('/api/devis/D-1/facture', json={'numero': 'F-1'}, headers=CLES_ACME)
+    assert reponse.status_code == 200 and reponse.mimetype == 'application/pdf'
+
+    trouves = client.get('/api/documents?reference_devis=D-1', headers=CLES_ACME).get_json()['documents']
+    assert [(d['type'], d['numero'], d['document_id']) for d in trouves] == [
+        ('facture', 'F-1', reponse.headers['X-Document-Id'])]
+
+
+def test_devis_d_un_autre_client(client):
+    client.post('/api/devis', json=DEVIS, headers=CLES_ACME)
+    reponse = client.post('/api/devis/D-1/facture', json={}, headers=CLES_GLOBEX)
+    assert reponse.status_code == 404 and reponse.get_json()['numero'] == 'D-1'
+
+
+def test_conversion_invalide(client):
+    client.post('/api/devis', json=DEVIS, headers=CLES_ACME)
+    assert client.post('/api/devis/D-1/facture', json={'format': 'odt'}, headers=CLES_ACME).status_code == 400
+    assert client.post('/api/devis/D-1/facture', json={'numero': 'x' * 101}, headers=CLES_ACME).status_code == 400
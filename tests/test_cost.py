@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+from cost import (COUT_BASE, COUT_PAR_ARTICLE, COUT_PAR_LIGNE_DETAIL, CoutExcessif, admettre, estimer_cout,
+                  estimer_cout_lot, mesurer)
+
+
+def document(nb_articles=0, details=(), logo_url=None, **textes):
+    items = [SimpleNamespace(description='', details=list(details)) for _ in range(nb_articles)]
+    return SimpleNamespace(items=items, logo_url=logo_url, **textes)
+
+
+def test_mesurer():
+    grandeurs = mesurer(document(3, details=['a' * 512, 'b' * 512], texte_intro='c' * 1024))
+    assert grandeurs == {'articles': 3, 'lignes_detail': 6, 'texte_ko': 4.0, 'logo': 0, 'logo_mo': 0.0}
+
+
+def test_facture_sans_textes():
+    assert mesurer(document(1))['texte_ko'] == 0
+
+
+def test_cout_proportionnel_au_document_et_aux_formats():
+    attendu = COUT_BASE + 10 * COUT_PAR_ARTICLE + 20 * COUT_PAR_LIGNE_DETAIL
+    assert estimer_cout(document(10, details=['', ''])) == round(attendu, 3)
+    assert estimer_cout(document(10, details=['', '']), nb_formats=2) == round(2 * attendu, 3)
+
+
+def test_lot_sans_logo_partage():
+    assert estimer_cout_lot([document(1), document(2)]) == round(2 * COUT_BASE + 3 * COUT_PAR_ARTICLE, 3)
+
+
+def test_admettre():
+    assert admettre(1, seuil=20, budget=100) is False
+    assert admettre(50, seuil=20, budget=100) is True
+    with pytest.raises(CoutExcessif) as e:
+        admettre(150, seuil=20, budget=100)
+    assert e.value.to_dict()['cout_estime'] == 150
+    assert e.value.to_dict()['budget_max'] == 100
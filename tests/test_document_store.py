@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+import pytest
+
+from conftest import CLES_ACME, CLES_GLOBEX
+from document_store import DocumentStore
+
+
+def deposer(store, contenu=b'%PDF-1.4', type_document='devis'):
+    chemin = store.chemin_temporaire('pdf')
+    with open(chemin, 'wb') as f:
+        f.write(contenu)
+    return store.enregistrer(chemin, 'devis.pdf', 'application/pdf', type_document)
+
+
+def vieillir(store, doc_id, secondes):
+    instant = time.time() - secondes
+    os.utime(os.path.join(store.dossier, f'{doc_id}.json'), (instant, instant))
+
+
+def test_enregistrer_et_obtenir(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    doc_id = deposer(store, b'contenu')
+    meta = store.obtenir(doc_id)
+    assert meta['taille'] == 7 and meta['nom'] == 'devis.pdf'
+    with open(meta['chemin'], 'rb') as f:
+        assert f.read() == b'contenu'
+    assert not os.listdir(store.dossier_temp)
+
+
+@pytest.mark.parametrize('doc_id', [None, '', '../etc/passwd', '0' * 31, 'A' * 32])
+def test_identifiant_invalide(tmp_path, doc_id):
+    assert DocumentStore(str(tmp_path)).obtenir(doc_id) is None
+
+
+def test_expiration_ttl(tmp_path):
+    store = DocumentStore(str(tmp_path), ttl=60)
+    ancien, recent = deposer(store), deposer(store)
+    vieillir(store, ancien, 120)
+    assert store.evincer() == 1
+    assert store.obtenir(ancien) is None and store.obtenir(recent) is not None
+
+
+def test_factures_conservees(tmp_path):
+    store = DocumentStore(str(tmp_path), ttl=60, conserver_factures=True)
+    facture = deposer(store, type_document='facture')
+    vieillir(store, facture, 120)
+    assert store.evincer() == 0 and store.obtenir(facture) is not None
+
+
+def test_quota_evince_les_moins_recemment_utilises(tmp_path):
+    store = DocumentStore(str(tmp_path), quota_octets=25)
+    ids = [deposer(store, b'x' * 10) for _ in range(3)]
+    for age, doc_id in zip((30, 20, 10), ids):
+        vieillir(store, doc_id, age)
+    # Le plus ancien est relu : c'est le second qui est évincé
+    store.obtenir(ids[0])
+    assert store.evincer() == 1
+    assert [store.obtenir(i) is not None for i in ids] == [True, False, True]
+
+
+def test_metadonnees_illisibles_ignorees(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    doc_id = deposer(store)
+    with open(os.path.join(store.dossier, f'{doc_id}.json'), 'w') as f:
+        f.write('{')
+    assert store.obtenir(doc_id) is None and store.evincer() == 0
+
+
+def test_telechargement_reserve_au_client(client):
+    reponse = client.post('/api/devis', json={'client_nom': 'ACME', 'items': [{'description': 'Audit'}]},
+                          headers=CLES_ACME)
+    doc_id = reponse.headers['X-Document-Id']
+
+    nouveau = client.get(f'/api/documents/{doc_id}', headers=CLES_ACME)
+    assert nouveau.status_code == 200 and nouveau.data == reponse.data
+    assert client.get(f'/api/documents/{doc_id}', headers=CLES_GLOBEX).status_code == 404
+    assert client.get(f'/api/documents/{"0" * 32}', headers=CLES_ACME).status_code == 404
+    assert json.loads(client.get(f'/api/documents/{doc_id}').data)['error']
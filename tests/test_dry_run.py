@@ -0,0 +1,35 @@
+import re
+
+import pytest
+
+from conftest import CLES_ACME
+
+
+def nb_pages(pdf):
+    return len(re.findall(rb'/Type /Page\b', pdf))
+
+
+def document(nb_articles, nb_details=0):
+    return {'client_nom': 'ACME', 'texte_intro': 'Introduction ' * 40,
+            'items': [{'description': f'Article {i}', 'details': [f'Détail {j}' for j in range(nb_details)],
+                       'prix_unitaire': 10 + i} for i in range(nb_articles)]}
+
+
+@pytest.mark.parametrize('type_document', ['devis', 'facture'])
+@pytest.mark.parametrize('nb_articles, nb_details', [(1, 0), (25, 2), (80, 1), (20, 8)])
+def test_pages_identiques_au_rendu(client, type_document, nb_articles, nb_details):
+    data = document(nb_articles, nb_details)
+    simulation = client.post(f'/api/{type_document}', json=dict(data, dry_run=True), headers=CLES_ACME).get_json()
+    rendu = client.post(f'/api/{type_document}', json=data, headers=CLES_ACME)
+    assert simulation['pages'] == nb_pages(rendu.data)
+
+    pages = [article['page'] for article in simulation['articles']]
+    assert len(pages) == nb_articles and pages == sorted(pages)
+    assert pages[0] == 1 and pages[-1] <= simulation['pages']
+
+
+def test_sans_numero_ni_document(client, app_students):
+    reponse = client.post('/api/facture', json=dict(document(3), dry_run=True), headers=CLES_ACME).get_json()
+    assert reponse['dry_run'] is True and reponse['numero'] is None
+    assert reponse['total_ht'] == 33 and reponse['total_ttc'] == 39.6
+    assert client.get('/api/documents', headers=CLES_ACME).get_json()['documents'] == []
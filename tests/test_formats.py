@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+import pytest
+
+from app_students import lire_formats
+from conftest import CLES_ACME
+from docx_generator import THEMES_COULEURS_DOCX
+from pdf_generator_students import THEMES_COULEURS
+from themes import THEMES, hex_vers_rgb
+
+DEVIS = {'client_nom': 'ACME', 'numero': 'D-42', 'items': [{'description': 'Audit', 'prix_unitaire': 100}]}
+
+
+@pytest.mark.parametrize('data, attendu', [
+    ({}, ['pdf']),
+    ({'format': 'DOCX'}, ['docx']),
+    ({'format': ['pdf', 'docx', 'PDF']}, ['pdf', 'docx']),
+    ({'format': []}, None),
+    ({'format': ['pdf', 'odt']}, None),
+    ({'format': {'pdf': True}}, None),
+])
+def test_lire_formats(data, attendu):
+    assert lire_formats(data) == attendu
+
+
+def test_plusieurs_formats_dans_un_zip(client):
+    reponse = client.post('/api/devis', json=dict(DEVIS, format=['pdf', 'docx']), headers=CLES_ACME)
+    assert reponse.status_code == 200 and reponse.mimetype == 'application/zip'
+
+    ids = dict(paire.split('=') for paire in reponse.headers['X-Document-Ids'].split(', '))
+    assert list(ids) == ['pdf', 'docx']
+    with zipfile.ZipFile(io.BytesIO(reponse.data)) as archive:
+        fichiers = {nom: archive.read(nom) for nom in archive.namelist()}
+    assert set(fichiers) == {'devis_D-42_bleu.pdf', 'devis_D-42_bleu.docx'}
+    assert fichiers['devis_D-42_bleu.pdf'].startswith(b'%PDF')
+
+    # Chaque format reste téléchargeable seul
+    pdf = client.get(f"/api/documents/{ids['pdf']}", headers=CLES_ACME)
+    assert pdf.data == fichiers['devis_D-42_bleu.pdf']
+
+
+def test_format_non_supporte(client):
+    reponse = client.post('/api/devis', json=dict(DEVIS, format=['pdf', 'odt']), headers=CLES_ACME)
+    assert reponse.status_code == 400
+
+
+@pytest.mark.parametrize('theme', list(THEMES))
+def test_couleurs_derivees_des_themes(theme):
+    couleurs = THEMES[theme]
+    for role, valeur in couleurs.items():
+        assert THEMES_COULEURS[theme][role].hexval() == '0x' + valeur.lstrip('#')
+    docx = THEMES_COULEURS_DOCX[theme]
+    assert tuple(docx['principale']) == hex_vers_rgb(couleurs['principale'])
+    assert tuple(docx['accent']) == hex_vers_rgb(couleurs['accent'])
+    assert docx['header_bg'] == couleurs['header_bg'].lstrip('#')
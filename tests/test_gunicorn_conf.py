@@ -0,0 +1,56 @@
+import os
+import runpy
+
+import pytest
+
+CONFIGURATION = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+
+
+def charger(monkeypatch, **env):
+    for nom in ('GUNICORN_PROFIL', 'GUNICORN_WORKERS', 'WEB_CONCURRENCY', 'GUNICORN_THREADS',
+                'GUNICORN_MAX_REQUESTS', 'GUNICORN_MAX_REQUESTS_JITTER'):
+        monkeypatch.delenv(nom, raising=False)
+    for nom, valeur in env.items():
+        monkeypatch.setenv(nom, valeur)
+    return runpy.run_path(CONFIGURATION)
+
+
+def test_profil_cpu_par_defaut(monkeypatch):
+    conf = charger(monkeypatch)
+    assert conf['profil_nom'] == 'cpu'
+    assert conf['worker_class'] == 'sync' and conf['threads'] == 1
+    assert conf['workers'] == conf['coeurs'] + 1
+
+
+def test_profil_io(monkeypatch):
+    conf = charger(monkeypatch, GUNICORN_PROFIL='IO')
+    assert conf['worker_class'] == 'gthread' and conf['threads'] == 8
+    assert conf['workers'] == max(2, conf['coeurs'])
+
+
+def test_profil_inconnu_repli_cpu(monkeypatch):
+    assert charger(monkeypatch, GUNICORN_PROFIL='turbo')['profil_nom'] == 'cpu'
+
+
+def test_profil_gevent(monkeypatch):
+    conf = charger(monkeypatch, GUNICORN_PROFIL='gevent')
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        # Repli sur les workers multi-threadés
+        assert conf['worker_class'] == 'gthread'
+    else:
+        assert conf['worker_class'] == 'gevent' and conf['worker_connections'] == 200
+
+
+@pytest.mark.parametrize('env, attendu', [
+    ({'WEB_CONCURRENCY': '3'}, 3),
+    ({'WEB_CONCURRENCY': '3', 'GUNICORN_WORKERS': '5'}, 5),
+])
+def test_nombre_de_workers_force(monkeypatch, env, attendu):
+    assert charger(monkeypatch, **env)['workers'] == attendu
+
+
+def test_gigue_du_recyclage(monkeypatch):
+    assert charger(monkeypatch, GUNICORN_MAX_REQUESTS='200')['max_requests_jitter'] == 20
+    assert charger(monkeypatch, GUNICORN_MAX_REQUESTS='5')['max_requests_jitter'] == 1
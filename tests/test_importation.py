@@ -0,0 +1,67 @@
+import io
+import zipfile
+
+import pytest
+
+from importation import ImportInvalide, ZipEnFlux, csv_resultats, lire_lignes, regrouper_devis
+
+
+def lignes(texte):
+    return lire_lignes(io.BytesIO(texte.encode('utf-8')))
+
+
+def test_lignes_csv_point_virgule():
+    resultat = list(lignes("Numero;Client_nom;Description\nD-1;ACME;Audit\n;;\nD-2;Globex;Licence\n"))
+    assert resultat == [
+        (2, {'numero': 'D-1', 'client_nom': 'ACME', 'description': 'Audit'}),
+        (4, {'numero': 'D-2', 'client_nom': 'Globex', 'description': 'Licence'}),
+    ]
+
+
+def test_lignes_csv_virgule_et_bom():
+    assert list(lire_lignes(io.BytesIO('\ufeffnumero,quantite\nD-1,2\n'.encode('utf-8')))) == [
+        (2, {'numero': 'D-1', 'quantite': '2'}),
+    ]
+
+
+@pytest.mark.parametrize('contenu', ['', 'client_nom;description\nACME;Audit\n'])
+def test_entete_invalide(contenu):
+    with pytest.raises(ImportInvalide):
+        lignes(contenu)
+
+
+def test_regrouper_devis():
+    groupes = list(regrouper_devis(lignes(
+        "numero;client_nom;description;details;quantite;prix_unitaire\n"
+        "D-1;ACME;Audit;Analyse | Rapport |;1;1500\n"
+        "D-1;;Formation;;2;800\n"
+        "D-2;Globex;Licence;;10;49,90\n"
+    )))
+    assert groupes == [
+        (2, 'D-1', {'numero': 'D-1', 'client_nom': 'ACME', 'items': [
+            {'description': 'Audit', 'details': ['Analyse', 'Rapport'], 'quantite': '1', 'prix_unitaire': '1500'},
+            {'description': 'Formation', 'quantite': '2', 'prix_unitaire': '800'},
+        ]}),
+        (4, 'D-2', {'numero': 'D-2', 'client_nom': 'Globex', 'items': [
+            {'description': 'Licence', 'quantite': '10', 'prix_unitaire': '49,90'},
+        ]}),
+    ]
+
+
+def test_regrouper_devis_lignes_non_consecutives_ou_sans_numero():
+    groupes = list(regrouper_devis(lignes(
+        "numero;description\nD-1;a\nD-2;b\nD-1;c\n;d\n"
+    )))
+    assert [(premiere, numero, data is not None) for premiere, numero, data in groupes] == [
+        (2, 'D-1', True), (3, 'D-2', True), (4, 'D-1', False), (5, '', False),
+    ]
+
+
+def test_zip_en_flux():
+    archive = ZipEnFlux()
+    contenu = archive.ajouter('a.txt', b'bonjour') + archive.ajouter('resultats.csv', csv_resultats([
+        {'ligne': 2, 'numero': 'D-1', 'statut': 'ok'},
+    ])) + archive.fermer()
+    with zipfile.ZipFile(io.BytesIO(contenu)) as lecture:
+        assert lecture.read('a.txt') == b'bonjour'
+        assert lecture.read('resultats.csv').decode('utf-8-sig').splitlines()[1] == '2;D-1;ok;;;;;'
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+
+import pytest
+
+from jobs import EN_ATTENTE, EN_COURS, ERREUR, TERMINE, FileRendus
+from rate_limit import QuotaDepasse
+
+
+@pytest.fixture
+def file_rendus(tmp_path):
+    file_rendus = FileRendus(str(tmp_path), workers=1, max_en_attente=2, duree_max=60)
+    yield file_rendus
+    file_rendus.arreter()
+
+
+def attendre(file_rendus, job_id, statuts=(TERMINE, ERREUR)):
+    limite = time.time() + 5
+    while time.time() < limite:
+        etat = file_rendus.obtenir(job_id)
+        if etat['statut'] in statuts:
+            return etat
+        time.sleep(0.01)
+    raise AssertionError(f"tâche {job_id} toujours {etat['statut']}")
+
+
+def vieillir(file_rendus, job_id, secondes, **champs):
+    """Réécrire l'état de la tâche comme s'il datait de `secondes`"""
+    chemin = file_rendus._chemin(job_id)
+    with open(chemin, encoding='utf-8') as f:
+        etat = json.load(f)
+    etat.update(champs)
+    etat['maj'] = time.time() - secondes
+    if 'debut' in etat:
+        etat['debut'] = time.time() - secondes
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(etat, f)
+
+
+def test_rendu_termine(file_rendus):
+    job_id = file_rendus.soumettre(lambda a, b: {'somme': a + b}, 2, 3, type_document='devis')
+    etat = attendre(file_rendus, job_id)
+    assert etat['statut'] == TERMINE
+    assert etat['somme'] == 5
+    assert etat['type_document'] == 'devis'
+
+
+def test_rendu_en_erreur(file_rendus):
+    def echec():
+        raise ValueError("logo illisible")
+
+    etat = attendre(file_rendus, file_rendus.soumettre(echec))
+    assert etat['statut'] == ERREUR
+    assert etat['error'] == "logo illisible"
+
+
+def test_tache_en_attente_jamais_interrompue(file_rendus):
+    bloque = threading.Event()
+    premier = file_rendus.soumettre(lambda: bloque.wait(5) and {})
+    attendre(file_rendus, premier, (EN_COURS,))
+    second = file_rendus.soumettre(lambda: {})
+    try:
+        vieillir(file_rendus, second, 3600)
+        assert file_rendus.obtenir(second)['statut'] == EN_ATTENTE
+    finally:
+        bloque.set()
+    assert attendre(file_rendus, second)['statut'] == TERMINE
+
+
+def test_rendu_en_cours_trop_long_interrompu(file_rendus):
+    bloque = threading.Event()
+    job_id = file_rendus.soumettre(lambda: bloque.wait(5) and {})
+    attendre(file_rendus, job_id, (EN_COURS,))
+    try:
+        vieillir(file_rendus, job_id, 30)
+        assert file_rendus.obtenir(job_id)['statut'] == EN_COURS
+        vieillir(file_rendus, job_id, 120)
+        etat = file_rendus.obtenir(job_id)
+        assert etat['statut'] == ERREUR
+        assert etat['error'] == "Rendu interrompu"
+    finally:
+        bloque.set()
+
+
+def test_file_pleine(file_rendus):
+    bloque = threading.Event()
+    try:
+        attendre(file_rendus, file_rendus.soumettre(lambda: bloque.wait(5) and {}), (EN_COURS,))
+        file_rendus.soumettre(lambda: {})
+        file_rendus.soumettre(lambda: {})
+        with pytest.raises(QuotaDepasse):
+            file_rendus.soumettre(lambda: {})
+    finally:
+        bloque.set()
+
+
+def test_identifiant_inconnu(file_rendus):
+    assert file_rendus.obtenir('0' * 32) is None
+    assert file_rendus.obtenir('../jobs') is None
@@ -0,0 +1,56 @@
+import gzip
+import json
+from decimal import Decimal
+
+import pytest
+
+from conftest import CLES_ACME
+from json_provider import FastJSONProvider, charger_json
+
+
+@pytest.fixture
+def fournisseur(app_students):
+    return FastJSONProvider(app_students.app)
+
+
+def test_aller_retour(fournisseur):
+    valeur = {'client': 'Société Générale', 'montant': 1234.5, 'articles': [1, 2, None], 'valide': True}
+    assert fournisseur.loads(fournisseur.dumps(valeur)) == valeur
+    assert charger_json(fournisseur.dumps(valeur).encode('utf-8')) == valeur
+
+
+def test_types_de_flask(fournisseur):
+    # Types que orjson ne connaît pas : sérialisés par le default de Flask
+    assert json.loads(fournisseur.dumps({'total': Decimal('10.50'), 2024: 'clé entière'})) == {
+        'total': '10.50', '2024': 'clé entière'}
+
+
+def test_json_invalide(fournisseur):
+    with pytest.raises(ValueError):
+        fournisseur.loads('{')
+    with pytest.raises(ValueError):
+        charger_json(b'{')
+
+
+def test_reponse_cachee_etag_et_304(client):
+    reponse = client.get('/api/themes')
+    assert reponse.status_code == 200 and reponse.cache_control.max_age == 300
+    assert client.get('/api/themes').data == reponse.data
+
+    inchangee = client.get('/api/themes', headers={'If-None-Match': reponse.headers['ETag']})
+    assert inchangee.status_code == 304 and not inchangee.data
+
+
+def test_reponse_cachee_compressee(client):
+    brute = client.get('/')
+    compressee = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressee.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressee.data) == brute.data
+    assert compressee.headers['ETag'] != brute.headers['ETag']
+
+
+def test_corps_trop_volumineux(client, app_students, monkeypatch):
+    monkeypatch.setitem(app_students.app.config, 'MAX_CONTENT_LENGTH', 100)
+    reponse = client.post('/api/devis', data=json.dumps({'client_nom': 'x' * 200}),
+                          content_type='application/json', headers=CLES_ACME)
+    assert reponse.status_code == 413 and 'error' in reponse.get_json()
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+import rendu_parallele
+from app_students import construire_lot_factures
+from conftest import CLES_ACME
+from validation import ErreurValidation
+
+fitz = rendu_parallele.fitz
+
+
+def facture(numero=None, nb_articles=1, client='ACME'):
+    valeurs = {'client_nom': client,
+               'items': [{'description': f'Article {i}', 'prix_unitaire': 10} for i in range(nb_articles)]}
+    if numero:
+        valeurs['numero'] = numero
+    return valeurs
+
+
+@pytest.mark.parametrize('data', [None, {}, {'factures': []}, {'factures': {'numero': 'F-1'}}])
+def test_lot_vide_ou_invalide(data):
+    with pytest.raises(ErreurValidation):
+        construire_lot_factures(data)
+
+
+def test_erreur_prefixee_par_facture():
+    with pytest.raises(ErreurValidation) as erreur:
+        construire_lot_factures({'factures': [facture('F-1'), {'numero': 'F-2', 'items': []}]})
+    assert {e['champ'] for e in erreur.value.erreurs} >= {'factures[1].client_nom'}
+    assert all(e['message'].startswith('factures[1] : ') for e in erreur.value.erreurs)
+
+
+def test_lot_trop_grand(app_students, monkeypatch):
+    monkeypatch.setattr(app_students, 'LOT_FACTURES_MAX', 2)
+    with pytest.raises(ErreurValidation):
+        construire_lot_factures({'factures': [facture('F-1'), facture('F-2'), facture('F-3')]})
+
+
+@pytest.mark.skipif(fitz is None, reason="PyMuPDF non installé")
+def test_un_pdf_avec_signets_et_pagination_par_facture(client):
+    lot = [facture('F-1', client='ACME'), facture('F-2', nb_articles=60, client='Globex'), facture('F-3')]
+    reponse = client.post('/api/factures/lot', json={'factures': lot}, headers=CLES_ACME)
+    assert reponse.status_code == 200 and reponse.mimetype == 'application/pdf'
+
+    with fitz.open(stream=io.BytesIO(reponse.data), filetype='pdf') as pdf:
+        signets = [(titre, page) for _, titre, page in pdf.get_toc()]
+        assert [titre for titre, _ in signets] == ['Facture F-1 - ACME', 'Facture F-2 - Globex', 'Facture F-3 - ACME']
+        debut_f2, debut_f3 = signets[1][1], signets[2][1]
+        pages_f2 = debut_f3 - debut_f2
+        assert signets[0][1] == 1 and pages_f2 > 1
+        # Chaque facture commence sur une nouvelle page, avec sa propre numérotation
+        assert 'F-1 · 1/1' in pdf[0].get_text()
+        assert f'F-2 · 1/{pages_f2}' in pdf[debut_f2 - 1].get_text()
+        assert f'F-2 · {pages_f2}/{pages_f2}' in pdf[debut_f3 - 2].get_text()
+        assert 'F-3 · 1/1' in pdf[debut_f3 - 1].get_text()
+
+
+def test_factures_numerotees_par_le_service(client, app_students):
+    reponse = client.post('/api/factures/lot', json={'factures': [facture(), facture()]}, headers=CLES_ACME)
+    assert reponse.status_code == 200
+    numeros = app_students.documents.obtenir(reponse.headers['X-Document-Id'])['numeros']
+    assert len(set(numeros)) == 2 and all(numeros)
@@ -0,0 +1,67 @@
+import pytest
+
+from app_students import modifier_articles
+from conftest import CLES_ACME, CLES_GLOBEX
+from test_rendu_parallele import devis
+from validation import ErreurValidation
+
+
+def descriptions(document):
+    return [item.description for item in document.items]
+
+
+def test_modifier_supprimer_ajouter():
+    document = devis(4)
+    modifier_articles(document, {
+        'modifier': [{'index': 1, 'prix_unitaire': 50}],
+        'supprimer': [0, 3],
+        'ajouter': [{'description': 'Nouveau', 'prix_unitaire': 5, 'quantite': 2}],
+    })
+    assert descriptions(document) == ['Article 1', 'Article 2', 'Nouveau']
+    # Champs non modifiés repris de l'article d'origine
+    assert document.items[0].details == ['Détail']
+    assert document.total_ht == 50 + 10 + 10
+
+
+@pytest.mark.parametrize('data, champ', [
+    (None, None),
+    ({}, None),
+    ({'supprimer': 'tous'}, 'supprimer'),
+    ({'supprimer': [4]}, 'supprimer[0]'),
+    ({'supprimer': [True]}, 'supprimer[0]'),
+    ({'modifier': [{'prix_unitaire': 1}]}, 'modifier[0].index'),
+    ({'modifier': [{'index': 0}], 'supprimer': [0]}, 'modifier[0].index'),
+    ({'modifier': [{'index': 0}, {'index': 0}]}, 'modifier[1].index'),
+    ({'modifier': [{'index': 2, 'prix_unitaire': 'cher'}]}, 'modifier[0].prix_unitaire'),
+    ({'supprimer': [0, 1, 2, 3]}, 'items'),
+    ({'ajouter': [{'quantite': -1}]}, 'ajouter[0].quantite'),
+])
+def test_modification_invalide(data, champ):
+    document = devis(4)
+    with pytest.raises(ErreurValidation) as erreur:
+        modifier_articles(document, data)
+    assert erreur.value.erreurs[0]['champ'] == champ
+    assert descriptions(document) == [f'Article {i}' for i in range(4)]
+
+
+def test_patch_regenere_et_enregistre(client, app_students):
+    client.post('/api/devis', json={'numero': 'D-1', 'client_nom': 'ACME',
+                                    'items': [{'description': 'Audit', 'prix_unitaire': 100}]}, headers=CLES_ACME)
+    reponse = client.patch('/api/devis/D-1', json={'ajouter': [{'description': 'Suivi', 'prix_unitaire': 20}]},
+                           headers=CLES_ACME)
+    assert reponse.status_code == 200 and reponse.mimetype == 'application/pdf'
+
+    # Les modifications suivantes partent du devis modifié
+    client.patch('/api/devis/D-1', json={'supprimer': [0]}, headers=CLES_ACME)
+    facture = client.post('/api/devis/D-1/facture', json={'format': 'docx', 'numero': 'F-1'}, headers=CLES_ACME)
+    assert facture.status_code == 200
+    devis_enregistre = app_students.devis_enregistres.obtenir('D-1', 'acme')
+    assert descriptions(devis_enregistre) == ['Suivi'] and devis_enregistre.total_ht == 20
+
+
+def test_patch_erreurs(client):
+    client.post('/api/devis', json={'numero': 'D-1', 'client_nom': 'ACME',
+                                    'items': [{'description': 'Audit'}]}, headers=CLES_ACME)
+    assert client.patch('/api/devis/D-1', json={'supprimer': [0]}, headers=CLES_GLOBEX).status_code == 404
+    reponse = client.patch('/api/devis/D-1', json={'supprimer': [0]}, headers=CLES_ACME)
+    assert reponse.status_code == 400 and reponse.get_json()['erreurs'][0]['champ'] == 'items'
@@ -0,0 +1,40 @@
+import pytest
+
+from number_format import ESPACE_INSECABLE as E
+from number_format import formater_colonne, formater_montant, formater_nombre, formater_quantite, formater_taux
+
+
+@pytest.mark.parametrize('valeur, attendu', [
+    (0, '0,00'),
+    (1234.5, f'1{E}234,50'),
+    (1234567.891, f'1{E}234{E}567,89'),
+    (-1234.5, f'-1{E}234,50'),
+    (-0.001, '0,00'),
+])
+def test_nombre_deux_decimales(valeur, attendu):
+    assert formater_nombre(valeur) == attendu
+
+
+@pytest.mark.parametrize('valeur, attendu', [
+    (20, '20'),
+    (20.0, '20'),
+    (5.5, '5,5'),
+    (0.1 + 0.2, '0,3'),
+    (1e16, f'10{E}000{E}000{E}000{E}000{E}000'),
+    (1e-05, '0,00001'),
+    (-2.5e6, f'-2{E}500{E}000'),
+])
+def test_nombre_sans_decimales_inutiles(valeur, attendu):
+    assert formater_nombre(valeur, None) == attendu
+
+
+def test_montant_taux_quantite():
+    assert formater_montant(1234.5) == f'1{E}234,50{E}€'
+    assert formater_taux(5.5) == f'5,5{E}%'
+    assert formater_quantite(1000) == f'1{E}000'
+    assert formater_quantite(2.5) == '2,5'
+
+
+def test_colonne():
+    assert formater_colonne([10, 20, 10]) == [f'10,00{E}€', f'20,00{E}€', f'10,00{E}€']
+    assert formater_colonne([1, 2.5], formater_quantite) == ['1', '2,5']
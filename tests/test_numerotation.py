@@ -0,0 +1,76 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+import db
+from numerotation import ANNULE, ATTRIBUE, EMIS, Numerotation
+
+
+@pytest.fixture
+def numerotation(tmp_path):
+    chemin = str(tmp_path / 'numerotation.sqlite3')
+    yield Numerotation(chemin, taille_bloc=10)
+    db.fermer(chemin)
+
+
+def synchronous(numerotation):
+    return db.connecter(numerotation.chemin).execute('PRAGMA synchronous').fetchone()[0]
+
+
+def test_factures_continues_par_client(numerotation):
+    annee = datetime.now().year
+    assert numerotation.allouer('facture', 'a') == f"F-{annee}-000001"
+    assert numerotation.allouer('facture', 'a') == f"F-{annee}-000002"
+    assert numerotation.allouer('facture', 'b') == f"F-{annee}-000001"
+    assert [ligne['sequence'] for ligne in numerotation.journal('a', annee)] == [1, 2]
+
+
+def test_devis_par_blocs(numerotation):
+    numeros = [numerotation.allouer('devis', 'a') for _ in range(12)]
+    assert len(set(numeros)) == 12
+    # Un autre worker (nouvelle instance) repart après le bloc réservé
+    autre = Numerotation(numerotation.chemin, taille_bloc=10)
+    assert autre.allouer('devis', 'a').endswith('-000021')
+
+
+def test_synchronous_retabli_apres_une_facture(numerotation):
+    numerotation.allouer('facture', 'a')
+    assert synchronous(numerotation) == 1  # NORMAL
+    numerotation.confirmer(numerotation.allouer('facture', 'a'), 'a', 'doc')
+    assert synchronous(numerotation) == 1
+
+
+def test_issue_des_factures_consignee(numerotation):
+    annee = datetime.now().year
+    emis = numerotation.allouer('facture', 'a')
+    annule = numerotation.allouer('facture', 'a')
+    en_cours = numerotation.allouer('facture', 'a')
+    assert numerotation.confirmer(emis, 'a', 'doc-1')
+    assert numerotation.annuler(annule, 'a', 'RuntimeError: rendu impossible')
+    # L'issue d'un numéro n'est consignée qu'une fois
+    assert not numerotation.annuler(emis, 'a', 'trop tard')
+    assert not numerotation.confirmer(en_cours, 'b', 'doc-2')
+
+    journal = {ligne['numero']: ligne for ligne in numerotation.journal('a', annee)}
+    assert journal[emis]['statut'] == EMIS and journal[emis]['document_id'] == 'doc-1'
+    assert journal[annule]['statut'] == ANNULE and journal[annule]['motif'] == 'RuntimeError: rendu impossible'
+    assert journal[en_cours]['statut'] == ATTRIBUE
+
+
+def test_factures_sans_doublon_entre_threads(numerotation):
+    numeros = []
+    lock = threading.Lock()
+
+    def allouer():
+        for _ in range(10):
+            numero = numerotation.allouer('facture', 'a')
+            with lock:
+                numeros.append(numero)
+
+    threads = [threading.Thread(target=allouer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(int(numero.rsplit('-', 1)[1]) for numero in numeros) == list(range(1, 41))
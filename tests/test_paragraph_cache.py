@@ -0,0 +1,73 @@
+import io
+
+import pytest
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+
+from paragraph_cache import CacheParagraphes, ParagrapheCache, signature_style
+
+STYLE = ParagraphStyle('article', fontName='Helvetica', fontSize=9, leading=11)
+TEXTE = "<b>Audit de sécurité</b><br/>Revue du code, tests d'intrusion et rapport détaillé " * 3
+
+
+def dessin(paragraphe):
+    """Flux de la page où le paragraphe est dessiné"""
+    toile = canvas.Canvas(io.BytesIO(), invariant=1)
+    paragraphe.drawOn(toile, 0, 0)
+    return toile._code
+
+
+@pytest.mark.parametrize('largeur', [80, 200, 400])
+def test_coupure_identique_a_paragraph(largeur):
+    cache = CacheParagraphes()
+    reference = Paragraph(TEXTE, STYLE)
+    attendu = reference.wrap(largeur, 1000)
+    for _ in range(2):  # sans puis avec le cache
+        paragraphe = ParagrapheCache(TEXTE, STYLE, cache)
+        assert paragraphe.wrap(largeur, 1000) == attendu
+        assert dessin(paragraphe) == dessin(reference)
+
+
+def test_statistiques():
+    cache = CacheParagraphes()
+    for _ in range(3):
+        ParagrapheCache(TEXTE, STYLE, cache).wrap(200, 1000)
+    ParagrapheCache(TEXTE, STYLE, cache).wrap(300, 1000)
+    stats = cache.statistiques()
+    assert (stats['analyses_hits'], stats['analyses_misses']) == (3, 1)
+    assert (stats['coupures_hits'], stats['coupures_misses']) == (2, 2)
+    assert stats['entrees'] == 3
+
+    cache.vider()
+    assert cache.statistiques()['entrees'] == 0 and cache.statistiques()['analyses_hits'] == 0
+
+
+def test_taille_bornee():
+    cache = CacheParagraphes(taille=2)
+    for texte in ('a', 'b', 'c'):
+        ParagrapheCache(texte, STYLE, cache)
+    assert cache.statistiques()['entrees'] == 2
+    ParagrapheCache('a', STYLE, cache)
+    assert cache.statistiques()['analyses_hits'] == 0
+
+
+def test_cache_desactive():
+    cache = CacheParagraphes(taille=0)
+    paragraphe = ParagrapheCache(TEXTE, STYLE, cache)
+    assert paragraphe.wrap(200, 1000) == Paragraph(TEXTE, STYLE).wrap(200, 1000)
+    assert cache.statistiques()['entrees'] == 0
+
+
+def test_signature_par_style():
+    signature_style(STYLE)
+    # Un style dérivé ne reprend pas la signature mémorisée de son parent
+    autre = ParagraphStyle('article', parent=STYLE, fontSize=10)
+    assert signature_style(STYLE) != signature_style(autre)
+    assert signature_style(STYLE) == signature_style(ParagraphStyle('article', fontName='Helvetica', fontSize=9,
+                                                                    leading=11))
+
+
+def test_balisage_invalide():
+    with pytest.raises(ValueError):
+        ParagrapheCache('<b>non fermé', STYLE, CacheParagraphes())
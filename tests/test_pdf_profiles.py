@@ -0,0 +1,83 @@
+import io
+
+import pytest
+from reportlab import rl_config
+
+import assets
+from models import Devis, DevisItem
+from pdf_generator_students import generate_pdf_devis
+from pdf_profiles import PROFIL_PDF_PAR_DEFAUT, PROFILS_PDF, options_document, preparer_logo, profil_pdf
+from validation import DEVIS_SCHEMA
+
+
+def devis(logo_url=''):
+    valeurs = DEVIS_SCHEMA.valider({
+        'numero': 'D-TEST', 'client_nom': 'Client', 'logo_url': logo_url,
+        'items': [{'description': f'Article {i}', 'prix_unitaire': 10} for i in range(30)],
+    })
+    items = valeurs.pop('items')
+    document = Devis(**valeurs)
+    document.items = [DevisItem(**item) for item in items]
+    document.calculate_totals()
+    return document
+
+
+def png_transparent(largeur=200, hauteur=80):
+    from PIL import Image
+    sortie = io.BytesIO()
+    Image.new('RGBA', (largeur, hauteur), (200, 30, 30, 128)).save(sortie, format='PNG')
+    return sortie.getvalue()
+
+
+def rendre(profil, document=None):
+    sortie = io.BytesIO()
+    generate_pdf_devis(document or devis(), 'bleu', sortie, profil=profil)
+    return sortie.getvalue()
+
+
+def test_profil_inconnu():
+    assert profil_pdf('inconnu') is PROFILS_PDF[PROFIL_PDF_PAR_DEFAUT]
+
+
+def test_options_document():
+    assert options_document('fast') == {'pageCompression': 0}
+    assert options_document('compact') == {'pageCompression': 1}
+    options = options_document('archive', 'Devis D-1', 'ACME', 'Devis')
+    assert options['title'] == 'Devis D-1' and options['lang'] == 'fr-FR'
+    assert options['keywords'] == ['Devis', 'ACME']
+
+
+def test_fast_plus_gros_que_compact():
+    assert len(rendre('fast')) > len(rendre('compact'))
+
+
+def test_archive_metadonnees():
+    pdf = rendre('archive')
+    assert b'/Lang (fr-FR)' in pdf and b'/DisplayDocTitle true' in pdf
+    assert b'/Lang' not in rendre('compact')
+
+
+def test_logo_reduit_sauf_archive():
+    from PIL import Image
+    logo = png_transparent(3000, 1200)
+    reduit = preparer_logo('compact', logo, 144, 72)
+    assert len(reduit) < len(logo)
+    assert Image.open(io.BytesIO(reduit)).size == (600, 240)  # 2 x 1 pouces à 300 dpi
+    assert preparer_logo('archive', logo, 144, 72) is logo
+
+
+@pytest.mark.parametrize('contenu', [None, b'pas une image'])
+def test_logo_illisible_inchange(contenu):
+    assert preparer_logo('compact', contenu, 144, 72) is contenu
+
+
+def test_flux_binaires_sans_reglage_global():
+    assets.memoriser_logo('test://logo-transparent.png', png_transparent())
+    for profil in ('fast', 'compact', 'archive'):
+        sortie = io.BytesIO()
+        generate_pdf_devis(devis('test://logo-transparent.png'), 'bleu', sortie, profil=profil)
+        pdf = sortie.getvalue()
+        assert b'/Image' in pdf
+        assert b'ASCII85Decode' not in pdf
+    # Le réglage global de ReportLab reste celui par défaut
+    assert rl_config.useA85 == 1
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+import db
+from rate_limit import Limiteur, LimiteurMemoire, LimiteurSQLite, QuotaDepasse, limiteur_depuis_environnement
+
+
+@pytest.fixture(params=['memoire', 'sqlite'])
+def limiteur(request, tmp_path):
+    if request.param == 'memoire':
+        yield Limiteur(LimiteurMemoire())
+        return
+    chemin = str(tmp_path / 'rate_limit.sqlite3')
+    yield Limiteur(LimiteurSQLite(chemin))
+    db.fermer(chemin)
+
+
+def client(identifiant='a', **options):
+    return SimpleNamespace(id=identifiant, options=dict({'debit': 1, 'rafale': 10, 'simultanes': 5}, **options))
+
+
+def test_rafale_puis_limite_de_debit(limiteur):
+    tenant = client()
+    for _ in range(5):
+        with limiteur.reserver(tenant, 2):
+            pass
+    with pytest.raises(QuotaDepasse) as e:
+        with limiteur.reserver(tenant, 2):
+            pass
+    assert str(e.value) == "Limite de débit atteinte"
+    assert e.value.retry_after == 2
+    assert e.value.to_dict() == {"error": "❌ Limite de débit atteinte", "retry_after": 2}
+
+
+def test_clients_independants(limiteur):
+    with limiteur.reserver(client('a'), 10):
+        pass
+    with limiteur.reserver(client('b'), 10):
+        pass
+
+
+def test_rendu_plus_couteux_que_la_rafale(limiteur):
+    # Accepté seau plein (il ne passerait jamais sinon), et débité de son coût entier :
+    # 50 unités pour une rafale de 10 laissent le seau à -40
+    tenant = client(simultanes=100)
+    with limiteur.reserver(tenant, 50):
+        pass
+    with pytest.raises(QuotaDepasse) as e:
+        with limiteur.reserver(tenant, 1):
+            pass
+    assert e.value.retry_after >= 40
+
+
+def test_pas_de_depassement_du_debit_par_gros_rendus(limiteur, monkeypatch):
+    # Débit de 1 unité par seconde : sur 100 s, au plus rafale + 100 unités acceptées
+    horloge = [1000.0]
+    monkeypatch.setattr('rate_limit.time.monotonic', lambda: horloge[0])
+    monkeypatch.setattr('rate_limit.time.time', lambda: horloge[0])
+    tenant = client(simultanes=1000)
+    acceptes = 0
+    for _ in range(100):
+        try:
+            with limiteur.reserver(tenant, 50):
+                acceptes += 50
+        except QuotaDepasse:
+            pass
+        horloge[0] += 1
+    assert acceptes <= 10 + 100
+
+
+def test_rendus_simultanes(limiteur):
+    tenant = client(rafale=100)
+    with limiteur.reserver(tenant, 3):
+        with pytest.raises(QuotaDepasse) as e:
+            with limiteur.reserver(tenant, 3):
+                pass
+        assert str(e.value) == "Trop de rendus simultanés"
+        with limiteur.reserver(tenant, 2):
+            pass
+    # Budget libéré à la sortie du bloc, même un seul rendu au-delà du budget passe
+    with limiteur.reserver(tenant, 8):
+        pass
+
+
+def test_reservation_liberee_sur_erreur(limiteur):
+    tenant = client(rafale=100)
+    with pytest.raises(RuntimeError):
+        with limiteur.reserver(tenant, 5):
+            raise RuntimeError("rendu en échec")
+    with limiteur.reserver(tenant, 5):
+        pass
+
+
+def test_limites_par_defaut_sans_options(limiteur):
+    with limiteur.reserver(SimpleNamespace(id='a', options=None), 1):
+        pass
+
+
+def test_backend_selon_environnement(tmp_path):
+    assert isinstance(limiteur_depuis_environnement({}).backend, LimiteurMemoire)
+    chemin = str(tmp_path / 'rate_limit.sqlite3')
+    assert isinstance(limiteur_depuis_environnement({'RATE_LIMIT_DB': chemin}).backend, LimiteurSQLite)
+    db.fermer(chemin)
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import rendu_parallele
+from models import Devis, DevisItem
+from rendu_parallele import decouper
+from validation import DEVIS_SCHEMA
+
+
+@pytest.mark.parametrize('nb_pages, nb_plages, attendu', [
+    (10, 3, [(1, 4), (5, 7), (8, 10)]),
+    (9, 3, [(1, 3), (4, 6), (7, 9)]),
+    (2, 4, [(1, 1), (2, 2)]),
+    (5, 1, [(1, 5)]),
+    (1, 0, [(1, 1)]),
+])
+def test_decouper(nb_pages, nb_plages, attendu):
+    assert decouper(nb_pages, nb_plages) == attendu
+
+
+def devis(nb_articles):
+    valeurs = DEVIS_SCHEMA.valider({
+        'numero': 'D-TEST', 'client_nom': 'Client',
+        'items': [{'description': f'Article {i}', 'details': ['Détail'], 'prix_unitaire': 10}
+                  for i in range(nb_articles)],
+    })
+    items = valeurs.pop('items')
+    document = Devis(**valeurs)
+    document.items = [DevisItem(**item) for item in items]
+    document.calculate_totals()
+    return document
+
+
+@pytest.mark.skipif(rendu_parallele.fitz is None, reason="PyMuPDF non installé")
+def test_rendu_par_plages_identique_en_pages(tmp_path):
+    document = devis(150)
+    nb_pages, _ = rendu_parallele.paginer(document, 'devis', 'bleu')
+    assert nb_pages > 2
+
+    durees = {}
+    chemin = str(tmp_path / 'devis.pdf')
+    with ThreadPoolExecutor(max_workers=2) as executeur:
+        rendu_parallele.rendre_pdf_parallele(document, 'devis', 'bleu', chemin, processus=2,
+                                             executeur=executeur, durees=durees)
+    assert durees['pages'] == nb_pages and durees['plages'] == 2
+    with rendu_parallele.fitz.open(chemin) as pdf:
+        assert pdf.page_count == nb_pages
+        # Pied de page "n/N" du document entier sur chaque plage
+        for index in (0, nb_pages - 1):
+            assert f'D-TEST · {index + 1}/{nb_pages}' in pdf[index].get_text()
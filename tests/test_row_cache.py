@@ -0,0 +1,73 @@
+import io
+
+import pytest
+from reportlab import rl_config
+
+import row_cache
+from paragraph_cache import ParagrapheCache
+from pdf_generator_students import STYLE_ARTICLE, THEMES_COULEURS, generate_pdf_devis, lignes_article
+from row_cache import CacheLignes, LignesArticle
+from test_rendu_parallele import devis
+
+
+def article(description='Audit', details=('Revue',)):
+    return lignes_article(THEMES_COULEURS['bleu'], description, list(details), '1', '10,00 €', '20 %', '10,00 €', 0)
+
+
+def test_copies_des_cellules():
+    modele = LignesArticle('cle', [[ParagrapheCache('Audit', STYLE_ARTICLE), '1']])
+    modele.lignes[0][0].wrap(200, 1000)
+    premiere, seconde = modele.copier(), modele.copier()
+    assert premiere[0][0] is not seconde[0][0] and premiere[0][0] is not modele.lignes[0][0]
+    assert premiere[0][1] == '1'
+    # Coupure en lignes conservée par la copie, sans la partager à l'écriture
+    assert premiere[0][0].blPara is modele.lignes[0][0].blPara
+    premiere[0][0].wrap(50, 1000)
+    assert modele.lignes[0][0].width == 200
+
+
+def test_lru_borne():
+    cache = CacheLignes(taille=2)
+    for cle in 'abc':
+        cache.memoriser(cle, cle)
+    assert cache.obtenir('a') is None and cache.obtenir('c') == 'c'
+    assert cache.statistiques() == {'hits': 1, 'misses': 1, 'entrees': 2, 'taux': 0.5}
+
+
+def test_cache_desactive():
+    cache = CacheLignes(taille=0)
+    cache.memoriser('a', 'a')
+    assert cache.statistiques()['entrees'] == 0
+
+
+def test_article_identique_repris_du_cache(monkeypatch):
+    monkeypatch.setattr(row_cache.CACHE, '_entrees', type(row_cache.CACHE._entrees)())
+    premier = article()
+    assert article() is not premier  # pas encore mesuré : pas encore en cache
+    row_cache.CACHE.memoriser(premier.cle, premier)
+    assert article() is premier
+    assert article('Autre') is not premier
+    assert lignes_article(THEMES_COULEURS['vert'], 'Audit', ['Revue'], '1', '10,00 €', '20 %', '10,00 €',
+                          0) is not premier
+
+
+@pytest.fixture
+def pdf_invariant(monkeypatch):
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+
+    def rendre():
+        sortie = io.BytesIO()
+        generate_pdf_devis(devis(120), 'bleu', sortie)
+        return sortie.getvalue()
+    return rendre
+
+
+def test_rendu_identique_avec_et_sans_cache(pdf_invariant, monkeypatch):
+    monkeypatch.setattr(row_cache.CACHE, 'taille', 0)
+    sans_cache = pdf_invariant()
+    monkeypatch.setattr(row_cache.CACHE, 'taille', 4096)
+    row_cache.CACHE.vider()
+    assert pdf_invariant() == sans_cache
+    # Second rendu du même catalogue : les lignes des articles viennent du cache
+    assert pdf_invariant() == sans_cache
+    assert row_cache.CACHE.statistiques()['hits'] >= 120
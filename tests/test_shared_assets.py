@@ -0,0 +1,83 @@
+import os
+import time
+
+from shared_assets import MagasinRessources
+
+
+def magasin(tmp_path, **options):
+    return MagasinRessources(str(tmp_path), taille_max=1, **options)
+
+
+def test_cle_expiree_apres_ttl(tmp_path):
+    ressources = magasin(tmp_path, ttl=60)
+    ressources.stocker(b'ancien logo', cle='https://exemple.fr/logo.png')
+    assert bytes(ressources.obtenir_cle('https://exemple.fr/logo.png')) == b'ancien logo'
+
+    index = ressources._chemin_index('https://exemple.fr/logo.png')
+    il_y_a_deux_minutes = time.time() - 120
+    os.utime(index, (il_y_a_deux_minutes, il_y_a_deux_minutes))
+    assert ressources.obtenir_cle('https://exemple.fr/logo.png') is None
+
+    # Nouveau dépôt sous la même URL : le logo remplacé est servi
+    ressources.stocker(b'nouveau logo', cle='https://exemple.fr/logo.png')
+    contenu, depose_le = ressources.lire_cle('https://exemple.fr/logo.png')
+    assert bytes(contenu) == b'nouveau logo'
+    assert depose_le > il_y_a_deux_minutes
+
+
+def test_cle_sans_expiration(tmp_path):
+    ressources = magasin(tmp_path, ttl=0)
+    ressources.stocker(b'logo', cle='logo')
+    index = ressources._chemin_index('logo')
+    os.utime(index, (0, 0))
+    assert bytes(ressources.obtenir_cle('logo')) == b'logo'
+
+
+def test_contenu_depose_une_fois(tmp_path):
+    ressources = magasin(tmp_path)
+    premiere = ressources.stocker(b'logo', cle='https://a.fr/logo.png')
+    assert ressources.stocker(b'logo', cle='https://b.fr/logo.png') == premiere
+    assert [nom for nom in os.listdir(tmp_path) if nom.endswith('.bin')] == [f'{premiere}.bin']
+    assert bytes(ressources.obtenir_cle('https://b.fr/logo.png')) == b'logo'
+
+
+def test_partage_entre_workers_en_lecture_seule(tmp_path):
+    empreinte = magasin(tmp_path).stocker(b'logo partage', cle='logo')
+    # Un autre worker (autre instance sur le même dossier) retrouve la ressource
+    projection = magasin(tmp_path).obtenir(empreinte)
+    assert projection.readonly and bytes(projection) == b'logo partage'
+    # La projection reste valide après la suppression du fichier
+    os.remove(os.path.join(tmp_path, f'{empreinte}.bin'))
+    assert bytes(projection) == b'logo partage'
+    assert magasin(tmp_path).obtenir_cle('logo') is None
+
+
+def test_eviction_des_moins_recemment_lus(tmp_path):
+    ressources = magasin(tmp_path, intervalle=3600)
+    bloc = 400 * 1024
+    empreintes = [ressources.stocker(bytes([i]) * bloc, cle=f'logo{i}') for i in range(3)]
+    for age, empreinte_contenu in zip((30, 20, 10), empreintes):
+        instant = time.time() - age
+        os.utime(ressources.chemin(empreinte_contenu), (instant, instant))
+    ressources.obtenir(empreintes[0])  # relu : le plus ancien devient le plus récent
+
+    assert ressources.evincer() == 1
+    assert ressources.obtenir_cle('logo1') is None
+    assert not os.path.exists(ressources._chemin_index('logo1'))
+    assert ressources.obtenir_cle('logo0') is not None and ressources.obtenir_cle('logo2') is not None
+
+
+def test_magasin_desactive(tmp_path):
+    ressources = MagasinRessources(str(tmp_path / 'ressources'), taille_max=0)
+    ressources.stocker(b'logo', cle='logo')
+    assert ressources.obtenir_cle('logo') is None and not os.path.exists(tmp_path / 'ressources')
+    assert ressources.statistiques()['entrees'] == 0
+
+
+def test_statistiques(tmp_path):
+    ressources = magasin(tmp_path)
+    ressources.stocker(b'logo', cle='logo')
+    ressources.obtenir_cle('logo')
+    ressources.obtenir_cle('absent')
+    stats = ressources.statistiques()
+    assert (stats['hits'], stats['misses'], stats['entrees'], stats['octets']) == (1, 1, 1, 4)
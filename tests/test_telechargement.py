@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import zlib
+
+import pytest
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from compression import choisir_encodage, compresser_fichier
+from conftest import CLES_ACME
+
+DEVIS = {'client_nom': 'ACME', 'items': [{'description': 'Audit', 'prix_unitaire': 100}]}
+
+
+@pytest.fixture
+def document(client):
+    """Créer un devis dans le format demandé, retourne (identifiant, contenu)"""
+    def creer(output_format):
+        reponse = client.post('/api/devis', json=dict(DEVIS, format=output_format), headers=CLES_ACME)
+        return reponse.headers['X-Document-Id'], reponse.data
+    return creer
+
+
+def test_etag_fort_et_304(client, document):
+    doc_id, contenu = document('pdf')
+    reponse = client.get(f'/api/documents/{doc_id}', headers=CLES_ACME)
+    assert reponse.get_etag() == (hashlib.sha256(contenu).hexdigest(), False)
+    assert reponse.cache_control.private and reponse.cache_control.immutable
+    assert 'Accept-Encoding' not in reponse.vary
+
+    inchangee = client.get(f'/api/documents/{doc_id}',
+                           headers=dict(CLES_ACME, **{'If-None-Match': reponse.headers['ETag']}))
+    assert inchangee.status_code == 304 and not inchangee.data
+
+
+def test_range_206(client, document):
+    doc_id, contenu = document('pdf')
+    reponse = client.get(f'/api/documents/{doc_id}', headers=dict(CLES_ACME, Range='bytes=0-99'))
+    assert reponse.status_code == 206
+    assert reponse.data == contenu[:100]
+    assert reponse.headers['Content-Range'] == f'bytes 0-99/{len(contenu)}'
+
+    fin = client.get(f'/api/documents/{doc_id}', headers=dict(CLES_ACME, Range='bytes=-10'))
+    assert fin.data == contenu[-10:]
+
+
+@pytest.mark.parametrize('encodage, decompresser', [('gzip', gzip.decompress), ('deflate', zlib.decompress)])
+def test_docx_compresse(client, document, encodage, decompresser):
+    doc_id, contenu = document('docx')
+    reponse = client.get(f'/api/documents/{doc_id}', headers=dict(CLES_ACME, **{'Accept-Encoding': encodage}))
+    assert reponse.headers['Content-Encoding'] == encodage
+    assert 'Accept-Encoding' in reponse.vary
+    assert decompresser(reponse.data) == contenu
+    assert reponse.get_etag()[0].endswith(f'-{encodage}')
+
+
+def test_pdf_jamais_compresse(client, document):
+    doc_id, contenu = document('pdf')
+    reponse = client.get(f'/api/documents/{doc_id}', headers=dict(CLES_ACME, **{'Accept-Encoding': 'gzip'}))
+    assert 'Content-Encoding' not in reponse.headers and reponse.data == contenu
+
+
+def test_range_sans_compression(client, document):
+    doc_id, contenu = document('docx')
+    reponse = client.get(f'/api/documents/{doc_id}',
+                         headers=dict(CLES_ACME, **{'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'}))
+    assert reponse.status_code == 206 and reponse.data == contenu[:10]
+
+
+def test_choisir_encodage():
+    accepte = parse_accept_header('deflate, gzip;q=0', Accept)
+    assert choisir_encodage(accepte, 'application/json', 2048) == 'deflate'
+    assert choisir_encodage(accepte, 'application/json', 10) is None
+    assert choisir_encodage(accepte, 'application/pdf', 2048) is None
+
+
+def test_compresser_fichier(tmp_path):
+    chemin = tmp_path / 'donnees.csv'
+    chemin.write_bytes(b'numero;client\n' * 10000)
+    assert gzip.decompress(b''.join(compresser_fichier(str(chemin), 'gzip'))) == chemin.read_bytes()
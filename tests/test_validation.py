@@ -0,0 +1,61 @@
+import pytest
+
+from validation import DEVIS_SCHEMA, ITEM_SCHEMA, Champ, ErreurValidation, Schema
+
+
+def article(**champs):
+    return ITEM_SCHEMA.valider(dict({'description': 'Prestation'}, **champs))
+
+
+def erreurs(schema, data):
+    with pytest.raises(ErreurValidation) as e:
+        schema.valider(data)
+    return {erreur['champ']: erreur['message'] for erreur in e.value.erreurs}
+
+
+def test_article_par_defaut():
+    valeurs = article()
+    assert valeurs['quantite'] == 1
+    assert valeurs['tva_taux'] == 20
+    assert valeurs['details'] == []
+
+
+@pytest.mark.parametrize('valeur, attendu', [
+    (3, 3), (2.0, 2), ('4', 4), (2.5, 2.5), ('1 234,5', 1234.5),
+])
+def test_quantite(valeur, attendu):
+    quantite = article(quantite=valeur)['quantite']
+    assert quantite == attendu and type(quantite) is type(attendu)
+
+
+@pytest.mark.parametrize('valeur', [2.5, '1,5'])
+def test_entier_refuse_les_decimales(valeur):
+    schema = Schema([Champ('pages', 'entier')])
+    assert erreurs(schema, {'pages': valeur}) == {'pages': "'pages' doit être un nombre entier"}
+    assert schema.valider({'pages': '12'}) == {'pages': 12}
+
+
+@pytest.mark.parametrize('valeur, message', [
+    (True, "doit être un nombre"),
+    ('abc', "doit être un nombre"),
+    (float('nan'), "doit être un nombre fini"),
+    (-1, "doit être supérieur ou égal à 0"),
+])
+def test_quantite_invalide(valeur, message):
+    assert erreurs(ITEM_SCHEMA, {'quantite': valeur}) == {'quantite': f"'quantite' {message}"}
+
+
+def test_erreurs_avec_chemin_de_l_article():
+    data = {'client_nom': 'Client', 'items': [{'description': 'ok'}, {'prix_unitaire': 'gratuit'}]}
+    assert erreurs(DEVIS_SCHEMA, data) == {'items[1].prix_unitaire': "'items[1].prix_unitaire' doit être un nombre"}
+
+
+def test_champ_obligatoire():
+    assert erreurs(DEVIS_SCHEMA, {'items': []}) == {
+        'client_nom': "Le champ 'client_nom' est obligatoire",
+        'items': "Au moins un article est requis",
+    }
+
+
+def test_texte_trop_long():
+    assert 'description' in erreurs(ITEM_SCHEMA, {'description': 'x' * 1001})
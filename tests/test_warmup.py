@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from warmup import DESACTIVE, EN_COURS, ERREUR, NON_DEMARRE, TERMINE, Prechauffage
+
+
+def prechauffage(rendre=lambda *args: None, documents=lambda: {'devis': 'D', 'facture': 'F'}, **options):
+    return Prechauffage(rendre, documents, ['bleu', 'vert'], ['pdf', 'docx'], **options)
+
+
+def test_rend_chaque_type_format_et_theme():
+    rendus = []
+    rechauffe = prechauffage(lambda document, type_document, output_format, theme, sortie:
+                             rendus.append((document, type_document, output_format, theme)))
+    assert rechauffe.etat() == {'statut': NON_DEMARRE} and not rechauffe.pret
+
+    assert rechauffe.demarrer(attendre=True)
+    assert len(rendus) == 8 and ('F', 'facture', 'docx', 'vert') in rendus
+    assert rechauffe.pret
+    etat = rechauffe.etat(detail=True)
+    assert etat['statut'] == TERMINE and etat['erreurs'] == []
+    assert set(etat['rendus_ms']) >= {'devis_pdf_bleu', 'facture_docx_vert'}
+    # Une seule fois par worker
+    assert not rechauffe.demarrer(attendre=True) and len(rendus) == 8
+
+
+def test_erreur_de_rendu():
+    def rendre(document, type_document, output_format, theme, sortie):
+        if output_format == 'docx':
+            raise RuntimeError('modèle introuvable')
+    rechauffe = prechauffage(rendre)
+    rechauffe.demarrer(attendre=True)
+    etat = rechauffe.etat(detail=True)
+    assert etat['statut'] == ERREUR and not rechauffe.pret
+    assert 'devis_docx_bleu: modèle introuvable' in etat['erreurs']
+    assert 'devis_pdf_bleu' in etat['rendus_ms']
+
+
+def test_erreur_des_documents():
+    rechauffe = prechauffage(documents=lambda: 1 / 0)
+    rechauffe.demarrer(attendre=True)
+    assert rechauffe.etat(detail=True)['erreurs'][0].startswith('documents:')
+
+
+def test_desactive():
+    rechauffe = prechauffage(actif=False)
+    assert rechauffe.pret and rechauffe.etat()['statut'] == DESACTIVE
+    assert not rechauffe.demarrer()
+
+
+def test_documents_et_rendu_de_l_application(app_students):
+    rechauffe = Prechauffage(app_students.rendre_document, app_students.documents_prechauffage, ['bleu'],
+                             app_students.MIMETYPES)
+    rechauffe.demarrer(attendre=True)
+    assert rechauffe.etat(detail=True)['erreurs'] == [] and rechauffe.pret
+
+
+@pytest.fixture
+def rendu_bloque(app_students, monkeypatch):
+    """Préchauffage de l'application dont le rendu attend le feu vert du test"""
+    feu_vert = threading.Event()
+    rechauffe = prechauffage(lambda *args: feu_vert.wait(5))
+    monkeypatch.setattr(app_students, 'prechauffage', rechauffe)
+    yield rechauffe, feu_vert
+    feu_vert.set()
+
+
+def test_health_503_pendant_le_prechauffage(client, rendu_bloque):
+    rechauffe, feu_vert = rendu_bloque
+    reponse = client.get('/health')  # la première requête lance le préchauffage
+    assert reponse.status_code == 503 and reponse.get_json()['status'] == 'starting'
+    assert reponse.get_json()['prechauffage']['statut'] == EN_COURS
+
+    feu_vert.set()
+    for thread in threading.enumerate():
+        if thread.name == 'prechauffage':
+            thread.join(5)
+    reponse = client.get('/health?deep=1')
+    assert reponse.status_code == 200 and reponse.get_json()['status'] == 'healthy'
+    assert len(reponse.get_json()['prechauffage']['rendus_ms']) == 8
+
+
+def test_health_503_si_le_rendu_echoue(client, app_students, monkeypatch):
+    rechauffe = prechauffage(lambda *args: 1 / 0)
+    rechauffe.demarrer(attendre=True)
+    monkeypatch.setattr(app_students, 'prechauffage', rechauffe)
+    reponse = client.get('/health')
+    assert reponse.status_code == 503 and reponse.get_json()['status'] == 'unhealthy'
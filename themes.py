@@ -0,0 +1,58 @@
+# themes.py - Définition unique des thèmes de couleurs (PDF et DOCX)
+#
+# Les couleurs sont décrites une seule fois en hexadécimal ; pdf_generator_students
+# et docx_generator en dérivent leurs tables (HexColor ReportLab / RGBColor python-docx).
+
+THEMES = {
+    'bleu': {
+        'principale': '#2c3e50',
+        'secondaire': '#34495e',
+        'accent': '#3498db',
+        'fond': '#ecf0f1',
+        'header_bg': '#2d3436'
+    },
+    'vert': {
+        'principale': '#27ae60',
+        'secondaire': '#2d5016',
+        'accent': '#58d68d',
+        'fond': '#e8f8f5',
+        'header_bg': '#1e8449'
+    },
+    'rouge': {
+        'principale': '#e74c3c',
+        'secondaire': '#922b21',
+        'accent': '#f1948a',
+        'fond': '#fadbd8',
+        'header_bg': '#c0392b'
+    },
+    'violet': {
+        'principale': '#9b59b6',
+        'secondaire': '#6c3483',
+        'accent': '#d7bde2',
+        'fond': '#f4ecf7',
+        'header_bg': '#8e44ad'
+    },
+    'orange': {
+        'principale': '#e67e22',
+        'secondaire': '#a04000',
+        'accent': '#f5b041',
+        'fond': '#fdeaa7',
+        'header_bg': '#d35400'
+    },
+    'noir': {
+        'principale': '#2c3e50',
+        'secondaire': '#34495e',
+        'accent': '#95a5a6',
+        'fond': '#ecf0f1',
+        'header_bg': '#2c3e50'
+    }
+}
+
+THEME_PAR_DEFAUT = 'bleu'
+THEMES_DISPONIBLES = list(THEMES)
+
+
+def hex_vers_rgb(valeur):
+    """'#2c3e50' -> (44, 62, 80)"""
+    valeur = valeur.lstrip('#')
+    return tuple(int(valeur[i:i + 2], 16) for i in (0, 2, 4))
@@ -0,0 +1,254 @@
+# validation.py - Validation et normalisation des données reçues par l'API
+#
+# Les schémas sont déclarés une fois (liste de Champ) puis compilés en tuples
+# (nom, convertisseur, défaut, ...) : la validation d'un objet est une seule boucle
+# sur ces tuples, sans appels répétés à data.get() ni vérifications dupliquées.
+import os
+from datetime import datetime, timedelta
+
+MAX_ARTICLES = int(os.environ.get('VALIDATION_MAX_ARTICLES', 10000))
+MAX_DETAILS = int(os.environ.get('VALIDATION_MAX_DETAILS', 50))
+MAX_TEXTE_COURT = 500
+MAX_TEXTE_LONG = 5000
+MAX_ERREURS = 50
+
+
+class ErreurValidation(Exception):
+    """Données invalides : porte la liste des erreurs champ par champ"""
+
+    def __init__(self, erreurs):
+        super().__init__(erreurs[0]['message'] if erreurs else "Données invalides")
+        self.erreurs = erreurs
+
+    def to_dict(self):
+        return {"error": f"❌ {self.erreurs[0]['message']}", "erreurs": self.erreurs}
+
+
+class _Invalide(Exception):
+    pass
+
+
+def _texte(max_longueur):
+    def convertir(valeur):
+        if isinstance(valeur, str):
+            texte = valeur
+        elif isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+            texte = str(valeur)
+        else:
+            raise _Invalide("doit être une chaîne de caractères")
+        if len(texte) > max_longueur:
+            raise _Invalide(f"ne doit pas dépasser {max_longueur} caractères")
+        return texte
+    return convertir
+
+
+def _nombre(minimum=None, maximum=None, entier=False, sans_decimale_inutile=False):
+    """entier : refuse les valeurs non entières ; sans_decimale_inutile : 2.0 devient 2, 2.5 est gardé"""
+    def convertir(valeur):
+        if isinstance(valeur, bool):
+            raise _Invalide("doit être un nombre")
+        if isinstance(valeur, str):
+            try:
+                valeur = float(valeur.strip().replace(' ', '').replace('\u00a0', '').replace('\u202f', '').replace(',', '.'))
+            except ValueError:
+                raise _Invalide("doit être un nombre")
+        elif not isinstance(valeur, (int, float)):
+            raise _Invalide("doit être un nombre")
+        if valeur != valeur or valeur in (float('inf'), float('-inf')):
+            raise _Invalide("doit être un nombre fini")
+        if minimum is not None and valeur < minimum:
+            raise _Invalide(f"doit être supérieur ou égal à {minimum}")
+        if maximum is not None and valeur > maximum:
+            raise _Invalide(f"doit être inférieur ou égal à {maximum}")
+        if float(valeur).is_integer():
+            return int(valeur) if entier or sans_decimale_inutile else valeur
+        if entier:
+            raise _Invalide("doit être un nombre entier")
+        return valeur
+    return convertir
+
+
+def _liste_textes(max_elements, max_longueur):
+    convertir_texte = _texte(max_longueur)
+
+    def convertir(valeur):
+        if not isinstance(valeur, list):
+            raise _Invalide("doit être une liste")
+        if len(valeur) > max_elements:
+            raise _Invalide(f"ne doit pas contenir plus de {max_elements} éléments")
+        return [convertir_texte(element) for element in valeur]
+    return convertir
+
+
+class Champ:
+    """Déclaration d'un champ : type, valeur par défaut et limites"""
+
+    def __init__(self, nom, type_champ='texte', defaut='', obligatoire=False, message=None,
+                 max_longueur=MAX_TEXTE_COURT, minimum=None, maximum=None, max_elements=None,
+                 schema=None):
+        self.nom = nom
+        self.type_champ = type_champ
+        self.defaut = defaut
+        self.obligatoire = obligatoire
+        self.message = message or f"Le champ '{nom}' est obligatoire"
+        self.max_longueur = max_longueur
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_elements = max_elements
+        self.schema = schema
+
+    def compiler(self):
+        if self.type_champ == 'texte':
+            convertir = _texte(self.max_longueur)
+        elif self.type_champ == 'nombre':
+            convertir = _nombre(self.minimum, self.maximum)
+        elif self.type_champ == 'entier':
+            convertir = _nombre(self.minimum, self.maximum, entier=True)
+        elif self.type_champ == 'quantite':
+            convertir = _nombre(self.minimum, self.maximum, sans_decimale_inutile=True)
+        elif self.type_champ == 'textes':
+            convertir = _liste_textes(self.max_elements or MAX_DETAILS, self.max_longueur)
+        elif self.type_champ == 'objets':
+            convertir = None  # traité par Schema.valider (erreurs avec chemin)
+        else:
+            raise ValueError(f"Type de champ inconnu: {self.type_champ}")
+        return (self.nom, self.type_champ, convertir, self.defaut, self.obligatoire, self.message,
+                self.max_elements, self.schema)
+
+
+class Schema:
+    """Schéma précompilé : valider() retourne un dictionnaire normalisé ou lève ErreurValidation"""
+
+    def __init__(self, champs):
+        self.champs = champs
+        self._compile = tuple(champ.compiler() for champ in champs)
+
+    def valider(self, data):
+        erreurs = []
+        valeurs = self._valider(data, '', erreurs)
+        if erreurs:
+            raise ErreurValidation(erreurs[:MAX_ERREURS])
+        return valeurs
+
+    def _valider(self, data, prefixe, erreurs):
+        if not isinstance(data, dict):
+            chemin = prefixe.rstrip('.')
+            erreurs.append({"champ": chemin or None,
+                            "message": f"'{chemin}' doit être un objet" if chemin else "Aucune donnée reçue"})
+            return None
+
+        valeurs = {}
+        for nom, type_champ, convertir, defaut, obligatoire, message, max_elements, schema in self._compile:
+            valeur = data.get(nom)
+            if valeur is None or valeur == '' or valeur == []:
+                if obligatoire:
+                    erreurs.append({"champ": prefixe + nom, "message": message})
+                    continue
+                valeurs[nom] = defaut() if callable(defaut) else defaut
+                continue
+
+            if type_champ == 'objets':
+                if not isinstance(valeur, list):
+                    erreurs.append({"champ": prefixe + nom, "message": f"'{prefixe + nom}' doit être une liste"})
+                    continue
+                if max_elements and len(valeur) > max_elements:
+                    erreurs.append({"champ": prefixe + nom,
+                                    "message": f"'{prefixe + nom}' ne doit pas contenir plus de {max_elements} éléments"})
+                    continue
+                valeurs[nom] = [
+                    schema._valider(element, f"{prefixe}{nom}[{index}].", erreurs)
+                    for index, element in enumerate(valeur)
+                ]
+                continue
+
+            try:
+                valeurs[nom] = convertir(valeur)
+            except _Invalide as e:
+                erreurs.append({"champ": prefixe + nom, "message": f"'{prefixe + nom}' {e}"})
+            if len(erreurs) >= MAX_ERREURS:
+                break
+        return valeurs
+
+
+def _aujourdhui():
+    return datetime.now().strftime('%d/%m/%Y')
+
+
+def _dans_30_jours():
+    return (datetime.now() + timedelta(days=30)).strftime('%d/%m/%Y')
+
+
+PENALITES_PAR_DEFAUT = "En cas de retard de paiement, une pénalité de 3 fois le taux d'intérêt légal sera appliquée"
+
+ITEM_SCHEMA = Schema([
+    Champ('description', defaut='', max_longueur=1000),
+    Champ('details', 'textes', defaut=list, max_longueur=MAX_TEXTE_COURT),
+    Champ('quantite', 'quantite', defaut=1, minimum=0),  # 2,5 heures ou m² : décimales acceptées
+    Champ('prix_unitaire', 'nombre', defaut=0),
+    Champ('tva_taux', 'nombre', defaut=20, minimum=0, maximum=100),
+    Champ('remise', 'nombre', defaut=0, minimum=0),
+])
+
+CHAMPS_COMMUNS = [
+    Champ('date_emission', defaut=_aujourdhui, max_longueur=30),
+
+    # Fournisseur
+    Champ('fournisseur_nom', defaut='Infinytia'),
+    Champ('fournisseur_adresse', defaut='61 Rue De Lyon'),
+    Champ('fournisseur_ville', defaut='75012 Paris, FR'),
+    Champ('fournisseur_email', defaut='contact@infinytia.com'),
+    Champ('fournisseur_siret', defaut='93968736400017'),
+    Champ('fournisseur_telephone', defaut='+33 1 23 45 67 89'),
+
+    # Client
+    Champ('client_nom', obligatoire=True),
+    Champ('client_adresse'),
+    Champ('client_ville'),
+    Champ('client_siret'),
+    Champ('client_tva'),
+    Champ('client_telephone'),
+    Champ('client_email'),
+
+    # Logo et banque
+    Champ('logo_url', max_longueur=2000),
+    Champ('banque_nom', defaut='BNP Paribas'),
+    Champ('banque_iban', defaut='FR76 3000 4008 2800 0123 4567 890'),
+    Champ('banque_bic', defaut='BNPAFRPPXXX'),
+    Champ('penalites_retard', defaut=PENALITES_PAR_DEFAUT, max_longueur=MAX_TEXTE_LONG),
+
+    Champ('items', 'objets', obligatoire=True, message="Au moins un article est requis",
+          max_elements=MAX_ARTICLES, schema=ITEM_SCHEMA),
+]
+
+# Sans numéro fourni, il est attribué au moment du rendu (numerotation.py)
+DEVIS_SCHEMA = Schema([Champ('numero', max_longueur=100)] + CHAMPS_COMMUNS + [
+    Champ('date_expiration', defaut=_dans_30_jours, max_longueur=30),
+    Champ('conditions_paiement', defaut='Paiement à 30 jours', max_longueur=MAX_TEXTE_LONG),
+    Champ('texte_intro', max_longueur=MAX_TEXTE_LONG),
+    Champ('texte_conclusion', defaut='Nous restons à votre disposition pour toute information complémentaire.',
+          max_longueur=MAX_TEXTE_LONG),
+])
+
+FACTURE_SCHEMA = Schema([Champ('numero', max_longueur=100)] + CHAMPS_COMMUNS + [
+    Champ('date_echeance', defaut=_dans_30_jours, max_longueur=30),
+    Champ('conditions_paiement', defaut='Paiement à réception', max_longueur=MAX_TEXTE_LONG),
+    Champ('statut_paiement', defaut='En attente', max_longueur=50),
+    Champ('numero_commande', max_longueur=100),
+    Champ('reference_devis', max_longueur=100),
+])
+
+# Articles ajoutés par PATCH /api/devis/<numero> (modifications et suppressions : voir app_students.py)
+MODIFICATION_SCHEMA = Schema([
+    Champ('ajouter', 'objets', defaut=list, max_elements=MAX_ARTICLES, schema=ITEM_SCHEMA),
+])
+
+# Champs propres à la facture quand elle est créée depuis un devis enregistré
+# (POST /api/devis/<numero>/facture) : tout le reste vient du devis
+CONVERSION_SCHEMA = Schema([
+    Champ('numero', max_longueur=100),
+    Champ('date_emission', defaut=_aujourdhui, max_longueur=30),
+    Champ('date_echeance', defaut=_dans_30_jours, max_longueur=30),
+    Champ('conditions_paiement', defaut='Paiement à réception', max_longueur=MAX_TEXTE_LONG),
+    Champ('statut_paiement', defaut='En attente', max_longueur=50),
+    Champ('numero_commande', max_longueur=100),
+])
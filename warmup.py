@@ -0,0 +1,100 @@
+# warmup.py - Préchauffage et autotest du rendu au démarrage d'un worker
+#
+# Le premier vrai rendu d'un worker payait tous les chemins froids : polices et styles
+# ReportLab, modèle python-docx, caches de paragraphes et de lignes d'articles. Au
+# démarrage (hook post_worker_init de gunicorn.conf.py, sinon à la première requête),
+# un thread rend un petit devis et une petite facture pour chaque thème et chaque
+# format, en mémoire : rien n'est écrit sur disque, aucun numéro n'est attribué. Les
+# processus du pool de rendu de app_async.py sont préchauffés de même, avant leur
+# première tâche (rendu.py).
+#
+# Chaque durée est gardée comme référence du worker, avec les erreurs éventuelles :
+# GET /health ne répond 200 qu'une fois le préchauffage terminé sans erreur (503 avant,
+# ou si un rendu a échoué), et GET /health?deep=1 détaille les durées.
+#
+# PRECHAUFFAGE=0 désactive le préchauffage (le worker est prêt immédiatement).
+import os
+import threading
+import time
+from io import BytesIO
+
+PRECHAUFFAGE = os.environ.get('PRECHAUFFAGE', '1') != '0'
+
+NON_DEMARRE = 'non_demarre'
+EN_COURS = 'en_cours'
+TERMINE = 'termine'
+ERREUR = 'erreur'
+DESACTIVE = 'desactive'
+
+
+class Prechauffage:
+    """Rendus de préchauffage d'un worker, exécutés une fois dans un thread
+
+    rendre(document, type_document, output_format, theme, sortie) rend un document dans
+    le fichier ou BytesIO `sortie` ; documents() retourne {type_document: document}.
+    """
+
+    def __init__(self, rendre, documents, themes, formats, actif=PRECHAUFFAGE):
+        self.rendre = rendre
+        self.documents = documents
+        self.themes = list(themes)
+        self.formats = list(formats)
+        self._statut = NON_DEMARRE if actif else DESACTIVE
+        self._durees = {}
+        self._erreurs = []
+        self._debut = None
+        self._fin = None
+        self._lock = threading.Lock()
+
+    def demarrer(self, attendre=False):
+        """Lancer le préchauffage s'il ne l'a pas encore été (dans un thread, sauf avec attendre)"""
+        with self._lock:
+            if self._statut != NON_DEMARRE:
+                return False
+            self._statut = EN_COURS
+            self._debut = time.perf_counter()
+        if attendre:
+            self._executer()
+        else:
+            threading.Thread(target=self._executer, name='prechauffage', daemon=True).start()
+        return True
+
+    def _executer(self):
+        try:
+            documents = self.documents()
+        except Exception as e:
+            documents = {}
+            self._erreurs.append(f"documents: {e}")
+        for type_document, document in documents.items():
+            for output_format in self.formats:
+                for theme in self.themes:
+                    cle = f"{type_document}_{output_format}_{theme}"
+                    debut = time.perf_counter()
+                    try:
+                        self.rendre(document, type_document, output_format, theme, BytesIO())
+                    except Exception as e:
+                        self._erreurs.append(f"{cle}: {e}")
+                        continue
+                    self._durees[cle] = round((time.perf_counter() - debut) * 1000, 1)
+        with self._lock:
+            self._fin = time.perf_counter()
+            self._statut = ERREUR if self._erreurs else TERMINE
+        if self._erreurs:
+            print(f"❌ Préchauffage du rendu en échec : {'; '.join(self._erreurs)}")
+
+    @property
+    def pret(self):
+        """Le worker peut-il recevoir du trafic ?"""
+        return self._statut in (TERMINE, DESACTIVE)
+
+    def etat(self, detail=False):
+        """Statut et durée du préchauffage ; avec detail, la durée de chaque rendu et les erreurs"""
+        with self._lock:
+            etat = {'statut': self._statut}
+            if self._debut is not None:
+                fin = self._fin if self._fin is not None else time.perf_counter()
+                etat['duree_ms'] = round((fin - self._debut) * 1000, 1)
+        if detail:
+            etat['rendus_ms'] = dict(self._durees)
+            etat['erreurs'] = list(self._erreurs)
+        return etat